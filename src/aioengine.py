@@ -0,0 +1,433 @@
+# coding=utf-8
+'''
+(C) Copyright 2021 Steven;
+@author: Steven kangweibaby@163.com
+@date: 2021-07-17
+基于 asyncio 的 UCCI 引擎驱动
+
+PipeEngine 每个引擎需要一个读取线程和一个解析线程，这里所有的引擎共用一个事件循环，
+一个进程里可以同时驱动几十个引擎。
+
+    client = AsyncUCCIClient(filename)
+    await client.start()
+    await client.position(fen)
+    result = await client.go(depth=5)
+    async for line in client.infos():
+        print(line)
+    move = await result
+
+这是独立的驱动，界面和 EnginePool 仍然使用 UCCIEngine，用于需要同时驱动很多引擎的脚本，
+比如批量对局和测试。AsyncUCCIEngine 把客户端包装成与 UCCIEngine 相同的回调接口，
+需要的时候可以替换 UCCIEngine 的子类。
+
+和 PipeEngine 一样，只有设置了 CHESS_ENGINE_LOG 环境变量时才记录输入输出。
+'''
+
+import os
+import asyncio
+import threading
+import traceback
+import concurrent.futures
+from pathlib import Path
+
+from utils import attrdict
+from logger import logger
+from chess import Chess
+from engine import Engine
+from engine import PipeEngine
+from engine import UCCIEngine
+
+# 每次搜索最多保留的 info 行数，没有人读取 infos 的时候丢弃最早的，
+# 分析模式和长时间的搜索内存不会一直增长
+INFO_LIMIT = 1024
+
+# 所有 AsyncUCCIEngine 共用的事件循环
+LOOP = None
+LOOP_LOCK = threading.Lock()
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    # 第一次使用的时候在后台线程启动事件循环
+    global LOOP
+    with LOOP_LOCK:
+        if LOOP:
+            return LOOP
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(
+            target=loop.run_forever,
+            daemon=True,
+            name='AsyncEngineLoop'
+        )
+        thread.start()
+        LOOP = loop
+        return loop
+
+
+class AsyncUCCIClient(object):
+
+    '''
+    https://www.xqbase.com/protocol/cchess_ucci.htm
+
+    listener 在事件循环中被调用，参数是引擎输出的每一行，握手的输出除外
+    '''
+
+    def __init__(self, filename: Path, listener=None):
+        self.filename = filename
+        self.dirname = os.path.dirname(filename)
+        self.listener = listener
+        self.verbose = PipeEngine.VERBOSE
+
+        self.ids = attrdict()
+        self.options = attrdict()
+        self.millisec = 1
+
+        self.process = None
+        self.reader = None
+        self.ready = None
+        self.result = None
+        self.lines = None
+        self.bestline = None
+
+    @property
+    def running(self):
+        return self.process is not None and self.process.returncode is None
+
+    def get_command(self):
+        # 启动引擎的命令行，子类可以添加解释器或者参数
+        return [str(self.filename)]
+
+    async def start(self, timeout=10):
+        logger.info("open async pipe %s", self.filename)
+        self.process = await asyncio.create_subprocess_exec(
+            *self.get_command(),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            cwd=str(self.dirname) or None,
+        )
+        await self.send('ucci')
+        await asyncio.wait_for(self.handshake(), timeout)
+        self.reader = asyncio.ensure_future(self.read())
+
+    async def handshake(self):
+        while True:
+            line = await self.readline()
+            if line is None:
+                raise EOFError(f'engine {self.filename} exited')
+            items = line.split(maxsplit=1)
+            if not items:
+                continue
+            if items[0] == 'ucciok':
+                return
+            if len(items) < 2:
+                continue
+            tup = items[1].split(maxsplit=1)
+            if len(tup) < 2:
+                continue
+            if items[0] == 'id':
+                self.ids[tup[0]] = tup[1]
+            elif items[0] == 'option':
+                option = UCCIEngine.parse_option(tup[1])
+                self.options[tup[0]] = option
+                if tup[0] == 'usemillisec' and option.value != 'true':
+                    self.millisec = 1000
+
+    async def readline(self):
+        # 从引擎读取一行，引擎退出时返回 None
+        line = await self.process.stdout.readline()
+        if not line:
+            return None
+        line = UCCIEngine.decode(line.strip())
+        if self.verbose:
+            logger.info("OUTPUT: %s", line)
+        return line
+
+    async def read(self):
+        # 读取引擎的输出，在事件循环中运行直到引擎退出
+        try:
+            while True:
+                line = await self.readline()
+                if line is None:
+                    break
+                if line:
+                    self.dispatch(line)
+        except Exception:
+            logger.error(traceback.format_exc())
+        finally:
+            self.finish(None)
+            if self.ready and not self.ready.done():
+                self.ready.set_result(False)
+
+    def dispatch(self, line):
+        instruct = line.split(maxsplit=1)[0]
+        if instruct == 'info' and self.lines:
+            self.push(line)
+        elif instruct == 'readyok':
+            if self.ready and not self.ready.done():
+                self.ready.set_result(True)
+        elif instruct in {'bestmove', 'nobestmove'}:
+            self.finish(line)
+
+        if callable(self.listener):
+            try:
+                self.listener(line)
+            except Exception:
+                logger.error(traceback.format_exc())
+
+    def push(self, line):
+        # 队列满的时候丢弃最早的一行
+        if self.lines.full():
+            self.lines.get_nowait()
+        self.lines.put_nowait(line)
+
+    def finish(self, line):
+        # 搜索结束，唤醒 go 和 infos
+        if self.lines:
+            self.push(None)
+            self.lines = None
+        if self.result and not self.result.done():
+            self.bestline = line
+            self.result.set_result(line)
+
+    async def send(self, command):
+        if not self.running:
+            logger.warning("engine is not running, command %s ignored", command)
+            return
+        if self.verbose:
+            logger.info("COMMAND: %s", command)
+        self.process.stdin.write(f'{command}\n'.encode('gbk'))
+        try:
+            # 引擎不读取输入的时候等待管道缓冲区腾出空间
+            await self.process.stdin.drain()
+        except ConnectionError as e:
+            logger.warning("send command %s error %s", command, e)
+
+    async def isready(self, timeout=None):
+        loop = asyncio.get_running_loop()
+        if not self.ready or self.ready.done():
+            self.ready = loop.create_future()
+        await self.send('isready')
+        try:
+            return await asyncio.wait_for(asyncio.shield(self.ready), timeout)
+        except asyncio.TimeoutError:
+            return False
+
+    async def position(self, fen):
+        mark = 'fen '
+        if fen.startswith('startpos'):
+            mark = ''
+        await self.send(f'position {mark}{fen}')
+
+    async def banmoves(self, moves: list):
+        if not moves:
+            return
+        await self.send(f'banmoves {" ".join(moves)}')
+
+    async def set_option(self, option, value):
+        if option not in self.options:
+            logger.warning("option %s not supported!!!", option)
+            return
+        self.options[option].value = str(value)
+        await self.send(f'setoption {option} {value}')
+
+    async def clearhash(self):
+        if 'clearhash' not in self.options:
+            return
+        await self.send('setoption clearhash')
+
+    async def stop(self):
+        await self.send('stop')
+
+    async def go(self, **params) -> asyncio.Future:
+        # 发送 go 指令，返回可以 await 的最佳着法，没有着法的时候结果是 None
+        # 参数与 UCCIEngine.go 相同，完整的输出行保存在 bestline 中
+        loop = asyncio.get_running_loop()
+        command = UCCIEngine.format_go(self.millisec, **params)
+        if not command:
+            future = loop.create_future()
+            future.set_result(None)
+            return future
+
+        self.finish(None)
+        self.bestline = None
+        self.lines = asyncio.Queue(INFO_LIMIT)
+        self.result = loop.create_future()
+        await self.send(command)
+        return asyncio.ensure_future(self.bestmove(self.result))
+
+    async def bestmove(self, result):
+        line = await result
+        if not line:
+            return None
+        items = line.split()
+        if items[0] != 'bestmove' or len(items) < 2:
+            return None
+        return items[1]
+
+    async def infos(self):
+        # 当前搜索的 info 行，搜索结束时迭代结束，读得太慢的时候只能读到最近的 INFO_LIMIT 行
+        lines = self.lines
+        if not lines:
+            return
+        while True:
+            line = await lines.get()
+            if line is None:
+                return
+            yield line
+
+    async def close(self, timeout=3):
+        if self.running:
+            await self.send('quit')
+            try:
+                await asyncio.wait_for(self.process.wait(), timeout)
+            except asyncio.TimeoutError:
+                self.process.kill()
+                await self.process.wait()
+        if self.reader:
+            await self.reader
+
+
+class AsyncUCCIEngine(Engine):
+
+    '''
+    回调接口与 UCCIEngine 相同，指令提交到共用的事件循环中执行，
+    每个引擎不再需要单独的读取线程和解析线程。
+    '''
+
+    def __init__(self, filename, callback=None):
+        super().__init__()
+        self.callback = callback
+        self.loop = get_loop()
+        self.client = AsyncUCCIClient(filename, listener=self.listen)
+        self.starting = None
+
+    @property
+    def ids(self):
+        return self.client.ids
+
+    @property
+    def options(self):
+        return self.client.options
+
+    def start(self):
+        # 不启动线程，在事件循环中启动引擎
+        self.running = True
+        self.starting = self.submit(self.boot())
+
+    async def boot(self):
+        await self.client.start()
+        self.state = self.ENGINE_IDLE
+
+    def submit(self, coro) -> concurrent.futures.Future:
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def call(self, func, *args, **kwargs):
+        # 在事件循环中按顺序执行，保证在引擎启动之后
+        async def command():
+            await asyncio.wrap_future(self.starting)
+            await func(*args, **kwargs)
+        if not self.starting:
+            return
+        self.submit(command())
+
+    def is_alive(self):
+        return self.client.running
+
+    def close(self):
+        self.running = False
+        if not self.starting:
+            return
+        future = self.submit(self.client.close())
+        try:
+            future.result(timeout=5)
+        except Exception:
+            logger.error(traceback.format_exc())
+
+    def position(self, fen=None):
+        if not fen:
+            fen = self.sit.format_fen()
+        self.call(self.client.position, fen)
+
+    def banmoves(self, moves: list):
+        self.call(self.client.banmoves, moves)
+
+    def set_option(self, option, value):
+        self.call(self.client.set_option, option, value)
+
+    def clearhash(self):
+        self.call(self.client.clearhash)
+
+    def set_hashsize(self, size):
+        self.call(self.setup_option, 'hashsize', size)
+
+    def set_threads(self, threads):
+        self.call(self.setup_option, 'threads', threads)
+
+    async def setup_option(self, name, value):
+        if name not in self.options:
+            return
+        if self.options[name].get('value') == str(value):
+            return
+        await self.client.set_option(name, value)
+
+    def stop(self):
+        self.call(self.client.stop)
+
+    def ponderhit(self, draw=False):
+        self.call(self.client.send, 'ponderhit draw' if draw else 'ponderhit')
+
+    def isready(self):
+        if not self.starting:
+            return False
+
+        async def ready():
+            await asyncio.wrap_future(self.starting)
+            return await self.client.isready(timeout=5)
+        return self.submit(ready()).result()
+
+    def go(self, **params):
+        if not UCCIEngine.format_go(self.client.millisec, **params):
+            return
+        self.state = self.ENGINE_BUSY
+        self.stats.new_search()
+        self.call(self.client.go, **params)
+
+    def listen(self, line):
+        # 把引擎的输出转换成 UCCIEngine 的回调
+        items = line.split()
+        instruct = items[0]
+        if instruct == 'bye':
+            self.running = False
+            return
+        if instruct == 'info':
+            self.stats.update(line)
+            self.emit(Chess.INFO, line)
+            return
+        if instruct == 'pophash':
+            self.emit(Chess.POPHASH, line)
+            return
+
+        if instruct in {'bestmove', 'nobestmove'}:
+            self.stats.finish()
+
+        if instruct == 'bestmove':
+            self.state = self.ENGINE_IDLE
+            type = Chess.MOVE
+            self.pondermove = None
+            if len(items) > 3 and items[2] == 'ponder':
+                self.pondermove = items[3]
+            if 'draw' in items[2:]:
+                type = Chess.DRAW
+            if 'resign' in items[2:]:
+                type = Chess.RESIGN
+            self.emit(type, self.sit.parse_move(items[1]))
+        elif instruct == 'nobestmove':
+            self.state = self.ENGINE_IDLE
+            if self.sit.idle > 100:
+                self.emit(Chess.DRAW, None)
+            else:
+                self.emit(Chess.NOBESTMOVE, None)
+
+    def emit(self, type, data):
+        if callable(self.callback):
+            self.callback(type, data)
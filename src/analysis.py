@@ -0,0 +1,175 @@
+# coding=utf-8
+'''
+(C) Copyright 2021 Steven;
+@author: Steven kangweibaby@163.com
+@date: 2021-07-21
+分析模式，引擎对当前局面进行无限搜索，局面改变的时候重新开始
+
+引擎的回调只记录每条主要变例最新的 info，界面按固定的频率调用 format_lines 刷新，
+中文着法只在刷新的时候生成。
+
+停止搜索之后引擎还会输出旧局面的 info，直到 bestmove 为止，
+这里记录发出 stop 的次数，收到对应的 bestmove 之前的 info 都忽略。
+
+引擎支持 multipv 选项的时候同时显示 MULTIPV 条变例，不支持的只有一条。
+'''
+
+import threading
+
+from chess import Chess
+from logger import logger
+from engine import Engine
+from situation import Situation
+from stats import SearchInfo
+from stats import parse_info
+
+# 显示的主要变例的最大步数
+PV_LENGTH = 10
+# 同时显示的变例数
+MULTIPV = 3
+# 停止分析之后等待引擎输出着法的秒数，之后引擎空闲才能放回引擎池
+STOP_TIMEOUT = 1
+
+
+def format_score(info: SearchInfo):
+    if info.mate is not None:
+        return f'杀{abs(info.mate)}' if info.mate > 0 else f'被杀{abs(info.mate)}'
+    if info.score is None:
+        return ''
+    return f'{info.score:+d}'
+
+
+def format_pv(sit: Situation, moves, standard=False):
+    # 把 ICCS 着法转换成中文着法，遇到非法着法停止
+    sit = sit.copy()
+    result = []
+    for move in moves[:PV_LENGTH]:
+        try:
+            fpos, tpos = sit.parse_move(move)
+        except Exception:
+            break
+        if not sit.validate_move(fpos, tpos):
+            break
+        result.append(sit.get_method(sit.board, fpos, tpos, standard))
+        sit.make_move(sit.square(fpos), sit.square(tpos))
+    return ' '.join(result)
+
+
+class Analyser(object):
+
+    '''
+    engine 可以是任何引擎，使用之前调用 attach，analyse 在局面改变的时候调用
+    '''
+
+    def __init__(self):
+        self.engine = None
+        self.sit = None
+        self.fen = None
+        self.searching = False
+        self.stops = 0
+        self.infos = {}
+        self.dirty = False
+        self.lock = threading.Lock()
+        # 没有还在进行的搜索，包括已经 stop 但还没有输出着法的
+        self.finished = threading.Event()
+        self.finished.set()
+
+    @property
+    def active(self):
+        return self.engine is not None
+
+    def attach(self, engine: Engine):
+        self.engine = engine
+        engine.callback = self.callback
+        # 从引擎池取出的引擎可能在对局中取消了 info 的订阅
+        engine.subscribe('info')
+        engine.set_multipv(MULTIPV)
+        self.fen = None
+        self.stops = 0
+        self.searching = False
+        self.finished.set()
+
+    def detach(self) -> Engine:
+        # 停止分析，返回引擎由调用方回收
+        engine = self.engine
+        if not engine:
+            return None
+        self.stop()
+        if not self.finished.wait(STOP_TIMEOUT):
+            logger.warning("engine %s not stopped", engine.NAME)
+        engine.callback = None
+        engine.set_multipv(1)
+        self.engine = None
+        self.clear()
+        return engine
+
+    def clear(self):
+        with self.lock:
+            self.infos = {}
+            self.dirty = True
+
+    def stop(self):
+        if not self.searching:
+            return
+        with self.lock:
+            self.stops += 1
+            self.searching = False
+        self.engine.stop()
+
+    def analyse(self, sit: Situation, banmoves=None):
+        if not self.engine:
+            return
+        fen = sit.format_fen()
+        if fen == self.fen and self.searching:
+            return
+
+        self.stop()
+        self.fen = fen
+        self.sit = sit.copy()
+        self.clear()
+
+        if sit.result == Chess.CHECKMATE:
+            return
+
+        logger.debug("analyse %s", fen)
+        self.engine.position(fen)
+        if banmoves:
+            self.engine.banmoves(banmoves)
+        self.searching = True
+        self.finished.clear()
+        self.engine.go(infinite=True)
+
+    def callback(self, type, data):
+        if type == Chess.INFO:
+            with self.lock:
+                if self.stops:
+                    return
+                info = parse_info(data)
+                if not info.depth or not info.pv:
+                    return
+                self.infos[info.multipv] = info
+                self.dirty = True
+            return
+
+        if type in (Chess.MOVE, Chess.NOBESTMOVE, Chess.DRAW, Chess.RESIGN):
+            with self.lock:
+                if self.stops:
+                    self.stops -= 1
+                else:
+                    self.searching = False
+                if not self.stops and not self.searching:
+                    self.finished.set()
+
+    def format_lines(self, standard=False):
+        # 返回 [(深度, 分数, 中文变例)]，没有变化的时候返回 None
+        with self.lock:
+            if not self.dirty:
+                return None
+            self.dirty = False
+            infos = [self.infos[key] for key in sorted(self.infos)]
+            sit = self.sit
+
+        return [
+            (info.depth, format_score(info), format_pv(sit, info.pv, standard))
+            for info in infos
+        ]
@@ -15,7 +15,7 @@ from chess import Chess
 from logger import logger
 from context import BaseContextMenu
 from toast import Toast
-from situation import Generator
+from situation import GENERATOR
 
 
 class PositionValidator(object):
@@ -112,12 +112,12 @@ class PositionValidator(object):
                 break
             raise Exception('将帅不能见面')
 
-        generator = Generator()
-        check = generator.get_check(board, Chess.invert(turn))
+        generator = GENERATOR(board)
+        check = generator.get_check(Chess.invert(turn))
         logger.debug("get check %s", check)
         if check:
             raise Exception('处于将死的状态')
-        if generator.is_checkmate(board, turn):
+        if generator.is_checkmate(turn):
             raise Exception('处于将死的状态')
 
 
@@ -8,8 +8,6 @@
 
 '''
 
-import pygame
-
 from chess import Chess
 from logger import logger
 
@@ -24,8 +22,17 @@ AUDIO_INVALID = str(dirpath / 'audios/invalid.wav')
 AUDIO_NEW_GAME = str(dirpath / 'audios/newgame.wav')
 
 
+pygame = None
+
+
 def init():
-    pygame.mixer.init()
+    # pygame 导入和初始化音频设备比较慢，第一次播放的时候才进行
+    global pygame
+    if pygame:
+        return
+    import pygame as module
+    module.mixer.init()
+    pygame = module
 
 
 def play(audio_type):
@@ -45,5 +52,6 @@ def play(audio_type):
         return
 
     logger.info("play audio %s", audio)
+    init()
     pygame.mixer.music.load(audio)
     pygame.mixer.music.play()
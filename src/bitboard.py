@@ -0,0 +1,279 @@
+# coding=utf-8
+'''
+(C) Copyright 2021 Steven;
+@author: Steven kangweibaby@163.com
+@date: 2021-06-22
+位棋盘走法生成器，可以替换 situation.Generator 使用
+
+棋盘用 90 位的 Python 整数表示，第 sq 位对应一维棋盘的下标 sq = x * 10 + y，
+这样同一列的 10 个位置是连续的，可以直接移位取出列的占用情况；
+另外维护一个按行排列的占用 rotated，第 y * 9 + x 位对应 (x, y)，用于取出行的占用情况。
+'''
+
+from chess import Chess
+from position import Position
+from tables import SQUARES
+from tables import SIDES
+from tables import KNIGHT_MOVES
+from tables import BISHOP_MOVES
+from tables import ADVISOR_MOVES
+from tables import KING_MOVES
+from tables import PAWN_MOVES
+
+BITS = tuple(1 << sq for sq in SQUARES)
+RBITS = tuple(1 << (sq % Chess.H * Chess.W + sq // Chess.H) for sq in SQUARES)
+
+FILE_MASK = (1 << Chess.H) - 1
+RANK_MASK = (1 << Chess.W) - 1
+
+
+def line_attacks(pos, occ, length, cannon):
+    # 一条线上从 pos 出发能到达的位置，車到第一个遮挡的棋子为止，炮可以隔着炮架吃子
+    result = 0
+    for step in (-1, 1):
+        var = pos + step
+        barrier = False
+        while -1 < var < length:
+            bit = 1 << var
+            var += step
+            if not occ & bit:
+                if not barrier:
+                    result |= bit
+                continue
+            if cannon and not barrier:  # 炮架子
+                barrier = True
+                continue
+            result |= bit
+            break
+    return result
+
+
+def build_lines(length, cannon):
+    return tuple(
+        tuple(line_attacks(pos, occ, length, cannon) for occ in range(1 << length))
+        for pos in range(length)
+    )
+
+
+def build_spread():
+    # 将一行 9 位的掩码展开成棋盘位置
+    result = []
+    for y in range(Chess.H):
+        table = []
+        for mask in range(1 << Chess.W):
+            bits = 0
+            for x in range(Chess.W):
+                if mask & (1 << x):
+                    bits |= BITS[x * Chess.H + y]
+            table.append(bits)
+        result.append(tuple(table))
+    return tuple(result)
+
+
+def build_masks(table):
+    return {
+        turn: tuple(
+            sum(BITS[tsq] for tsq in table[turn][sq])
+            for sq in SQUARES
+        )
+        for turn in SIDES
+    }
+
+
+def build_blocked(table):
+    # 按照马腿或象眼分组: (马腿位, 目标位置掩码)
+    result = []
+    for moves in table:
+        groups = {}
+        for tsq, block in moves:
+            groups.setdefault(block, 0)
+            groups[block] |= BITS[tsq]
+        result.append(tuple((BITS[block], mask) for block, mask in groups.items()))
+    return tuple(result)
+
+
+def build_knight_checks():
+    # 反向查找: 能够攻击到 sq 的马的位置，同样按马腿分组
+    groups = [dict() for _ in SQUARES]
+    for sq in SQUARES:
+        for tsq, leg in KNIGHT_MOVES[sq]:
+            groups[tsq].setdefault(leg, 0)
+            groups[tsq][leg] |= BITS[sq]
+    return tuple(
+        tuple((BITS[leg], mask) for leg, mask in group.items())
+        for group in groups
+    )
+
+
+def build_pawn_checks():
+    # 反向查找: 能够攻击到 sq 的兵的位置
+    result = {}
+    for turn in SIDES:
+        table = [0] * len(SQUARES)
+        for sq in SQUARES:
+            for tsq in PAWN_MOVES[turn][sq]:
+                table[tsq] |= BITS[sq]
+        result[turn] = tuple(table)
+    return result
+
+
+FILE_ROOK = build_lines(Chess.H, False)
+FILE_CANNON = build_lines(Chess.H, True)
+RANK_ROOK = build_lines(Chess.W, False)
+RANK_CANNON = build_lines(Chess.W, True)
+SPREAD = build_spread()
+
+KNIGHT_BLOCKED = build_blocked(KNIGHT_MOVES)
+BISHOP_BLOCKED = {turn: build_blocked(BISHOP_MOVES[turn]) for turn in SIDES}
+ADVISOR_MASKS = build_masks(ADVISOR_MOVES)
+KING_MASKS = build_masks(KING_MOVES)
+PAWN_MASKS = build_masks(PAWN_MOVES)
+
+KNIGHT_CHECKS = build_knight_checks()
+PAWN_CHECKS = build_pawn_checks()
+
+
+def iter_bits(mask):
+    result = []
+    while mask:
+        low = mask & -mask
+        result.append(low.bit_length() - 1)
+        mask ^= low
+    return result
+
+
+class BitboardGenerator(Position):
+
+    '''
+    位棋盘走法生成器，接口与 situation.Generator 相同
+
+    除了 Position 的 squares 之外，增量维护:
+        occupied: 所有棋子的占用
+        rotated: 按行排列的所有棋子的占用
+        sides: 双方各自的占用
+        bitboards: 每种棋子的占用
+    '''
+
+    def load_pieces(self):
+        super().load_pieces()
+        self.occupied = 0
+        self.rotated = 0
+        self.sides = {
+            Chess.RED: 0,
+            Chess.BLACK: 0,
+        }
+        self.bitboards = {chess: 0 for chess in Chess.CHESSES}
+        for sq, chess in enumerate(self.squares):
+            if not chess:
+                continue
+            self.occupied |= BITS[sq]
+            self.rotated |= RBITS[sq]
+            self.sides[chess & Chess.TMASK] |= BITS[sq]
+            self.bitboards[chess] |= BITS[sq]
+
+    def toggle(self, chess, fsq, tsq, captured):
+        # 异或是可逆的，走子和撤销都调用这个函数
+        bits = BITS[fsq] | BITS[tsq]
+        self.bitboards[chess] ^= bits
+        self.sides[chess & Chess.TMASK] ^= bits
+        if captured:
+            self.bitboards[captured] ^= BITS[tsq]
+            self.sides[captured & Chess.TMASK] ^= BITS[tsq]
+            self.occupied ^= BITS[fsq]
+            self.rotated ^= RBITS[fsq]
+        else:
+            self.occupied ^= bits
+            self.rotated ^= RBITS[fsq] | RBITS[tsq]
+
+    def make_move(self, fsq, tsq):
+        undo = super().make_move(fsq, tsq)
+        self.toggle(self.squares[tsq], fsq, tsq, undo[2])
+        return undo
+
+    def unmake_move(self, undo):
+        super().unmake_move(undo)
+        fsq, tsq, captured = undo
+        self.toggle(self.squares[fsq], fsq, tsq, captured)
+
+    def copy(self):
+        position = super().copy()
+        position.sides = dict(self.sides)
+        position.bitboards = dict(self.bitboards)
+        return position
+
+    def slide(self, sq, files, ranks):
+        x, y = divmod(sq, Chess.H)
+        shift = x * Chess.H
+        mask = files[y][(self.occupied >> shift) & FILE_MASK] << shift
+        mask |= SPREAD[y][ranks[x][(self.rotated >> (y * Chess.W)) & RANK_MASK]]
+        return mask
+
+    def attacks(self, sq, turn):
+        # 棋子在 sq 位置可以到达的位置掩码，包括自己的棋子
+        chess = self.squares[sq] & Chess.CMASK
+        if chess == Chess.ROOK:
+            return self.slide(sq, FILE_ROOK, RANK_ROOK)
+        if chess == Chess.CANNON:
+            return self.slide(sq, FILE_CANNON, RANK_CANNON)
+        if chess == Chess.KNIGHT:
+            mask = 0
+            for leg, targets in KNIGHT_BLOCKED[sq]:
+                if not self.occupied & leg:
+                    mask |= targets
+            return mask
+        if chess == Chess.BISHOP:
+            mask = 0
+            for eye, targets in BISHOP_BLOCKED[turn][sq]:
+                if not self.occupied & eye:
+                    mask |= targets
+            return mask
+        if chess == Chess.ADVISOR:
+            return ADVISOR_MASKS[turn][sq]
+        if chess == Chess.KING:
+            # 老将见面
+            king = self.bitboards[Chess.KING | (turn ^ Chess.TMASK)]
+            return KING_MASKS[turn][sq] | (self.slide(sq, FILE_ROOK, RANK_ROOK) & king)
+        if chess == Chess.PAWN:
+            return PAWN_MASKS[turn][sq]
+        return 0
+
+    def generate(self, sq, turn):
+        if not self.squares[sq]:
+            return []
+        return iter_bits(self.attacks(sq, turn) & ~self.sides[turn])
+
+    def get_check(self, turn):
+        # 从老将的位置反向查找攻击者，返回将军 turn 方的棋子位置
+        king = self.bitboards[Chess.KING | turn]
+        if not king:
+            return None
+        sq = king.bit_length() - 1
+
+        enemy = turn ^ Chess.TMASK
+        bitboards = self.bitboards
+
+        mask = self.slide(sq, FILE_ROOK, RANK_ROOK)
+        mask &= bitboards[Chess.ROOK | enemy] | bitboards[Chess.KING | enemy]
+        if not mask:
+            mask = self.slide(sq, FILE_CANNON, RANK_CANNON) & bitboards[Chess.CANNON | enemy]
+        if not mask:
+            mask = PAWN_CHECKS[enemy][sq] & bitboards[Chess.PAWN | enemy]
+        if not mask:
+            knights = bitboards[Chess.KNIGHT | enemy]
+            for leg, attackers in KNIGHT_CHECKS[sq]:
+                if attackers & knights and not self.occupied & leg:
+                    mask = attackers & knights
+                    break
+        if not mask:
+            return None
+        return self.where((mask & -mask).bit_length() - 1)
+
+    def is_checkmate(self, turn):
+        for fsq in iter_bits(self.sides[turn]):
+            for tsq in self.generate(fsq, turn):
+                undo = self.make_move(fsq, tsq)
+                check = self.get_check(turn)
+                self.unmake_move(undo)
+                if not check:
+                    return False
+        return True
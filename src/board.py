@@ -122,6 +122,10 @@ class Board(QLabel):
         self.mark3.setScaledContents(True)
         self.mark3.setVisible(False)
 
+        # 选中棋子之后可以走的位置标记
+        self.hint_image = mark
+        self.hint_labels = []
+
         self.signal = self.signal_class()
         self.signal.refresh.connect(self.refresh)
 
@@ -131,14 +135,15 @@ class Board(QLabel):
         self.fpos = None
         self.tpos = None
         self.check = None
+        self.hints = []
         self.reverse = False
 
         self.update()
 
         self.callback = callback
 
-    def setBoard(self, board, fpos=None, tpos=None):
-        # 设置 棋盘 board，以及该步，的棋子从哪儿 fpos，到哪儿 tpos
+    def setBoard(self, board, fpos=None, tpos=None, hints=None):
+        # 设置 棋盘 board，以及该步，的棋子从哪儿 fpos，到哪儿 tpos，hints 为提示可以走的位置
         # 由于 该函数可能在多个线程中调用，所以下面触发 signal.refresh
         # QT 会自动将刷新棋盘的重任放到主线程去做
         # 如果直接在非主线程调用 refresh 函数，程序可能莫名其妙的死掉。
@@ -146,6 +151,7 @@ class Board(QLabel):
         self.board = board
         self.fpos = fpos
         self.tpos = tpos
+        self.hints = hints or []
         self.signal.refresh.emit()
 
     def setReverse(self, reverse):
@@ -214,8 +220,33 @@ class Board(QLabel):
         else:
             self.mark3.setVisible(False)
 
+        self.refreshHints()
+
         super().update()
 
+    def refreshHints(self):
+        # 提示标记缩小一半显示在位置中间
+        while len(self.hint_labels) < len(self.hints):
+            label = QLabel(self)
+            label.setPixmap(self.hint_image)
+            label.setScaledContents(True)
+            self.hint_labels.append(label)
+
+        for index, label in enumerate(self.hint_labels):
+            if index >= len(self.hints):
+                label.setVisible(False)
+                continue
+            geometry = self.getChessGeometry(self.hints[index])
+            size = self.csize // 2
+            label.setGeometry(
+                geometry.x() + size // 2,
+                geometry.y() + size // 2,
+                size,
+                size
+            )
+            label.setVisible(True)
+            label.raise_()
+
     def resizeEvent(self, event):
         # 窗口大小变化之后，修改棋盘和棋子的大小
 
@@ -0,0 +1,342 @@
+# coding=utf-8
+'''
+(C) Copyright 2021 Steven;
+@author: Steven kangweibaby@163.com
+@date: 2021-07-23
+开局库，按照局面的 Zobrist 键值查找着法
+
+文件格式，所有整数都是小端:
+
+    文件头 16 字节  magic(4) version(2) 记录大小(2) 记录数(8)
+    记录   16 字节  key(8) move(2) weight(2) learn(2 有符号) games(2)
+
+记录按照 (key, -weight) 排序，同一个局面的着法连续存放，
+文件用 mmap 映射，二分查找第一个 key 相同的记录，不需要载入内存。
+move 的高 7 位是 fsq，低 7 位是 tsq；weight 是出现的次数，
+learn 是走这步的一方的累计胜负 (胜 +1 负 -1)，games 是有结果的对局数。
+
+    python book.py build book.bin manuals/*.txt games.fen --plies 30
+    python book.py probe book.bin "fen ... moves ..."
+
+棋谱文件的格式见 manual.iter_games。
+'''
+
+import os
+import sys
+import mmap
+import random
+import array
+import struct
+import logging
+import argparse
+from dataclasses import dataclass
+
+from chess import Chess
+from logger import logger
+from situation import Situation
+from utils import detect_encoding
+
+MAGIC = b'CCBK'
+VERSION = 1
+
+HEADER = struct.Struct('<4sHHQ')
+RECORD = struct.Struct('<QHHhH')
+KEY = struct.Struct('<Q')
+
+# 默认只收录前 30 回合
+MAX_PLIES = 60
+
+# 对局结果，从红方的角度
+RESULTS = {
+    '1-0': Chess.RED,
+    '0-1': Chess.BLACK,
+    '1/2-1/2': Chess.DRAW,
+}
+
+
+def pack_move(fsq, tsq):
+    return (fsq << 7) | tsq
+
+
+def unpack_move(move):
+    return (move >> 7) & 0x7F, move & 0x7F
+
+
+def replay(sit: Situation, moves):
+    # 只检查着法是否合法，返回打包的着法，sit 会被修改
+    data = array.array('H')
+    for fpos, tpos in moves:
+        if not sit.validate_move(fpos, tpos):
+            raise ValueError(f'invalid move {sit.format_move(fpos, tpos)}')
+        fsq, tsq = sit.square(fpos), sit.square(tpos)
+        sit.make_move(fsq, tsq)
+        data.append(pack_move(fsq, tsq))
+    return data
+
+
+@dataclass(slots=True)
+class BookMove:
+
+    fsq: int
+    tsq: int
+    weight: int
+    learn: int = 0
+    games: int = 0
+
+
+class OpeningBook(object):
+
+    '''
+    只读的开局库，open 的文件不存在或者格式不对时返回 None
+    '''
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.file = open(filename, 'rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, size, count = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION or size != RECORD.size:
+            self.close()
+            raise ValueError(f'invalid book {filename}')
+        if HEADER.size + count * RECORD.size > len(self.data):
+            self.close()
+            raise ValueError(f'truncated book {filename}')
+        self.count = count
+
+    @classmethod
+    def open(cls, filename):
+        if not os.path.exists(filename):
+            return None
+        try:
+            book = cls(filename)
+        except (OSError, ValueError, struct.error) as e:
+            logger.warning("load book %s failed %s", filename, e)
+            return None
+        logger.info("load book %s positions %d", filename, book.count)
+        return book
+
+    def close(self):
+        if self.data is not None:
+            self.data.close()
+            self.data = None
+        self.file.close()
+
+    def __len__(self):
+        return self.count
+
+    def get_key(self, index):
+        return KEY.unpack_from(self.data, HEADER.size + index * RECORD.size)[0]
+
+    def bisect(self, key):
+        # 第一个不小于 key 的记录下标
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.get_key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def lookup(self, key):
+        # 返回局面的所有着法，按权重从大到小
+        result = []
+        index = self.bisect(key)
+        while index < self.count:
+            item, move, weight, learn, games = RECORD.unpack_from(
+                self.data, HEADER.size + index * RECORD.size)
+            if item != key:
+                break
+            fsq, tsq = unpack_move(move)
+            result.append(BookMove(fsq, tsq, weight, learn, games))
+            index += 1
+        return result
+
+    def probe(self, sit: Situation, banmoves=(), rand=random):
+        # 按照权重随机选择一个合法的着法，返回 (fpos, tpos)，没有时返回 None
+        banned = set(banmoves)
+        moves = []
+        for move in self.lookup(sit.key):
+            if (move.fsq, move.tsq) in banned:
+                continue
+            # 键值可能冲突，需要检查着法是否合法
+            fpos, tpos = sit.where(move.fsq), sit.where(move.tsq)
+            if not sit.validate_move(fpos, tpos):
+                continue
+            moves.append((move, fpos, tpos))
+        if not moves:
+            return None
+
+        weights = [max(1, move.weight + move.learn) for move, _, _ in moves]
+        _, fpos, tpos = rand.choices(moves, weights=weights)[0]
+        return fpos, tpos
+
+
+class BookBuilder(object):
+
+    '''
+    统计棋谱中每个局面走过的着法，write 生成开局库文件
+
+    entries 是 {key: {move: [weight, learn, games]}}
+    '''
+
+    def __init__(self, plies=MAX_PLIES):
+        self.plies = plies
+        self.entries = {}
+        self.games = 0
+        self.errors = 0
+
+    def add(self, key, move, turn, winner=None):
+        stats = self.entries.setdefault(key, {}).setdefault(move, [0, 0, 0])
+        stats[0] += 1
+        if winner is None:
+            return
+        stats[2] += 1
+        if winner == turn:
+            stats[1] += 1
+        elif winner != Chess.DRAW:
+            stats[1] -= 1
+
+    def add_moves(self, sit: Situation, moves, winner=None):
+        # 从 sit 开始逐步走子并记录，sit 会被修改
+        # 先检查所有着法，有非法着法的时候整局都不收录
+        moves = moves[:self.plies]
+        start = sit.copy()
+        data = replay(sit, moves)
+        for move in data:
+            fsq, tsq = unpack_move(move)
+            self.add(start.key, move, start.turn, winner)
+            start.make_move(fsq, tsq)
+        self.games += 1
+
+    def add_fen(self, line: str, winner=None):
+        # fen ... moves ... 格式的一局
+        if line.startswith('fen '):
+            line = line[4:]
+        sit = Situation()
+        if not sit.parse_fen(line, load=True):
+            raise ValueError(f'invalid fen {line}')
+        moves = sit.moves
+        sit.moves = []
+        self.add_moves(sit, moves, winner)
+
+    def add_manual(self, content: str, winner=None):
+        # 中文棋谱，由 Manual.parse 解析，只需要前 plies 步
+        from manual import Manual
+
+        manual = Manual(fast=True)
+        moves = []
+
+        def callback(fpos, tpos):
+            moves.append((fpos, tpos))
+
+        manual.callback = callback
+        manual.parse(content)
+        self.add_moves(Situation(), moves, winner)
+
+    def add_content(self, content: str):
+        from manual import iter_games
+
+        for text, result in iter_games(content.splitlines()):
+            self.add_game(text, result)
+
+    def add_game(self, text, result=None):
+        winner = RESULTS.get(result)
+        try:
+            if text.startswith('fen '):
+                self.add_fen(text, winner)
+            else:
+                self.add_manual(text, winner)
+        except Exception as e:
+            self.errors += 1
+            logger.warning("skip game %s", e)
+
+    def records(self):
+        for key in sorted(self.entries):
+            moves = sorted(self.entries[key].items(), key=lambda e: -e[1][0])
+            for move, (weight, learn, games) in moves:
+                yield RECORD.pack(
+                    key, move,
+                    min(weight, 0xFFFF),
+                    max(-0x8000, min(learn, 0x7FFF)),
+                    min(games, 0xFFFF),
+                )
+
+    def write(self, filename):
+        count = sum(len(moves) for moves in self.entries.values())
+        # 先写临时文件，避免正在使用的开局库被写坏
+        temp = f'{filename}.tmp'
+        with open(temp, 'wb') as file:
+            file.write(HEADER.pack(MAGIC, VERSION, RECORD.size, count))
+            for record in self.records():
+                file.write(record)
+        os.replace(temp, filename)
+        logger.info(
+            "write book %s games %d positions %d records %d",
+            filename, self.games, len(self.entries), count
+        )
+        return count
+
+
+def build(args):
+    builder = BookBuilder(plies=args.plies)
+    for filename in args.files:
+        encoding = detect_encoding(filename)
+        with open(filename, encoding=encoding, errors='replace') as file:
+            builder.add_content(file.read())
+    count = builder.write(args.book)
+    print(
+        f'games {builder.games} errors {builder.errors} '
+        f'positions {len(builder.entries)} records {count}'
+    )
+    return 0
+
+
+def probe(args):
+    book = OpeningBook.open(args.book)
+    if not book:
+        print(f'book {args.book} not found')
+        return 1
+
+    sit = Situation()
+    fen = args.fen[4:] if args.fen.startswith('fen ') else args.fen
+    if fen and not sit.parse_fen(fen):
+        print(f'invalid fen {args.fen}')
+        return 1
+
+    for move in book.lookup(sit.key):
+        fpos, tpos = sit.where(move.fsq), sit.where(move.tsq)
+        print(
+            f'{sit.format_move(fpos, tpos)} {sit.get_method(sit.board, fpos, tpos)} '
+            f'weight {move.weight} learn {move.learn} games {move.games}'
+        )
+    book.close()
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='中国象棋开局库')
+    parser.add_argument('-v', '--verbose', action='store_true', help='输出调试日志')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    parser_build = commands.add_parser('build', help='从棋谱生成开局库')
+    parser_build.add_argument('book', help='开局库文件')
+    parser_build.add_argument('files', nargs='+', help='棋谱文件')
+    parser_build.add_argument('--plies', type=int, default=MAX_PLIES, help='每局收录的最大步数')
+    parser_build.set_defaults(func=build)
+
+    parser_probe = commands.add_parser('probe', help='查询局面的开局库着法')
+    parser_probe.add_argument('book', help='开局库文件')
+    parser_probe.add_argument('fen', nargs='?', default='', help='局面，默认是开局')
+    parser_probe.set_defaults(func=probe)
+
+    args = parser.parse_args(argv)
+
+    if not args.verbose:
+        logger.setLevel(logging.WARNING)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,7 +1,6 @@
 # coding=utf-8
-import numpy as np
-
 from logger import logger
+from utils import lazyattr
 
 
 class Chess(object):
@@ -96,22 +95,26 @@ class Chess(object):
     def color(c):
         return c & Chess.TMASK
 
-    ORIGIN = np.mat(
-        np.array(
-            [
-                [r, 0, 0, p, 0, 0, P, 0, 0, R],
-                [n, 0, c, 0, 0, 0, 0, C, 0, N],
-                [b, 0, 0, p, 0, 0, P, 0, 0, B],
-                [a, 0, 0, 0, 0, 0, 0, 0, 0, A],
-                [k, 0, 0, p, 0, 0, P, 0, 0, K],
-                [a, 0, 0, 0, 0, 0, 0, 0, 0, A],
-                [b, 0, 0, p, 0, 0, P, 0, 0, B],
-                [n, 0, c, 0, 0, 0, 0, C, 0, N],
-                [r, 0, 0, p, 0, 0, P, 0, 0, R]
-            ]
-        )
+    ORIGIN_COLUMNS = (
+        (r, 0, 0, p, 0, 0, P, 0, 0, R),
+        (n, 0, c, 0, 0, 0, 0, C, 0, N),
+        (b, 0, 0, p, 0, 0, P, 0, 0, B),
+        (a, 0, 0, 0, 0, 0, 0, 0, 0, A),
+        (k, 0, 0, p, 0, 0, P, 0, 0, K),
+        (a, 0, 0, 0, 0, 0, 0, 0, 0, A),
+        (b, 0, 0, p, 0, 0, P, 0, 0, B),
+        (n, 0, c, 0, 0, 0, 0, C, 0, N),
+        (r, 0, 0, p, 0, 0, P, 0, 0, R),
     )
 
+    # 一维棋盘的初始局面，不需要 numpy
+    ORIGIN_SQUARES = bytes(var for column in ORIGIN_COLUMNS for var in column)
+
+    @lazyattr
+    def ORIGIN():
+        import numpy as np
+        return np.mat(np.array(Chess.ORIGIN_COLUMNS))
+
     MOVE = 1
     CAPTURE = 2
     DRAW = 3
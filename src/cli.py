@@ -0,0 +1,278 @@
+# coding=utf-8
+'''
+(C) Copyright 2021 Steven;
+@author: Steven kangweibaby@163.com
+@date: 2021-07-14
+命令行工具，不依赖界面，用于批量处理局面和棋谱
+
+    python cli.py validate "<fen>"
+    python cli.py moves "<fen>" --method
+    python cli.py manual game.txt
+    python cli.py analyse "<fen>" --depth 5
+    python cli.py analyse "<fen>" --time 1000 --ucci engines/eleeye/eleeye.exe
+
+不指定 FEN 的时候从标准输入按行读取，可以用在管道中。
+只导入 chess, situation, engine 和 manual，numpy 只有在输出中文着法的时候才导入。
+'''
+
+import os
+import sys
+import time
+import logging
+import argparse
+import threading
+
+from chess import Chess
+from logger import logger
+from situation import Situation
+from engine import UCCIEngine
+from manual import Manual
+from utils import detect_encoding
+
+# 每种棋子的最大数量
+LIMITS = {
+    Chess.KING: 1,
+    Chess.ADVISOR: 2,
+    Chess.BISHOP: 2,
+    Chess.KNIGHT: 2,
+    Chess.ROOK: 2,
+    Chess.CANNON: 2,
+    Chess.PAWN: 5,
+}
+
+# 等待 UCCI 引擎输出着法的时候，每隔多少秒检查一次引擎进程是否还在
+POLL_INTERVAL = 0.1
+
+
+def load(fen):
+    # 返回 (局面, 错误信息)
+    sit = Situation()
+    if fen == 'startpos':
+        return sit, None
+    base, _, moves = fen.partition(' moves ')
+    if not sit.parse_fen(base.strip()):
+        return None, 'invalid fen'
+
+    for move in moves.split():
+        result = sit.move(*sit.parse_move(move))
+        if not result or result == Chess.INVALID:
+            return None, f'invalid move {move}'
+    return sit, None
+
+
+def validate(sit):
+    # 检查局面是否可能出现，返回错误信息，合法返回 None
+    counts = {}
+    for sq, chess in enumerate(sit.squares):
+        if not chess:
+            continue
+        counts[chess] = counts.get(chess, 0) + 1
+        if counts[chess] > LIMITS[chess & Chess.CMASK]:
+            return f'too many {Chess.NAMES[chess]}'
+
+    for turn in (Chess.RED, Chess.BLACK):
+        king = sit.get_king(turn)
+        if king is None:
+            return f'missing {Chess.NAMES[Chess.KING | turn]}'
+
+    if sit.get_check(Chess.invert(sit.turn)):
+        return 'side not to move is in check'
+    return None
+
+
+def get_inputs(fens):
+    if fens:
+        return fens
+    return [line.strip() for line in sys.stdin if line.strip()]
+
+
+def format_move(sit, fsq, tsq, method=False):
+    fpos, tpos = sit.where(fsq), sit.where(tsq)
+    move = sit.format_move(fpos, tpos)
+    if method:
+        move = f'{move} {sit.get_method(sit.board, fpos, tpos)}'
+    return move
+
+
+def command_validate(args):
+    result = 0
+    for fen in get_inputs(args.fen):
+        sit, error = load(fen)
+        if not error:
+            error = validate(sit)
+        if error:
+            result = 1
+            print(f'invalid {error}: {fen}')
+        else:
+            print(f'ok {sit.format_current_fen()}')
+    return result
+
+
+def command_moves(args):
+    result = 0
+    for fen in get_inputs(args.fen):
+        sit, error = load(fen)
+        if error:
+            result = 1
+            print(f'invalid {error}: {fen}')
+            continue
+        moves = [format_move(sit, fsq, tsq, args.method) for fsq, tsq in sit.legal_moves()]
+        if args.method:
+            print('\n'.join(moves))
+        else:
+            print(' '.join(moves))
+    return result
+
+
+def read_manual(filename):
+    # 棋谱可能是 utf8 或者 gbk
+    if filename == '-':
+        data = sys.stdin.buffer.read()
+        try:
+            return data.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            return data.decode('gbk', errors='replace')
+
+    with open(filename, encoding=detect_encoding(filename), errors='replace') as file:
+        return file.read()
+
+
+def command_manual(args):
+    content = read_manual(args.file)
+
+    manual = Manual()
+    try:
+        manual.parse(content)
+    except Exception as e:
+        print(e)
+        return 1
+
+    if args.current:
+        print(manual.sit.format_current_fen())
+    else:
+        print(manual.sit.format_fen())
+    return 0
+
+
+def analyse_native(sit, args):
+    from search import Search
+
+    def callback(depth, score, nodes, elapsed, pv):
+        moves = ' '.join(format_move(sit, fsq, tsq) for fsq, tsq in pv)
+        nps = int(nodes / elapsed) if elapsed else 0
+        print(f'info depth {depth} score {score} time {int(elapsed * 1000)} nodes {nodes} nps {nps} pv {moves}')
+
+    searcher = Search(args.hashsize)
+    move = searcher.search(sit, depth=args.depth, movetime=args.time, callback=callback)
+    if move is None:
+        return None
+    return format_move(sit, *move)
+
+
+def analyse_ucci(sit, args):
+    finished = threading.Event()
+    result = []
+
+    def callback(type, data):
+        if type == Chess.INFO:
+            print(data)
+            return
+        if type == Chess.MOVE:
+            result.append(sit.format_move(*data))
+        finished.set()
+
+    try:
+        engine = UCCIEngine(args.ucci, callback=callback)
+    except OSError as e:
+        raise RuntimeError(f'engine not started {e}')
+    engine.start()
+
+    # 引擎崩溃或者一直不输出着法的时候不能一直等待
+    deadline = time.monotonic() + args.timeout + (args.time or 0) / 1000
+    try:
+        engine.set_hashsize(args.hashsize)
+        engine.position(sit.format_fen())
+        engine.go(depth=args.depth, time=args.time)
+        while not finished.wait(POLL_INTERVAL):
+            if engine.pipe.poll() is not None:
+                raise RuntimeError(f'engine exited with code {engine.pipe.returncode}')
+            if time.monotonic() > deadline:
+                raise RuntimeError('engine timeout')
+    finally:
+        engine.close()
+    return result[0] if result else None
+
+
+def command_analyse(args):
+    if not args.depth and not args.time:
+        args.depth = 4
+
+    result = 0
+    for fen in get_inputs(args.fen):
+        sit, error = load(fen)
+        if error:
+            result = 1
+            print(f'invalid {error}: {fen}')
+            continue
+        try:
+            if args.ucci:
+                move = analyse_ucci(sit, args)
+            else:
+                move = analyse_native(sit, args)
+        except RuntimeError as e:
+            result = 1
+            print(f'error {e}: {fen}')
+            continue
+        if move is None:
+            print('nobestmove')
+        else:
+            print(f'bestmove {move}')
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='中国象棋命令行工具')
+    parser.add_argument('-v', '--verbose', action='store_true', help='输出调试日志')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    command = commands.add_parser('validate', help='检查 FEN 是否合法')
+    command.add_argument('fen', nargs='*')
+    command.set_defaults(func=command_validate)
+
+    command = commands.add_parser('moves', help='列出所有合法着法')
+    command.add_argument('fen', nargs='*')
+    command.add_argument('--method', action='store_true', help='同时输出中文着法')
+    command.set_defaults(func=command_moves)
+
+    command = commands.add_parser('manual', help='将中文棋谱转换成 FEN')
+    command.add_argument('file', help='棋谱文件，- 表示标准输入')
+    command.add_argument('--current', action='store_true', help='输出最终局面，不带着法')
+    command.set_defaults(func=command_manual)
+
+    command = commands.add_parser('analyse', help='引擎分析')
+    command.add_argument('fen', nargs='*')
+    command.add_argument('--depth', type=int, help='搜索深度')
+    command.add_argument('--time', type=int, help='搜索时间，毫秒')
+    command.add_argument('--hashsize', type=int, default=16, help='置换表大小 MB')
+    command.add_argument('--ucci', help='UCCI 引擎路径，默认使用内置引擎')
+    command.add_argument('--timeout', type=float, default=60, help='等待 UCCI 引擎输出着法的秒数，不包括 --time')
+    command.set_defaults(func=command_analyse)
+
+    args = parser.parse_args(argv)
+    if not args.verbose:
+        logger.setLevel(logging.WARNING)
+
+    try:
+        result = args.func(args)
+        sys.stdout.flush()
+    except BrokenPipeError:
+        # 输出到 | head 之类的管道，对方提前关闭了，
+        # 标准输出重定向到 devnull，避免退出时 flush 再次出错
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        return 1
+    return result
+
+
+if __name__ == '__main__':
+    sys.exit(main())
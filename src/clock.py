@@ -0,0 +1,170 @@
+# coding=utf-8
+'''
+(C) Copyright 2021 Steven;
+@author: Steven kangweibaby@163.com
+@date: 2021-07-22
+对局时钟，每一方有自己的剩余时间，支持每步加秒和限着
+
+    clock = GameClock()
+    clock.configure(300000, 300000, increment=2000)
+    clock.start(Chess.RED)
+    clock.press(Chess.RED)      # 红方走完，开始计黑方的时间
+    engine.go(**clock.get_params(Chess.BLACK))
+
+时间的单位都是毫秒。时钟本身不计时，剩余时间根据开始计时的时刻计算，
+界面用 QTimer 定时刷新显示和检查超时。
+'''
+
+import time
+import threading
+
+from chess import Chess
+from utils import attrdict
+
+# 分配时间的时候留出的余量，用于进程通信和界面刷新
+MARGIN = 100
+# 包干制没有限着，按照还要走这么多步分配时间
+MOVES_HORIZON = 30
+
+
+def allocate(remain, movestogo=None, increment=None):
+    # 根据剩余时间分配这一步可以用的时间
+    moves = movestogo or MOVES_HORIZON
+    budget = remain // moves + (increment or 0)
+    # 不能超过剩余时间，时间很少的时候至少留一半
+    limit = max(remain - MARGIN, remain // 2)
+    return max(1, min(budget, limit))
+
+
+def format_time(millisec):
+    seconds = max(0, int(millisec + 999) // 1000)
+    minutes, seconds = divmod(seconds, 60)
+    if minutes >= 60:
+        hours, minutes = divmod(minutes, 60)
+        return f'{hours}:{minutes:02d}:{seconds:02d}'
+    return f'{minutes:02d}:{seconds:02d}'
+
+
+class GameClock(object):
+
+    '''
+    turn 是正在计时的一方，为 None 时时钟停止
+    movestogo 大于 0 时每走 movestogo 步，这一方再获得一次初始时间
+    '''
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.config = None
+        self.configure(0, 0)
+
+    @property
+    def enabled(self):
+        return any(self.bases.values())
+
+    def configure(self, red, black, increment=0, movestogo=0):
+        self.config = (red, black, increment, movestogo)
+        self.bases = {
+            Chess.RED: red,
+            Chess.BLACK: black,
+        }
+        self.increment = increment
+        self.movestogo = movestogo
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.remains = dict(self.bases)
+            # 当前时段已经走的步数
+            self.moves = {
+                Chess.RED: 0,
+                Chess.BLACK: 0,
+            }
+            self.turn = None
+            self.started = None
+            self.flagged = None
+
+    def _stop(self, now=None):
+        if self.turn is None:
+            return
+        if now is None:
+            now = time.perf_counter()
+        elapsed = max(0, now - self.started) * 1000
+        self.remains[self.turn] -= elapsed
+        self.turn = None
+        self.started = None
+
+    def start(self, turn):
+        if not self.enabled:
+            return
+        with self.lock:
+            if self.flagged is not None:
+                return
+            self._stop()
+            self.turn = turn
+            self.started = time.perf_counter()
+
+    def stop(self, now=None):
+        # now 是 time.perf_counter() 的时刻，比如收到引擎着法的时候，
+        # 之后转到界面线程处理的时间不计入用时
+        with self.lock:
+            self._stop(now)
+
+    def switch(self, turn):
+        # 悔棋之后改为计走棋方的时间，时钟停止的时候不启动
+        if self.turn is None or self.turn == turn:
+            return
+        self.start(turn)
+
+    def press(self, turn):
+        # turn 走完一步，加秒并且开始计对方的时间
+        if not self.enabled:
+            return
+        with self.lock:
+            if self.flagged is not None:
+                return
+            self._stop()
+            self.remains[turn] += self.increment
+            self.moves[turn] += 1
+            if self.movestogo and self.moves[turn] >= self.movestogo:
+                self.moves[turn] = 0
+                self.remains[turn] += self.bases[turn]
+        self.start(Chess.invert(turn))
+
+    def remaining(self, turn):
+        with self.lock:
+            remain = self.remains[turn]
+            if self.turn == turn:
+                remain -= (time.perf_counter() - self.started) * 1000
+            return remain
+
+    def check(self):
+        # 检查是否超时，返回超时的一方
+        if self.turn is None:
+            return None
+        turn = self.turn
+        if self.remaining(turn) > 0:
+            return None
+        with self.lock:
+            self._stop()
+            self.flagged = turn
+        return turn
+
+    def get_params(self, turn):
+        # 生成 go 的参数，time 是剩余时间，由引擎分配这一步的时间
+        other = Chess.invert(turn)
+        params = attrdict()
+        params.time = max(1, int(self.remaining(turn)))
+        params.opptime = max(1, int(self.remaining(other)))
+        if self.increment:
+            params.increment = self.increment
+            params.oppincrement = self.increment
+        if self.movestogo:
+            params.movestogo = self.movestogo - self.moves[turn]
+            params.oppmovestogo = self.movestogo - self.moves[other]
+        elif not self.increment:
+            # 只有 time 的时候很多引擎把它当作这一步的时间
+            params.movestogo = MOVES_HORIZON
+        return params
+
+    def format(self, turn):
+        return format_time(self.remaining(turn))
@@ -0,0 +1,73 @@
+'''
+(C) Copyright 2021 Steven;
+@author: Steven kangweibaby@163.com
+@date: 2021-07-21
+'''
+
+from PySide6 import QtWidgets
+from PySide6 import QtCore
+from PySide6.QtCore import Qt
+
+if __name__ == '__main__':
+    import base
+
+from analysis import Analyser
+from ui.analysis import Ui_Dialog
+from dialogs.base import BaseDialog
+
+
+class AnalysisDialog(BaseDialog):
+
+    # 每秒刷新的次数，引擎输出再快也只按这个频率更新界面
+    FPS = 10
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+
+        self.analyser = Analyser()
+        self.standard = False
+
+        self.ui = Ui_Dialog()
+        self.ui.setupUi(self)
+        self.list = self.ui.listwidget
+        self.status = self.ui.status
+
+        self.setWindowTitle("分析")
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.setInterval(1000 // self.FPS)
+        self.timer.timeout.connect(self.refresh)
+
+    def start(self, engine):
+        self.analyser.attach(engine)
+        self.status.setText(engine.NAME)
+        self.timer.start()
+        self.show()
+
+    def stop(self):
+        # 返回分析使用的引擎
+        self.timer.stop()
+        engine = self.analyser.detach()
+        self.list.clear()
+        self.status.setText('')
+        self.hide()
+        return engine
+
+    def refresh(self):
+        lines = self.analyser.format_lines(self.standard)
+        if lines is None:
+            return
+
+        for index, (depth, score, pv) in enumerate(lines):
+            item = self.list.item(index)
+            if not item:
+                item = QtWidgets.QListWidgetItem(self.list)
+                item.setFlags(Qt.ItemIsSelectable | Qt.ItemIsEnabled)
+            item.setText(f'{depth:>2} {score:>6} {pv}')
+
+        while self.list.count() > len(lines):
+            self.list.takeItem(len(lines))
+
+    def set_standard(self, standard: bool):
+        self.standard = bool(standard)
+        self.analyser.dirty = True
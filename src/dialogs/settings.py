@@ -59,6 +59,14 @@ class SettingsDialog(BaseDialog):
 
         'red_time': 1000,
         'black_time': 1000,
+        'red_clock': 10,
+        'black_clock': 10,
+        'increment': 0,
+        'movestogo': 0,
+        'hashsize': 16,
+        'threads': 1,
+        'ponder': False,
+        'book': True,
         'qqboard': [842, 230, 1196, 1330],
         'ontop': False,
     }
@@ -69,6 +77,7 @@ class SettingsDialog(BaseDialog):
 
     MODE_DEPTH = 0
     MODE_TIME = 1
+    MODE_CLOCK = 2
 
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -116,6 +125,18 @@ class SettingsDialog(BaseDialog):
             self.black_depth.setEnabled(False)
             self.red_time.setEnabled(True)
             self.black_time.setEnabled(True)
+        elif mode == self.MODE_CLOCK:
+            # 时钟制，使用单独的每一方总时间
+            self.red_depth.setEnabled(False)
+            self.black_depth.setEnabled(False)
+            self.red_time.setEnabled(False)
+            self.black_time.setEnabled(False)
+
+        clock = mode == self.MODE_CLOCK
+        self.red_clock.setEnabled(clock)
+        self.black_clock.setEnabled(clock)
+        self.increment.setEnabled(clock)
+        self.movestogo.setEnabled(clock)
 
     def get_engine_box(self, turn) -> QtWidgets.QComboBox:
         if turn == Chess.RED:
@@ -208,10 +229,22 @@ class SettingsDialog(BaseDialog):
             else:
                 params.time = self.black_time.value()
                 params.opptime = self.red_time.value()
+        elif mode == self.MODE_CLOCK:
+            # 时钟制的参数由对局时钟生成
+            raise Exception("clock mode params come from game clock")
         else:
             raise Exception("invalid engine mode")
         return params
 
+    def get_clock(self):
+        # 时钟制的 (红方时间, 黑方时间, 每步加秒, 限着步数)，时间单位为毫秒
+        return (
+            self.red_clock.value() * 60000,
+            self.black_clock.value() * 60000,
+            self.increment.value() * 1000,
+            self.movestogo.value(),
+        )
+
     def loads(self):
         import json
         filename = self.get_filename()
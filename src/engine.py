@@ -16,12 +16,13 @@ import traceback
 from pathlib import Path
 import re
 import queue
-import copy
 
 from utils import attrdict
 from logger import logger
 from chess import Chess
 from situation import Situation
+from repetition import Repetition
+from stats import SearchStats
 
 import system
 
@@ -41,6 +42,10 @@ class Queue(queue.Queue):
         1. 交互线程 (目前是主线程) 首先向队列 put 下面的 mark，然后进入 wait
         2. 当解析线程读到 mark 的时候，notify 通知交互线程读取队列，自己进入 wait 等待交互完成
         3. 交互线程完成之后，notify 通知解析线程继续解析。
+
+    引擎退出的时候队列里是 None，解析线程已经退出，交互线程不再等待。
+
+    depth 是队列中还没有解析的行数，peak 是最大的积压行数，用于观察解析是否跟得上输出。
     '''
 
     mark = 'a3c63f6d-a880-4bde-a176-82af83bcf793'
@@ -48,28 +53,64 @@ class Queue(queue.Queue):
     def __init__(self, maxsize=0):
         super().__init__(maxsize)
         self.condition = threading.Condition()
+        self.paused = False
+        self.closed = False
+        self.depth = 0
+        self.peak = 0
+
+    def _put(self, item):
+        # 在 mutex 中调用
+        super()._put(item)
+        if item is None:
+            self.closed = True
+        elif isinstance(item, list):
+            self.depth += len(item)
+            self.peak = max(self.peak, self.depth)
+
+    def _get(self):
+        item = super()._get()
+        if isinstance(item, list):
+            self.depth -= len(item)
+        return item
+
+    def reset_peak(self):
+        # 返回之前的最大积压行数，重新开始统计
+        with self.mutex:
+            peak = self.peak
+            self.peak = self.depth
+            return peak
 
     def __enter__(self):
         self.condition.acquire()
+        if self.closed:
+            return
         self.put(self.mark)
-        self.condition.wait()
+        # 引擎退出的时候解析线程不会再读取 mark，定时检查避免一直等待
+        while not self.paused and not self.closed:
+            self.condition.wait(0.1)
 
     def get(self, block=True, timeout=None):
         while True:
             line = super().get(block=block, timeout=timeout)
             if line != self.mark:
                 return line
+            if self.closed:
+                # 解析线程已经退出，剩下的 mark 直接丢弃
+                continue
             with self.condition:
+                self.paused = True
                 self.condition.notify()
-                self.condition.wait()
+                while self.paused:
+                    self.condition.wait()
                 continue
 
     def __exit__(self, exc_type, exc_value, traceback):
+        self.paused = False
         self.condition.notify()
         self.condition.release()
 
 
-class Engine(threading.Thread):
+class Engine(threading.Thread, Repetition):
 
     ENGINE_BOOT = 0
     ENGINE_IDLE = 1
@@ -87,15 +128,31 @@ class Engine(threading.Thread):
 
         self.sit = Situation()
         self.stack = [self.sit]
+        self.positions = {}
 
         self.index = 0
         self.running = False
         self.usemillisec = True
         self.millisec = 1
 
+        # 最近一次 bestmove 给出的后台思考着法
+        self.pondermove = None
+
+        # 搜索统计
+        self.stats = SearchStats()
+
     def callback(self, type, data):
         pass
 
+    @property
+    def backlog(self):
+        # 还没有解析的输出行数，没有输出队列的引擎总是 0
+        return 0
+
+    def reset_backlog(self):
+        # 返回之前的最大积压行数，重新开始统计
+        return 0
+
     @property
     def checkmate(self):
         return self.sit.result == Chess.CHECKMATE
@@ -130,7 +187,8 @@ class Engine(threading.Thread):
         else:
             self.stack = self.stack[:self.index + 1]
 
-        sit = copy.deepcopy(self.sit)
+        # sit.move 会检查着法，这里不再单独检查
+        sit = self.sit.copy()
 
         result = sit.move(fpos, tpos)
         sit.result = result
@@ -139,9 +197,13 @@ class Engine(threading.Thread):
             return result
 
         if result != Chess.INVALID:
+            # 生成中文着法需要整个棋盘的矩阵，只在调试的时候输出
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("get method %s", self.sit.get_method(self.sit.board, fpos, tpos))
             self.stack.append(sit)
             self.sit = sit
             self.index += 1
+            self.record(self.index)
         else:
             self.sit.check = sit.check
 
@@ -177,21 +239,63 @@ class Engine(threading.Thread):
     def position(self, fen=None):
         return
 
+    def clearhash(self):
+        # 清空置换表，新的对局开始时调用
+        return
+
+    def set_hashsize(self, size):
+        # 设置置换表大小，单位 MB
+        return
+
+    def set_threads(self, threads):
+        # 设置搜索的线程数
+        return
+
+    def set_multipv(self, count):
+        # 设置同时输出的主要变例数，不支持的引擎忽略
+        return
+
+    def subscribe(self, instruct, enabled=True):
+        # 设置是否需要某个指令的输出
+        return
+
+    def ponderhit(self, draw=False):
+        # 对方走了后台思考的着法，继续搜索
+        return
+
+    def stop(self):
+        return
+
     def go(self, depth=None, nodes=None,
            time=None, movestogo=None, increment=None,
            opptime=None, oppmovestogo=None, oppincrement=None,
-           draw=None, ponder=None):
+           draw=None, ponder=None, infinite=None):
         return
 
 
 class PipeEngine(Engine):
 
+    # 逐行记录引擎的输入输出，大量 info 输出的时候很慢，默认关闭
+    VERBOSE = bool(os.environ.get('CHESS_ENGINE_LOG'))
+
+    # 每次读取的最大字节数
+    CHUNK_SIZE = 1 << 16
+
     def __init__(self, filename: Path):
         super().__init__()
 
         self.filename = filename
         self.dirname = os.path.dirname(filename)
         self.pipe = None
+        self.verbose = self.VERBOSE
+
+        # 握手完成之后确定的编码，之前逐行尝试 gbk 和 utf8
+        self.encoding = None
+        self.fallback = False
+        self.buffer = b''
+
+        # 没有订阅的指令，读取之后直接丢弃，不进入解析线程
+        self.ignored = ()
 
         self.parser_thread = threading.Thread(
             target=self.parser,
@@ -210,36 +314,61 @@ class PipeEngine(Engine):
         self.parser_thread.join()
         self.join()
 
+    @property
+    def backlog(self):
+        return self.outlines.depth
+
+    def reset_backlog(self):
+        return self.outlines.reset_peak()
+
     def parse_line(self, line: str):
         # 具体解析的代码，子类实现
         pass
 
+    def subscribe(self, instruct, enabled=True):
+        # 设置是否需要某个指令的输出，比如没有人关心 info 的时候可以忽略
+        prefix = instruct.encode()
+        ignored = set(self.ignored)
+        if enabled:
+            ignored.discard(prefix)
+        else:
+            ignored.add(prefix)
+        self.ignored = tuple(ignored)
+
     def run(self):
-        # 引擎有两个线程，自己读取引擎的输出，按行 put 到队列
+        # 引擎有两个线程，自己按块读取引擎的输出，每次把读到的所有行 put 到队列
         # 解析线程 从队列读取输出，进行解析
 
         self.running = True
         self.parser_thread.start()
 
         while self.running:
-            line = self.readline()
-            self.outlines.put(line)
+            lines = self.readlines()
+            self.outlines.put(lines)
+            if lines is None:
+                break
 
     def parser(self):
         # 解析线程
 
         self.running = True
         while self.running:
-            line = self.outlines.get()
-            try:
-                self.parse_line(line)
-            except Exception:
-                logger.error(traceback.format_exc())
+            lines = self.outlines.get()
+            if lines is None:
+                # 放回去让交互线程也能读到引擎退出
+                self.outlines.put(None)
+                break
+            for line in lines:
+                try:
+                    self.parse_line(line)
+                except Exception:
+                    logger.error(traceback.format_exc())
 
     def send_command(self, command):
         # 向引擎写入指令
         try:
-            logger.info("COMMAND: %s", command)
+            if self.verbose:
+                logger.info("COMMAND: %s", command)
             line = f'{command}\n'.encode('gbk')
             self.stdin.write(line)
             self.stdin.flush()
@@ -247,26 +376,67 @@ class PipeEngine(Engine):
             logger.error("send command error %s", e)
             logger.error(traceback.format_exc())
 
-    def decode(self, line):
+    @staticmethod
+    def decode(line):
         try:
             return line.decode("gbk")
         except UnicodeDecodeError:
-            return line.decode("utf8")
+            return line.decode("utf8", errors='replace')
 
-    def readline(self):
-        # 从引擎标准输出读取一行
+    def read_chunk(self):
+        try:
+            return self.stdout.read1(self.CHUNK_SIZE)
+        except (OSError, ValueError):
+            return b''
+
+    def readlines(self):
+        # 从引擎标准输出读取完整的行，引擎退出时返回 None
 
         while True:
-            try:
-                line = self.stdout.readline().strip()
-                line = self.decode(line)
-                if not line:
-                    return ""
-                logger.info("OUTPUT: %s", line)
-                return line
-            except Exception as e:
-                logger.error(traceback.format_exc())
+            chunk = self.read_chunk()
+            if not chunk:
+                return None
+
+            index = chunk.rfind(b'\n')
+            if index < 0:
+                self.buffer += chunk
                 continue
+            block = self.buffer + chunk[:index]
+            self.buffer = chunk[index + 1:]
+
+            lines = self.decode_lines(block.split(b'\n'))
+            if lines:
+                return lines
+
+    def decode_lines(self, lines):
+        if self.ignored:
+            lines = [line for line in lines if not line.startswith(self.ignored)]
+        if not lines:
+            return []
+
+        if self.encoding:
+            # 换行符不会出现在 gbk 和 utf8 的多字节字符中，整块解码之后再分行
+            text = b'\n'.join(lines).decode(self.encoding, errors='replace')
+            result = [line.strip() for line in text.split('\n')]
+        else:
+            result = []
+            for line in lines:
+                try:
+                    result.append(line.decode('gbk').strip())
+                except UnicodeDecodeError:
+                    self.fallback = True
+                    result.append(line.decode('utf8', errors='replace').strip())
+            self.detect_encoding(result)
+
+        result = [line for line in result if line]
+        if self.verbose:
+            for line in result:
+                logger.info("OUTPUT: %s", line)
+        return result
+
+    def detect_encoding(self, lines):
+        # 握手结束时确定编码，子类实现
+        pass
 
     def clear(self):
         # 清空引擎输出
@@ -274,9 +444,17 @@ class PipeEngine(Engine):
         with self.outlines:
             while True:
                 try:
-                    self.outlines.get_nowait()
+                    lines = self.outlines.get_nowait()
                 except queue.Empty:
                     return
+                if lines is None:
+                    # 保留引擎退出的标记
+                    self.outlines.put(None)
+                    return
+
+    def get_command(self):
+        # 启动引擎的命令行，子类可以添加解释器或者参数
+        return [str(self.filename)]
 
     def setup(self):
         # 初始化引擎
@@ -289,7 +467,7 @@ class PipeEngine(Engine):
             startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
 
         self.pipe = subprocess.Popen(
-            [str(self.filename)],
+            self.get_command(),
             stdin=subprocess.PIPE,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
@@ -308,30 +486,29 @@ class UCCIEngine(PipeEngine):
     def __init__(self, filename, callback=None):
         self.ids = attrdict()
         self.options = attrdict()
+        # 握手完成之前设置的选项，收到 ucciok 之后再发送
+        self.pending = {}
+        self.option_lock = threading.Lock()
         self.callback = callback
         super().__init__(filename)
 
     def setup(self):
         super().setup()
+        # 握手的输出由解析线程处理，收到 ucciok 之后状态变为 ENGINE_IDLE
         self.send_command('ucci')
 
-        while self.running:
-            self.send_command('ucci')
-            line = self.readline()
-            if not line:
-                continue
-            try:
-                self.parse_line(line)
-            except Exception:
-                logger.error(traceback.format_exc())
-            if self.state == self.ENGINE_IDLE:
-                break
+    def detect_encoding(self, lines):
+        if 'ucciok' not in lines:
+            return
+        self.encoding = 'utf8' if self.fallback else 'gbk'
+        logger.info("engine %s output encoding %s", self.filename, self.encoding)
 
     def close(self):
         self.send_command('quit')
         return super().close()
 
-    def parse_option(self, message: str):
+    @staticmethod
+    def parse_option(message: str):
         message = re.sub(' +', ' ', message)
         items = message.split()
         option = attrdict()
@@ -358,7 +535,7 @@ class UCCIEngine(PipeEngine):
         if option not in self.options:
             logger.warning("option %s not supported!!!", option)
             return
-        self.options[option].value = value
+        self.options[option].value = str(value)
         command = f'setoption {option} {value}'
         self.send_command(command)
 
@@ -383,6 +560,53 @@ class UCCIEngine(PipeEngine):
 
         self.send_command(command)
 
+    def clearhash(self):
+        if 'clearhash' not in self.options:
+            return
+        self.send_command('setoption clearhash')
+
+    def find_option(self, name):
+        # 有的引擎用 UCI 风格的选项名，比如 MultiPV，不区分大小写查找
+        if name in self.options:
+            return name
+        for key in self.options:
+            if key.lower() == name.lower():
+                return key
+        return None
+
+    def update_option(self, name, value):
+        # 引擎支持并且值有变化的时候才发送
+        name = self.find_option(name)
+        if name is None:
+            return
+        if self.options[name].get('value') == str(value):
+            return
+        self.set_option(name, value)
+
+    def apply_option(self, name, value):
+        # 启动之后马上设置的时候还不知道引擎支持哪些选项，先保存起来
+        with self.option_lock:
+            if self.state == self.ENGINE_BOOT:
+                self.pending[name] = value
+                return
+        self.update_option(name, value)
+
+    def flush_options(self):
+        with self.option_lock:
+            self.state = self.ENGINE_IDLE
+            pending, self.pending = self.pending, {}
+        for name, value in pending.items():
+            self.update_option(name, value)
+
+    def set_hashsize(self, size):
+        self.apply_option('hashsize', size)
+
+    def set_threads(self, threads):
+        self.apply_option('threads', threads)
+
+    def set_multipv(self, count):
+        self.apply_option('multipv', count)
+
     def banmoves(self, moves: list):
         if not moves:
             return
@@ -392,46 +616,66 @@ class UCCIEngine(PipeEngine):
     def go(self, depth=None, nodes=None,
            time=None, movestogo=None, increment=None,
            opptime=None, oppmovestogo=None, oppincrement=None,
-           draw=None, ponder=None):
+           draw=None, ponder=None, infinite=None):
 
+        command = self.format_go(
+            self.millisec, depth=depth, nodes=nodes,
+            time=time, movestogo=movestogo, increment=increment,
+            opptime=opptime, oppmovestogo=oppmovestogo, oppincrement=oppincrement,
+            draw=draw, ponder=ponder, infinite=infinite,
+        )
+        if not command:
+            return
+
+        self.stats.new_search()
+        self.send_command(command)
+        self.state = self.ENGINE_BUSY
+
+    @staticmethod
+    def format_go(millisec, depth=None, nodes=None,
+                  time=None, movestogo=None, increment=None,
+                  opptime=None, oppmovestogo=None, oppincrement=None,
+                  draw=None, ponder=None, infinite=None):
+        # 生成 go 指令，时间的单位是毫秒，没有任何限制的时候返回 None
         command = "go"
         if draw:
             command += ' draw'
         elif ponder:
             command += ' ponder'
 
-        if depth:
+        if infinite:
+            # 分析模式，直到 stop 才输出着法
+            command += ' infinite'
+        elif depth:
             command += f' depth {depth}'
         elif nodes:
-            command += f' nodes {depth}'
+            command += f' nodes {nodes}'
         elif time:
-            time //= self.millisec
+            time //= millisec
             command += f' time {time}'
 
             if increment:
-                increment //= self.millisec
+                increment //= millisec
                 command += f' increment {increment}'
             elif movestogo:
                 command += f' movestogo {movestogo}'
             elif opptime:
-                opptime //= self.millisec
+                opptime //= millisec
                 command += f' opptime {opptime}'
             if oppincrement:
-                oppincrement //= self.millisec
+                oppincrement //= millisec
                 command += f' oppincrement {oppincrement}'
             elif oppmovestogo:
                 command += f' oppmovestogo {oppmovestogo}'
         else:
-            return
-
-        self.send_command(command)
-        self.state = self.ENGINE_BUSY
+            return None
+        return command
 
     def ponderhit(self, draw=False):
         var = ''
         if draw:
             var = 'draw'
-        command = f"ponderhint {var}"
+        command = f"ponderhit {var}".strip()
         self.send_command(command)
 
     def probe(self, fen, moves=None):
@@ -448,12 +692,17 @@ class UCCIEngine(PipeEngine):
 
     def isready(self):
         self.clear()
-        self.send_command("isready")
         with self.outlines:
-            line = self.outlines.get()
-            if line == 'readyok':
-                return True
-            return False
+            # 解析线程暂停之后再发送，否则 readyok 可能被解析线程读走
+            self.send_command("isready")
+            while True:
+                lines = self.outlines.get()
+                if lines is None:
+                    # 放回去让解析线程也能退出
+                    self.outlines.put(None)
+                    return False
+                if 'readyok' in lines:
+                    return True
 
     def parse_line(self, line: str):
         items = line.split(maxsplit=1)
@@ -467,7 +716,7 @@ class UCCIEngine(PipeEngine):
             return
 
         if instruct == 'ucciok':
-            self.state = self.ENGINE_IDLE
+            self.flush_options()
             return
 
         if instruct in {'id', 'option', 'info', 'pophash', 'bestmove'}:
@@ -481,6 +730,7 @@ class UCCIEngine(PipeEngine):
                 return
 
             if instruct == 'info':
+                self.stats.update(line)
                 if callable(self.callback):
                     self.callback(Chess.INFO, line)
                 return
@@ -490,6 +740,7 @@ class UCCIEngine(PipeEngine):
                 return
 
         self.state = self.ENGINE_IDLE
+        self.stats.finish()
 
         type = None
         data = None
@@ -499,11 +750,14 @@ class UCCIEngine(PipeEngine):
             type = Chess.MOVE
             data = self.sit.parse_move(moves[0])
 
-            if len(items) > 2:
-                if items[2] == 'draw':
-                    type = Chess.DRAW
-                if items[2] == 'resign':
-                    type = Chess.RESIGN
+            # bestmove h2e2 ponder h9g7 draw
+            self.pondermove = None
+            if len(moves) > 2 and moves[1] == 'ponder':
+                self.pondermove = moves[2]
+            if 'draw' in moves[1:]:
+                type = Chess.DRAW
+            if 'resign' in moves[1:]:
+                type = Chess.RESIGN
 
         elif instruct == 'nobestmove':
             if self.sit.idle > 100:
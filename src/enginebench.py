@@ -0,0 +1,135 @@
+# coding=utf-8
+'''
+(C) Copyright 2021 Steven;
+@author: Steven kangweibaby@163.com
+@date: 2021-07-20
+引擎管道的性能测试，使用 fake.py 的测试引擎，不依赖界面和引擎可执行文件
+
+    python enginebench.py
+    python enginebench.py --lines 200000 --rounds 500
+
+startup    启动进程到 ucci 握手完成的时间
+latency    go 到收到 bestmove 回调的往返时间，测试引擎不输出 info
+throughput 一次 go 输出大量 info 行，回调收到的行数每秒
+filtered   同样的输出，不订阅 info 的时候读取的行数每秒
+
+吞吐量测试同时输出解析队列的最大积压行数，积压越多说明解析跟不上引擎的输出。
+'''
+
+import sys
+import time
+import logging
+import argparse
+import threading
+import statistics
+
+from chess import Chess
+from engine import Engine
+from logger import logger
+from fake import FakeEngine
+
+
+class Collector(object):
+
+    # 统计回调收到的 info 行数，bestmove 时通知等待的线程
+
+    def __init__(self):
+        self.lines = 0
+        self.done = threading.Event()
+
+    def callback(self, type, data):
+        if type == Chess.INFO:
+            self.lines += 1
+            return
+        self.done.set()
+
+
+def wait_idle(engine, timeout=10):
+    deadline = time.perf_counter() + timeout
+    while engine.state != Engine.ENGINE_IDLE:
+        if time.perf_counter() > deadline:
+            raise TimeoutError('engine handshake timeout')
+        time.sleep(0.001)
+
+
+def bench_startup(rounds=5):
+    result = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        engine = FakeEngine(infos=0)
+        engine.start()
+        wait_idle(engine)
+        result.append(time.perf_counter() - start)
+        engine.close()
+    return result
+
+
+def bench_latency(rounds=200):
+    collector = Collector()
+    engine = FakeEngine(callback=collector.callback, infos=0)
+    engine.start()
+    wait_idle(engine)
+
+    result = []
+    for _ in range(rounds):
+        collector.done.clear()
+        start = time.perf_counter()
+        engine.go(depth=1)
+        collector.done.wait()
+        result.append(time.perf_counter() - start)
+    engine.close()
+    return result
+
+
+def bench_throughput(lines=100000, subscribe=True):
+    collector = Collector()
+    engine = FakeEngine(callback=collector.callback, infos=lines)
+    engine.subscribe('info', subscribe)
+    engine.start()
+    wait_idle(engine)
+
+    start = time.perf_counter()
+    engine.go(depth=1)
+    collector.done.wait()
+    elapsed = time.perf_counter() - start
+    peak = engine.reset_backlog()
+    engine.close()
+    return collector.lines, elapsed, peak
+
+
+def format_times(times):
+    times = sorted(times)
+    p99 = times[min(len(times) - 1, int(len(times) * 0.99))]
+    return (
+        f'mean {statistics.mean(times) * 1000:.3f}ms '
+        f'p50 {statistics.median(times) * 1000:.3f}ms '
+        f'p99 {p99 * 1000:.3f}ms'
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='引擎管道性能测试')
+    parser.add_argument('--lines', type=int, default=100000, help='吞吐量测试的 info 行数')
+    parser.add_argument('--rounds', type=int, default=200, help='延迟测试的次数')
+    parser.add_argument('-v', '--verbose', action='store_true', help='输出调试日志')
+    args = parser.parse_args(argv)
+
+    if not args.verbose:
+        logger.setLevel(logging.WARNING)
+
+    print(f'startup    {format_times(bench_startup())}')
+    print(f'latency    {format_times(bench_latency(args.rounds))}')
+
+    lines, elapsed, peak = bench_throughput(args.lines)
+    print(f'throughput {lines} lines {elapsed:.3f}s {lines / elapsed:.0f} lines/s backlog {peak}')
+    if lines != args.lines:
+        print(f'lost {args.lines - lines} lines')
+        return 1
+
+    _, elapsed, peak = bench_throughput(args.lines, subscribe=False)
+    print(f'filtered   {args.lines} lines {elapsed:.3f}s {args.lines / elapsed:.0f} lines/s backlog {peak}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
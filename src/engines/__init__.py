@@ -20,12 +20,14 @@ if project not in sys.path:
 
 from engine import Engine, PipeEngine  # noqa
 from engine import UCCIEngine  # noqa
+from aioengine import AsyncUCCIEngine  # noqa
 
-IGNORED = [PipeEngine, UCCIEngine]
+IGNORED = [Engine, PipeEngine, UCCIEngine, AsyncUCCIEngine]
 
 
-def get_ucci_engines() -> typing.List[UCCIEngine]:
-    engines = glob.glob(os.path.join(dirname, '*/__init__.py'))
+def get_ucci_engines() -> typing.List[Engine]:
+    # 设置中保存的是引擎的下标，顺序必须固定
+    engines = sorted(glob.glob(os.path.join(dirname, '*/__init__.py')))
     result = []
     for name in engines:
         name = os.path.dirname(name)
@@ -42,9 +44,11 @@ def get_ucci_engines() -> typing.List[UCCIEngine]:
                 continue
             if engine in IGNORED:
                 continue
-            if not issubclass(engine, UCCIEngine):
+            if not issubclass(engine, Engine):
                 continue
             result.append(engine)
+    # 进程内的引擎放在最后，不影响外部引擎原来的下标
+    result.sort(key=lambda engine: not issubclass(engine, PipeEngine))
     return result
 
 
@@ -0,0 +1,207 @@
+import queue
+import threading
+import traceback
+
+from clock import allocate
+from engine import Engine
+from chess import Chess
+from logger import logger
+from situation import Situation
+from search import Search
+from parallel import ParallelSearch
+
+
+class NativeEngine(Engine):
+
+    '''
+    进程内的 Python 引擎，不需要外部可执行文件
+
+    指令在引擎线程中按顺序执行，接口与 UCCIEngine 相同，
+    搜索过程中输出与 UCCI 相同格式的 info 行。
+    '''
+
+    NAME = '内置引擎'
+
+    def __init__(self, callback=None):
+        super().__init__()
+        self.name = 'NativeEngineThread'
+        self.callback = callback
+        self.searcher = Search()
+        self.threads = 1
+        self.commands = queue.Queue()
+        self.banned = []
+        self.state = self.ENGINE_IDLE
+
+        # go 的次数，以及 stop 时的 go 次数，还没开始的搜索收到 stop 之后只搜一层
+        self.searches = 0
+        self.stopped = 0
+
+        # 后台思考，ponderhit 之后才开始计时，搜索结束之后也要等到 ponderhit 或 stop 才输出着法，
+        # 分析模式同样用 ponder_event 等待 stop。每次 go 都有自己的 ponder_event，
+        # 上一次的搜索还没开始等待的时候又收到 go，也不会把已经设置的事件清掉
+        self.pondering = False
+        self.ponder_event = threading.Event()
+        self.ponder_movetime = None
+        self.pv = []
+
+    def run(self):
+        self.running = True
+        while self.running:
+            command = self.commands.get()
+            if command is None:
+                break
+            try:
+                command()
+            except Exception:
+                logger.error(traceback.format_exc())
+
+    def close(self):
+        self.running = False
+        self.searcher.stop()
+        self.ponder_event.set()
+        self.commands.put(None)
+        if self.is_alive():
+            self.join()
+        self.searcher.close()
+
+    def position(self, fen=None):
+        if not fen:
+            fen = self.sit.format_fen()
+        self.commands.put(lambda: self.load_position(fen))
+
+    def load_position(self, fen):
+        sit = Situation()
+        if not sit.parse_fen(fen):
+            return
+        self.sit = sit
+        self.banned = []
+
+    def clearhash(self):
+        self.commands.put(self.searcher.clear)
+
+    def set_hashsize(self, size):
+        self.commands.put(lambda: self.searcher.resize(size))
+
+    def set_threads(self, threads):
+        self.commands.put(lambda: self.load_threads(threads))
+
+    def load_threads(self, threads):
+        if threads == self.threads:
+            return
+        hashsize = self.searcher.table.size
+        self.searcher.close()
+        if threads > 1:
+            self.searcher = ParallelSearch(hashsize, threads)
+        else:
+            self.searcher = Search(hashsize)
+        self.threads = threads
+
+    def banmoves(self, moves: list):
+        if not moves:
+            return
+        self.commands.put(lambda: self.load_banmoves(moves))
+
+    def load_banmoves(self, moves):
+        self.banned = []
+        for move in moves:
+            fpos, tpos = self.sit.parse_move(move)
+            self.banned.append((self.sit.square(fpos), self.sit.square(tpos)))
+
+    def go(self, depth=None, nodes=None,
+           time=None, movestogo=None, increment=None,
+           opptime=None, oppmovestogo=None, oppincrement=None,
+           draw=None, ponder=None, infinite=None):
+
+        movetime = None
+        if infinite:
+            depth = nodes = None
+        elif depth:
+            pass
+        elif nodes:
+            pass
+        elif time:
+            # 没有步数限制的时候 time 就是这一步可以用的时间，否则是剩余时间
+            movetime = time
+            if movestogo or increment:
+                movetime = allocate(time, movestogo, increment)
+        elif not ponder:
+            return
+
+        self.state = self.ENGINE_BUSY
+        self.stats.new_search()
+        self.searches += 1
+        search = self.searches
+        self.pondering = bool(ponder)
+        event = self.ponder_event = threading.Event()
+        self.commands.put(lambda: self.think(
+            depth, nodes, movetime, search, bool(ponder), bool(infinite), event))
+
+    def think(self, depth, nodes, movetime, search=0, ponder=False, infinite=False, event=None):
+        if search <= self.stopped:
+            depth, nodes, movetime = 1, None, None
+            ponder = infinite = False
+        if ponder:
+            self.ponder_movetime = movetime
+            if self.pondering:
+                movetime = None
+
+        sit = self.sit.copy()
+        self.pv = []
+        move = self.searcher.search(
+            sit, depth=depth, nodes=nodes, movetime=movetime,
+            banmoves=self.banned, callback=self.info,
+        )
+        # 找到杀棋或者达到最大深度的时候搜索会提前结束，
+        # 分析模式要等到 stop，后台思考要等到 ponderhit 或 stop 才输出着法
+        if (ponder or infinite) and event:
+            event.wait()
+            self.ponder_movetime = None
+
+        self.pondermove = None
+        if move is not None and len(self.pv) > 1 and self.pv[0] == move:
+            fsq, tsq = self.pv[1]
+            self.pondermove = sit.format_move(sit.where(fsq), sit.where(tsq))
+
+        # 已经有新的 go 在排队的时候还是忙碌状态，统计也属于新的搜索
+        if search == self.searches:
+            self.state = self.ENGINE_IDLE
+            self.stats.finish()
+
+        if not callable(self.callback):
+            return
+        if move is None:
+            self.callback(Chess.NOBESTMOVE, None)
+            return
+        self.callback(Chess.MOVE, (sit.where(move[0]), sit.where(move[1])))
+
+    def info(self, depth, score, nodes, elapsed, pv):
+        self.pv = pv
+        # ponderhit 可能在搜索开始重置时间之前到达，这里补上
+        if not self.pondering and self.ponder_movetime and self.searcher.deadline is None:
+            self.searcher.set_movetime(self.ponder_movetime)
+
+        millisec = int(elapsed * 1000)
+        nps = int(nodes / elapsed) if elapsed else 0
+        moves = ' '.join(
+            self.sit.format_move(self.sit.where(fsq), self.sit.where(tsq))
+            for fsq, tsq in pv
+        )
+        line = f'info depth {depth} score {score} time {millisec} nodes {nodes} nps {nps} pv {moves}'
+        self.stats.update(line)
+        if callable(self.callback):
+            self.callback(Chess.INFO, line)
+
+    def ponderhit(self, draw=False):
+        self.pondering = False
+        if self.ponder_movetime:
+            self.searcher.set_movetime(self.ponder_movetime)
+        self.ponder_event.set()
+
+    def stop(self):
+        self.stopped = self.searches
+        self.pondering = False
+        self.ponder_event.set()
+        self.searcher.stop()
+
+    def isready(self):
+        return True
@@ -0,0 +1,211 @@
+# coding=utf-8
+'''
+(C) Copyright 2021 Steven;
+@author: Steven kangweibaby@163.com
+@date: 2021-07-20
+用于测试的 UCCI 引擎，可以在任何平台上运行，不做搜索，直接从合法着法中选择
+
+作为引擎进程运行:
+
+    python fake.py --infos 1000 --delay 50 --seed 1
+
+    --infos    每次 go 输出的 info 行数
+    --delay    输出 bestmove 之前等待的毫秒数
+    --startup  ucciok 之前等待的毫秒数，模拟载入开局库和网络
+    --seed     随机选择着法的种子，不指定时总是选择第一个合法着法
+
+go infinite 和 go ponder 在收到 stop 或者 ponderhit 之后才输出 bestmove。
+
+FakeEngine 通过 PipeEngine.setup 启动这个脚本，用于测试和 enginebench.py 的性能测试。
+'''
+
+import os
+import sys
+import time
+import random
+import argparse
+
+from engine import UCCIEngine
+
+filename = os.path.abspath(__file__)
+
+
+class FakeEngine(UCCIEngine):
+
+    NAME = '测试引擎'
+
+    def __init__(self, callback=None, infos=10, delay=0, startup=0, seed=None):
+        self.args = [
+            '--infos', str(infos),
+            '--delay', str(delay),
+            '--startup', str(startup),
+        ]
+        if seed is not None:
+            self.args.extend(['--seed', str(seed)])
+        super().__init__(filename, callback=callback)
+
+    def get_command(self):
+        return [sys.executable, str(self.filename)] + self.args
+
+
+class FakeProtocol(object):
+
+    def __init__(self, output, infos=10, delay=0, startup=0, seed=None):
+        from situation import Situation
+
+        self.output = output
+        self.infos = infos
+        self.delay = delay
+        self.startup = startup
+        self.random = random.Random(seed) if seed is not None else None
+
+        self.sit = Situation()
+        self.banned = set()
+        self.options = {}
+        self.pending = False
+
+    def write(self, *lines):
+        self.output.write(''.join(f'{line}\n' for line in lines))
+        self.output.flush()
+
+    def run(self, lines):
+        for line in lines:
+            items = line.split()
+            if not items:
+                continue
+            method = getattr(self, f'command_{items[0]}', None)
+            if not method:
+                continue
+            if method(items[1:]) is False:
+                break
+
+    def command_ucci(self, args):
+        if self.startup:
+            time.sleep(self.startup / 1000)
+        self.write(
+            'id name FakeEngine',
+            'id author Steven',
+            'option usemillisec type check default true',
+            'option hashsize type spin min 1 max 1024 default 16',
+            'option threads type spin min 1 max 64 default 1',
+            'option multipv type spin min 1 max 8 default 1',
+            'option clearhash type button',
+            'ucciok',
+        )
+
+    def command_isready(self, args):
+        self.write('readyok')
+
+    def command_setoption(self, args):
+        if len(args) >= 2:
+            self.options[args[0]] = args[1]
+
+    def command_position(self, args):
+        from situation import Situation
+
+        line = ' '.join(args)
+        if line.startswith('fen '):
+            line = line[4:]
+        elif line.startswith('startpos'):
+            line = Situation().fen + line[len('startpos'):]
+
+        sit = Situation()
+        if sit.parse_fen(line):
+            self.sit = sit
+        self.banned = set()
+
+    def command_banmoves(self, args):
+        self.banned = set(args)
+
+    def command_go(self, args):
+        self.pending = True
+        self.write(*self.get_infos())
+        if 'infinite' in args or 'ponder' in args:
+            return
+        if self.delay:
+            time.sleep(self.delay / 1000)
+        self.bestmove()
+
+    def command_ponderhit(self, args):
+        if self.pending:
+            self.bestmove()
+
+    def command_stop(self, args):
+        if self.pending:
+            self.bestmove()
+
+    def command_quit(self, args):
+        self.write('bye')
+        return False
+
+    def get_moves(self):
+        sit = self.sit
+        moves = [
+            sit.format_move(sit.where(fsq), sit.where(tsq))
+            for fsq, tsq in sit.legal_moves()
+        ]
+        return [move for move in moves if move not in self.banned]
+
+    def get_infos(self):
+        # multipv 大于 1 的时候每一层依次输出前几个着法
+        moves = self.get_moves()
+        multipv = int(self.options.get('multipv', 1))
+        result = []
+        for idx in range(self.infos):
+            depth = idx + 1
+            nodes = depth * 1000
+            for rank in range(1, min(multipv, len(moves)) + 1 if moves else 2):
+                pv = moves[rank - 1] if moves else ''
+                mark = f' multipv {rank}' if multipv > 1 else ''
+                result.append(
+                    f'info depth {depth}{mark} score {idx % 100} time {depth} '
+                    f'nodes {nodes} nps 1000000 pv {pv}'
+                )
+        return result
+
+    def bestmove(self):
+        self.pending = False
+        moves = self.get_moves()
+        if not moves:
+            self.write('nobestmove')
+            return
+        if self.random:
+            move = self.random.choice(moves)
+        else:
+            move = moves[0]
+
+        # 后台思考的着法总是对方的第一个合法着法
+        sit = self.sit.copy()
+        fpos, tpos = sit.parse_move(move)
+        sit.make_move(sit.square(fpos), sit.square(tpos))
+        replies = sit.legal_moves()
+        if not replies:
+            self.write(f'bestmove {move}')
+            return
+        fsq, tsq = replies[0]
+        reply = sit.format_move(sit.where(fsq), sit.where(tsq))
+        self.write(f'bestmove {move} ponder {reply}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='测试用的 UCCI 引擎')
+    parser.add_argument('--infos', type=int, default=10, help='每次 go 输出的 info 行数')
+    parser.add_argument('--delay', type=int, default=0, help='bestmove 之前等待的毫秒数')
+    parser.add_argument('--startup', type=int, default=0, help='ucciok 之前等待的毫秒数')
+    parser.add_argument('--seed', type=int, help='随机选择着法的种子')
+    args = parser.parse_args()
+
+    # 测试引擎的日志会混在标准输出中，全部关闭
+    import logging
+    logging.disable(logging.CRITICAL)
+
+    protocol = FakeProtocol(
+        sys.stdout, infos=args.infos, delay=args.delay,
+        startup=args.startup, seed=args.seed,
+    )
+    protocol.run(sys.stdin)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,352 @@
+# coding=utf-8
+'''
+(C) Copyright 2021 Steven;
+@author: Steven kangweibaby@163.com
+@date: 2021-07-24
+批量导入棋谱，生成紧凑的二进制对局库
+
+    python importer.py games manuals/ big.txt more.fen --workers 4
+    python importer.py games --show 42
+
+输入可以是目录 (递归读取 .txt 和 .fen 文件) 或者多局拼接的大文件，格式见 manual.iter_games，
+逐行读取，不会一次载入整个文件。棋谱按批分给多个进程解析，回放时只检查着法是否合法，
+最后一步之后才判断是否将死。
+
+输出三个文件，整数都是小端:
+
+    games.dat  所有对局的着法连续存放，每步 2 字节 (fsq << 7 | tsq)
+    games.idx  文件头 16 字节 magic(4) version(2) 记录大小(2) 对局数(8)，
+               之后每局 16 字节 offset(8) count(2) result(1) flags(1) fen(4)，
+               下标就是对局的编号，offset 是第一步在 games.dat 中的序号
+    games.fen  不是从开局开始的对局的起始局面，每行一个，fen 是行号
+'''
+
+import os
+import sys
+import mmap
+import time
+import array
+import struct
+import logging
+import argparse
+import itertools
+import collections
+import multiprocessing
+from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
+
+from logger import logger
+from book import replay
+from book import pack_move
+from book import unpack_move
+from manual import Manual
+from manual import iter_games
+from situation import Situation
+from utils import detect_encoding
+
+MAGIC = b'CCGD'
+VERSION = 1
+
+HEADER = struct.Struct('<4sHHQ')
+RECORD = struct.Struct('<QHBBI')
+
+# result 字段
+RESULTS = (None, '1-0', '0-1', '1/2-1/2')
+
+# flags 字段
+FLAG_CHECKMATE = 1
+FLAG_FEN = 2
+
+NO_FEN = 0xFFFFFFFF
+MAX_MOVES = 0xFFFF
+
+START_FEN = Situation().fen
+
+EXTENSIONS = {'.txt', '.fen'}
+
+# 每批交给一个进程解析的对局数
+BATCH_SIZE = 256
+
+
+@dataclass(slots=True)
+class GameRecord:
+
+    id: int
+    fen: str
+    moves: list
+    result: str = None
+    checkmate: bool = False
+
+    def format_fen(self):
+        if not self.moves:
+            return f'fen {self.fen}'
+        moves = ' '.join(
+            Situation.format_move(Situation.where(fsq), Situation.where(tsq))
+            for fsq, tsq in self.moves
+        )
+        return f'fen {self.fen} moves {moves}'
+
+
+def iter_files(paths):
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                if os.path.splitext(name)[1].lower() in EXTENSIONS:
+                    yield os.path.join(root, name)
+
+
+def iter_sources(paths):
+    # 逐局读取所有文件中的棋谱
+    for filename in iter_files(paths):
+        encoding = detect_encoding(filename)
+        with open(filename, encoding=encoding, errors='replace') as file:
+            yield from iter_games(file)
+
+
+def iter_batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def parse_game(text):
+    # 返回 (起始局面, 打包的着法, 是否将死)，从开局开始的对局起始局面为 None
+    if text.startswith('fen '):
+        sit = Situation()
+        if not sit.parse_fen(text[4:], load=True):
+            raise ValueError(f'invalid fen {text}')
+        fen = None if sit.fen == START_FEN else sit.fen
+        moves = sit.moves
+        sit.moves = []
+        data = replay(sit, moves)
+    else:
+        manual = Manual(fast=True)
+        manual.parse(text)
+        sit = manual.sit
+        fen = None
+        data = array.array('H', (
+            pack_move(sit.square(fpos), sit.square(tpos))
+            for fpos, tpos in sit.moves
+        ))
+
+    if len(data) > MAX_MOVES:
+        raise ValueError(f'too many moves {len(data)}')
+
+    # 只在最后一步之后判断将死
+    checkmate = bool(data) and bool(sit.is_checkmate(sit.turn))
+    return fen, data, checkmate
+
+
+def parse_batch(batch):
+    # 在子进程中解析一批对局，不合法的对局返回 None
+    result = []
+    for text, outcome in batch:
+        try:
+            fen, data, checkmate = parse_game(text)
+        except Exception as e:
+            logger.debug("skip game %s", e)
+            result.append(None)
+            continue
+        if sys.byteorder == 'big':
+            data.byteswap()
+        result.append((fen, data.tobytes(), RESULTS.index(outcome), checkmate))
+    return result
+
+
+def init_worker():
+    # 子进程不输出调试日志，逐步的 logger.debug 开销很大，
+    # 不合法的 fen 之类的警告也不输出，这些对局已经计入错误数
+    logger.setLevel(logging.ERROR)
+
+
+def imap(executor, func, iterable, window):
+    # 按顺序返回结果，最多同时提交 window 个任务，避免一次读入所有棋谱
+    pending = collections.deque()
+    for item in iterable:
+        pending.append(executor.submit(func, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+class GameWriter(object):
+
+    '''
+    顺序写入对局，add 返回对局编号，close 的时候写入对局数
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self.moves = open(f'{path}.dat', 'wb')
+        self.index = open(f'{path}.idx', 'wb')
+        self.fens = open(f'{path}.fen', 'w', encoding='utf8')
+        self.index.write(HEADER.pack(MAGIC, VERSION, RECORD.size, 0))
+        self.count = 0
+        self.offset = 0
+        self.fen_count = 0
+
+    def add(self, data: bytes, result=0, checkmate=False, fen=None):
+        flags = FLAG_CHECKMATE if checkmate else 0
+        index = NO_FEN
+        if fen:
+            flags |= FLAG_FEN
+            index = self.fen_count
+            self.fens.write(f'{fen}\n')
+            self.fen_count += 1
+
+        count = len(data) // 2
+        self.index.write(RECORD.pack(self.offset, count, result, flags, index))
+        self.moves.write(data)
+        self.offset += count
+        self.count += 1
+        return self.count - 1
+
+    def close(self):
+        self.index.seek(0)
+        self.index.write(HEADER.pack(MAGIC, VERSION, RECORD.size, self.count))
+        for file in (self.moves, self.index, self.fens):
+            file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class GameStore(object):
+
+    '''
+    只读的对局库，索引和着法都用 mmap 映射，按编号读取对局
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self.index_file = open(f'{path}.idx', 'rb')
+        self.index = mmap.mmap(self.index_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, size, count = HEADER.unpack_from(self.index, 0)
+        if magic != MAGIC or version != VERSION or size != RECORD.size:
+            self.close()
+            raise ValueError(f'invalid game store {path}')
+        self.count = count
+
+        self.moves_file = open(f'{path}.dat', 'rb')
+        self.moves = b''
+        if os.path.getsize(f'{path}.dat'):
+            self.moves = mmap.mmap(self.moves_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.fens = None
+
+    def __len__(self):
+        return self.count
+
+    def get_fen(self, index):
+        if self.fens is None:
+            with open(f'{self.path}.fen', encoding='utf8') as file:
+                self.fens = file.read().splitlines()
+        return self.fens[index]
+
+    def __getitem__(self, id) -> GameRecord:
+        if not 0 <= id < self.count:
+            raise IndexError(f'game {id} out of range')
+        offset, count, result, flags, index = RECORD.unpack_from(
+            self.index, HEADER.size + id * RECORD.size)
+
+        data = array.array('H')
+        data.frombytes(self.moves[offset * 2: (offset + count) * 2])
+        if sys.byteorder == 'big':
+            data.byteswap()
+
+        fen = self.get_fen(index) if flags & FLAG_FEN else START_FEN
+        return GameRecord(
+            id, fen, [unpack_move(move) for move in data],
+            RESULTS[result], bool(flags & FLAG_CHECKMATE),
+        )
+
+    def close(self):
+        for data in (self.index, getattr(self, 'moves', None)):
+            if isinstance(data, mmap.mmap):
+                data.close()
+        self.index_file.close()
+        if hasattr(self, 'moves_file'):
+            self.moves_file.close()
+
+
+def import_games(paths, output, workers=None, batch_size=BATCH_SIZE):
+    # 返回 (对局数, 错误数, 着法数)
+    workers = workers or os.cpu_count() or 1
+    batches = iter_batches(iter_sources(paths), batch_size)
+    errors = 0
+
+    with GameWriter(output) as writer:
+        if workers == 1:
+            results = map(parse_batch, batches)
+            executor = None
+        else:
+            executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=init_worker,
+            )
+            results = imap(executor, parse_batch, batches, workers * 4)
+
+        try:
+            for result in results:
+                for item in result:
+                    if item is None:
+                        errors += 1
+                        continue
+                    fen, data, outcome, checkmate = item
+                    writer.add(data, outcome, checkmate, fen)
+        finally:
+            if executor:
+                executor.shutdown(cancel_futures=True)
+
+    return writer.count, errors, writer.offset
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='批量导入棋谱')
+    parser.add_argument('output', help='对局库的路径，不带扩展名')
+    parser.add_argument('inputs', nargs='*', help='棋谱文件或者目录')
+    parser.add_argument('--workers', type=int, help='进程数，默认是 CPU 核数')
+    parser.add_argument('--batch', type=int, default=BATCH_SIZE, help='每批解析的对局数')
+    parser.add_argument('--show', type=int, help='输出指定编号的对局')
+    parser.add_argument('-v', '--verbose', action='store_true', help='输出调试日志')
+    args = parser.parse_args(argv)
+
+    if not args.verbose:
+        logger.setLevel(logging.WARNING)
+
+    if args.show is not None:
+        store = GameStore(args.output)
+        try:
+            game = store[args.show]
+        finally:
+            store.close()
+        print(f'{game.format_fen()}\t{game.result or "*"}\t{"checkmate" if game.checkmate else ""}')
+        return 0
+
+    if not args.inputs:
+        parser.error('no input')
+
+    start = time.perf_counter()
+    games, errors, moves = import_games(args.inputs, args.output, args.workers, args.batch)
+    elapsed = time.perf_counter() - start
+    print(
+        f'games {games} errors {errors} moves {moves} '
+        f'{elapsed:.3f}s {games / elapsed:.0f} games/s'
+    )
+    return 0
+
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -1,9 +1,15 @@
 # coding=utf-8
 
+import os
 import sys
 import time
+
+# 启动计时，用于分析启动速度
+STARTUP = time.perf_counter()
+
 from functools import partial
 import threading
+import multiprocessing
 
 import numpy as np
 
@@ -21,6 +27,10 @@ from engine import Chess
 from engine import dirpath
 from engine import logger
 from engines import UCCI_ENGINES
+from pool import EnginePool
+from clock import GameClock
+from ponder import Ponder
+from book import OpeningBook
 from situation import Situation
 
 import audio
@@ -30,6 +40,7 @@ from version import VERSION
 
 from dialogs.settings import SettingsDialog
 from dialogs.method import MethodDialog
+from dialogs.analysis import AnalysisDialog
 from toast import Toast
 
 from context import BaseContextMenu
@@ -37,7 +48,17 @@ from context import BaseContextMenuMixin
 
 from arrange import ArrangeBoard
 from manual import Manual
-import qqchess
+
+# 对局的引擎默认不订阅 info，设置了 CHESS_ENGINE_STATS 环境变量才收集搜索统计
+STATS = bool(os.environ.get('CHESS_ENGINE_STATS'))
+
+
+def trace(stage):
+    # 记录启动各个阶段的耗时
+    logger.info("startup %s %.3fs", stage, time.perf_counter() - STARTUP)
+
+
+trace('imports')
 
 
 class GameSignal(QtCore.QObject):
@@ -55,14 +76,18 @@ class GameSignal(QtCore.QObject):
     connecting = QtCore.Signal(None)
 
     move = QtCore.Signal(int)
+    # 引擎线程的事件排队到界面线程处理
+    engine_event = QtCore.Signal(int, object, object, float)
     draw = QtCore.Signal(None)
     resign = QtCore.Signal(None)
     checkmate = QtCore.Signal(None)
     nobestmove = QtCore.Signal(None)
+    repetition = QtCore.Signal(int)
 
     animate = QtCore.Signal(tuple, tuple)
     settings = QtCore.Signal(None)
     method = QtCore.Signal(None)
+    analysis = QtCore.Signal(None)
     arrange = QtCore.Signal(None)
     thinking = QtCore.Signal(bool)
     reverse = QtCore.Signal(None)
@@ -78,6 +103,7 @@ class GameContextMenu(BaseContextMenu):
         ('重置', 'Ctrl+N', lambda self: self.signal.reset.emit(), False),
         ('布局', 'Ctrl+A', lambda self: self.signal.arrange.emit(), True),
         ('着法', 'Ctrl+M', lambda self: self.signal.method.emit(), False),
+        ('分析', 'Ctrl+Y', lambda self: self.signal.analysis.emit(), False),
         ('反转', 'Ctrl+I', lambda self: self.signal.reverse.emit(), False),
         'separator',
         ('粘贴', 'Ctrl+V', lambda self: self.signal.paste.emit(), True),
@@ -105,8 +131,6 @@ class Game(BoardFrame, BaseContextMenuMixin):
         self.setWindowTitle(f"中国象棋 v{VERSION}")
         self.setupContextMenu()
 
-        audio.init()
-
         self.image = None
 
         self.engine = None
@@ -114,6 +138,23 @@ class Game(BoardFrame, BaseContextMenuMixin):
             Chess.RED: None,
             Chess.BLACK: None,
         }
+        self.pool = EnginePool()
+
+        # 后台思考的状态，以及每一方需要忽略的着法数量
+        self.ponder = Ponder()
+        self.stale = {
+            Chess.RED: 0,
+            Chess.BLACK: 0,
+        }
+
+        # 开局库在第一次查询的时候载入，False 表示没有开局库文件
+        self.book = None
+
+        # 时钟制的对局时钟，定时刷新标题并检查超时
+        self.clock = GameClock()
+        self.clock_timer = QtCore.QTimer(self)
+        self.clock_timer.setInterval(100)
+        self.clock_timer.timeout.connect(self.update_clock)
 
         self.engine_side = [Chess.BLACK]
         self.human_side = [Chess.RED]
@@ -127,6 +168,9 @@ class Game(BoardFrame, BaseContextMenuMixin):
         self.method = MethodDialog(self)
         self.method.setWindowIcon(QtGui.QIcon(self.board.FAVICON))
 
+        self.analysis = AnalysisDialog(self)
+        self.analysis.setWindowIcon(QtGui.QIcon(self.board.FAVICON))
+
         self.settings = SettingsDialog(self)
         self.settings.setWindowIcon(QtGui.QIcon(self.board.FAVICON))
 
@@ -160,14 +204,19 @@ class Game(BoardFrame, BaseContextMenuMixin):
         self.game_signal.capture.connect(self.capture)
 
         self.game_signal.move.connect(self.play)
+        self.game_signal.engine_event.connect(self.dispatch_engine_event)
 
         self.game_signal.checkmate.connect(self.checkmateMessage)
         self.game_signal.checkmate.connect(lambda: self.set_thinking(False))
 
         self.game_signal.nobestmove.connect(self.nobestmove)
+        self.game_signal.repetition.connect(self.repetitionMessage)
+        self.game_signal.repetition.connect(lambda: self.set_thinking(False))
 
         self.game_signal.draw.connect(lambda: self.toast.message('和棋！！！'))
         self.game_signal.resign.connect(lambda: self.toast.message('认输了！！！'))
+        self.game_signal.draw.connect(self.clock.stop)
+        self.game_signal.resign.connect(self.clock.stop)
 
         self.game_signal.animate.connect(self.animate)
 
@@ -186,6 +235,9 @@ class Game(BoardFrame, BaseContextMenuMixin):
         self.settings.standard_method.stateChanged.connect(
             lambda e: self.method.set_standard(e)
         )
+        self.settings.standard_method.stateChanged.connect(
+            lambda e: self.analysis.set_standard(e)
+        )
 
         self.settings.ontop.clicked.connect(self.set_on_top)
 
@@ -200,6 +252,9 @@ class Game(BoardFrame, BaseContextMenuMixin):
                 not self.method.isVisible()))
         self.method.list.currentItemChanged.connect(self.method_changed)
 
+        self.game_signal.analysis.connect(self.toggle_analysis)
+        self.analysis.finished.connect(self.stop_analysis)
+
         self.game_signal.connecting.connect(self.connecting)
         # self.qqboard = qqchess.Capturer(self)
         # logger.info("set qqboard %s", self.settings.qqboard)
@@ -209,6 +264,7 @@ class Game(BoardFrame, BaseContextMenuMixin):
         self.reset()
         self.accepted()
         self.check_openfile()
+        trace('game')
 
     def set_on_top(self):
         logger.info("set on top")
@@ -260,10 +316,14 @@ class Game(BoardFrame, BaseContextMenuMixin):
         logger.debug('finish arrange')
         self.engine.close()
         self.engine = Engine()
+        # 新的局面与之前的搜索无关，复用引擎之前清空置换表
+        self.clearhash()
 
         self.engine.sit.board = self.board.board
         self.engine.sit.turn = self.board.first_side
         self.engine.sit.fen = self.engine.sit.format_current_fen()
+        # 确定先走的一方之后才重新计时
+        self.setup_clock(restart=True)
         self.try_engine_move()
         self.game_menu.setAllShortcutEnabled(True)
 
@@ -291,15 +351,17 @@ class Game(BoardFrame, BaseContextMenuMixin):
         else:
             self.human_side.append(Chess.BLACK)
 
-        idx = self.settings.red_engine.currentIndex()
-        engine = self.engines[Chess.RED]
-        if not isinstance(engine, UCCI_ENGINES[idx]):
-            self.init_engines(Chess.RED)
+        # 引擎改变之后关闭旧引擎，新引擎在第一次使用的时候启动
+        for turn, engine in self.engines.items():
+            idx = self.settings.get_engine_box(turn).currentIndex()
+            if engine and not isinstance(engine, UCCI_ENGINES[idx]):
+                self.close_engine(turn)
 
-        idx = self.settings.black_engine.currentIndex()
-        engine = self.engines[Chess.BLACK]
-        if not isinstance(engine, UCCI_ENGINES[idx]):
-            self.init_engines(Chess.BLACK)
+        for engine in self.engines.values():
+            if not engine:
+                continue
+            engine.set_hashsize(self.settings.hashsize.value())
+            engine.set_threads(self.settings.threads.value())
 
         if len(self.engine_side) == 2:
             self.method.list.setEnabled(False)
@@ -307,6 +369,7 @@ class Game(BoardFrame, BaseContextMenuMixin):
             self.method.list.setEnabled(True)
         self.update_action_state()
 
+        self.setup_clock()
         self.try_engine_move()
 
     def try_engine_move(self):
@@ -319,13 +382,182 @@ class Game(BoardFrame, BaseContextMenuMixin):
             self.game_signal.checkmate.emit()
             logger.debug('engine is checkmated hint ignored...')
             return
+        if self.clock.flagged is not None:
+            return
+        if self.ponder.active and self.try_ponderhit():
+            return
+        if self.try_book_move():
+            return
+
         self.game_signal.thinking.emit(True)
         engine = self.current_engine()
         engine.position(self.engine.sit.format_fen())
+        engine.banmoves(self.get_banmoves())
 
-        params = self.settings.get_params(self.engine.sit.turn)
+        params = self.get_params(self.engine.sit.turn)
         engine.go(**params)
 
+    def get_book(self):
+        if self.book is None:
+            filename = os.path.join(system.get_execpath(), 'book.bin')
+            self.book = OpeningBook.open(filename) or False
+        return self.book
+
+    def try_book_move(self):
+        # 开局库中有当前局面的时候直接走棋，不需要启动引擎
+        if not self.settings.book.isChecked():
+            return False
+        book = self.get_book()
+        if not book:
+            return False
+        move = book.probe(self.engine.sit, self.engine.get_banmoves())
+        if not move:
+            return False
+
+        logger.info("book move %s", move)
+        self.clock.stop()
+        QtCore.QTimer.singleShot(
+            self.settings.delay.value(),
+            partial(self.move, *move)
+        )
+        return True
+
+    def get_params(self, turn):
+        if self.settings.get_mode() == SettingsDialog.MODE_CLOCK:
+            return self.clock.get_params(turn)
+        return self.settings.get_params(turn)
+
+    def setup_clock(self, restart=False):
+        # 时钟制的设置改变或者重新开局的时候重新计时
+        if self.settings.get_mode() != SettingsDialog.MODE_CLOCK:
+            self.clock.configure(0, 0)
+            self.clock_timer.stop()
+            self.setWindowTitle(f"中国象棋 v{VERSION}")
+            return
+
+        config = self.settings.get_clock()
+        if restart or config != self.clock.config:
+            self.clock.configure(*config)
+            self.clock.start(self.engine.sit.turn)
+        self.clock_timer.start()
+        self.update_clock()
+
+    @QtCore.Slot(None)
+    def update_clock(self):
+        self.setWindowTitle(
+            f"中国象棋 v{VERSION}  "
+            f"红 {self.clock.format(Chess.RED)}  黑 {self.clock.format(Chess.BLACK)}"
+        )
+
+        turn = self.clock.check()
+        if turn is None:
+            return
+
+        logger.info("clock flagged %s", turn)
+        if turn == Chess.RED:
+            self.toast.message("红方超时，黑方胜!!!")
+        else:
+            self.toast.message("黑方超时，红方胜!!!")
+
+        # 超时之后引擎的着法不再执行
+        engine = self.engines[turn]
+        if engine and engine.state == Engine.ENGINE_BUSY:
+            self.stale[turn] += 1
+            engine.stop()
+        self.game_signal.thinking.emit(False)
+
+    def try_ponder(self):
+        # 引擎走完之后猜测对方的着法，在对方思考的时候继续搜索
+        if not self.settings.ponder.isChecked():
+            return
+        sit = self.engine.sit
+        turn = Chess.invert(sit.turn)
+        if turn not in self.engine_side or sit.turn not in self.human_side:
+            return
+
+        engine = self.engines[turn]
+        if not engine or not engine.pondermove:
+            return
+        fpos, tpos = sit.parse_move(engine.pondermove)
+        if not sit.validate_move(fpos, tpos):
+            return
+
+        fen = self.ponder.start(turn, sit, engine.pondermove)
+        logger.info("ponder %s", engine.pondermove)
+        engine.position(fen)
+        engine.go(ponder=True, **self.get_params(turn))
+
+    def try_ponderhit(self):
+        # 对方走了猜测的着法就继续后台的搜索，否则停止后台思考，返回是否猜中
+        engine = self.engines[self.ponder.turn]
+        if not engine:
+            self.ponder.cancel()
+            return False
+
+        turn, hit = self.ponder.check(self.engine.sit, engine.stats)
+        if hit:
+            self.game_signal.thinking.emit(True)
+            engine.ponderhit()
+            return True
+
+        self.stop_ponder(turn)
+        return False
+
+    def cancel_ponder(self):
+        # 悔棋、还原或者提示的时候停止后台思考，不计入猜中率
+        if self.ponder.active:
+            self.stop_ponder(self.ponder.cancel())
+
+    def stop_ponder(self, turn):
+        engine = self.engines[turn]
+        if not engine:
+            return
+        # 停止之后引擎还会输出后台思考的着法，需要忽略
+        self.stale[turn] += 1
+        engine.stop()
+
+    def get_banmoves(self):
+        # 禁止长将长捉的着法
+        sit = self.engine.sit
+        return [
+            sit.format_move(sit.where(fsq), sit.where(tsq))
+            for fsq, tsq in self.engine.get_banmoves()
+        ]
+
+    def toggle_analysis(self):
+        if self.analysis.analyser.active:
+            self.stop_analysis()
+            return
+
+        # 使用当前走棋方设置的引擎分析
+        idx = self.settings.get_engine_box(self.engine.sit.turn).currentIndex()
+        engine = self.pool.acquire(UCCI_ENGINES[idx])
+        engine.set_hashsize(self.settings.hashsize.value())
+        engine.set_threads(self.settings.threads.value())
+        self.analysis.start(engine)
+        self.analyse()
+
+    def stop_analysis(self, *args):
+        if not self.analysis.analyser.active:
+            return
+        self.pool.release(self.analysis.stop())
+
+    def analyse(self):
+        # 局面改变之后重新开始分析
+        if not self.analysis.analyser.active:
+            return
+        self.analysis.analyser.analyse(self.engine.sit, self.get_banmoves())
+
+    def repetitionMessage(self, result):
+        if result == Chess.DRAW:
+            self.toast.message('和棋！！！')
+            return
+        if result == Chess.RED:
+            side = '红方'
+        else:
+            side = '黑方'
+        self.toast.message(f"{side}长打判负！！！")
+
     def nobestmove(self):
         if self.engine.sit.turn == Chess.RED:
             side = '黑方'
@@ -349,16 +581,40 @@ class Game(BoardFrame, BaseContextMenuMixin):
         else:
             turns = [Chess.RED, Chess.BLACK]
         for turn in turns:
-            old = self.engines[turn]
-            if old:
-                old.close()
+            self.pool.release(self.engines[turn])
             idx = self.settings.get_engine_box(turn).currentIndex()
-            new = UCCI_ENGINES[idx](callback=self.engine_callback)
-            new.start()
+            new = self.pool.acquire(UCCI_ENGINES[idx], partial(self.engine_callback, turn=turn))
+            # 对局只需要着法，info 在读取之后直接丢弃，分析模式会重新订阅
+            new.subscribe('info', STATS)
+            new.set_hashsize(self.settings.hashsize.value())
+            new.set_threads(self.settings.threads.value())
             self.engines[turn] = new
+            trace(f'engine {new.NAME}')
+
+    def close_engine(self, turn):
+        # 放回引擎池，正在思考的引擎会被关闭
+        self.pool.release(self.engines[turn])
+        self.engines[turn] = None
+        self.stale[turn] = 0
+        if self.ponder.turn == turn:
+            self.ponder.cancel()
+
+    def clearhash(self):
+        for turn, engine in self.engines.items():
+            if not engine:
+                continue
+            # 正在思考的引擎直接关闭，防止把上一局的着法走到新的对局中
+            if engine.state == Engine.ENGINE_BUSY:
+                self.close_engine(turn)
+                continue
+            engine.clearhash()
 
     def current_engine(self) -> Engine:
-        return self.engines[self.engine.sit.turn]
+        # 引擎在第一次需要的时候才启动
+        turn = self.engine.sit.turn
+        if not self.engines[turn]:
+            self.init_engines(turn)
+        return self.engines[turn]
 
     def reverse(self):
         logger.debug("reverse")
@@ -367,7 +623,7 @@ class Game(BoardFrame, BaseContextMenuMixin):
         self.settings.save()
 
     def reset(self):
-        self.init_engines()
+        self.clearhash()
 
         self.engine = Engine()
 
@@ -381,21 +637,25 @@ class Game(BoardFrame, BaseContextMenuMixin):
 
         self.updateBoard()
         self.board.setCheck(None)
+        self.setup_clock(restart=True)
         self.try_engine_move()
 
         self.method.refresh(self.engine)
 
     @QtCore.Slot(None)
     def undo(self):
+        self.cancel_ponder()
         for _ in range(2):
             self.engine.undo()
             if self.engine.sit.turn in self.human_side:
                 break
 
+        self.clock.switch(self.engine.sit.turn)
         self.updateBoard()
 
     @QtCore.Slot(None)
     def redo(self):
+        self.cancel_ponder()
         for _ in range(2):
             self.engine.redo()
             logger.debug('engine redo result %d', self.engine.sit.result)
@@ -405,6 +665,7 @@ class Game(BoardFrame, BaseContextMenuMixin):
             if self.engine.sit.turn in self.human_side:
                 break
 
+        self.clock.switch(self.engine.sit.turn)
         self.updateBoard()
 
     @QtCore.Slot(bool)
@@ -412,11 +673,13 @@ class Game(BoardFrame, BaseContextMenuMixin):
         if self.thinking:
             logger.debug('engine is thinking hint ignored...')
             return
+        self.cancel_ponder()
         self.go()
 
     @QtCore.Slot(None)
     def debug(self):
         logger.debug("debug slot.....")
+        import qqchess
         qqchess.show(self.image)
         # logger.debug(self.engine.sit.format_fen())
 
@@ -465,6 +728,9 @@ class Game(BoardFrame, BaseContextMenuMixin):
                 if result == Chess.CHECKMATE:
                     self.game_signal.checkmate.emit()
                     break
+            # 和布局一样，载入的是新的局面，清空置换表并且从轮到的一方重新计时
+            self.clearhash()
+            self.setup_clock(restart=True)
             self.updateBoard()
         else:
             self.toast.message("加载棋谱失败")
@@ -488,12 +754,15 @@ class Game(BoardFrame, BaseContextMenuMixin):
             self.pasre_content(content)
             return
 
+        # 图像识别依赖 torch 和 opencv，载入很慢，第一次使用的时候才导入
+        import qqchess
         image = qqchess.ImageGrab.grabclipboard()
         if isinstance(image, qqchess.Image.Image):
             self.paste_image(image)
 
     def capture(self):
         logger.debug("capture...")
+        import qqchess
         colors = {0: Chess.RMASK, 1: Chess.BMASK}
         board = np.zeros((9, 10), dtype=np.int8)
         while True:
@@ -633,13 +902,17 @@ class Game(BoardFrame, BaseContextMenuMixin):
         if self.engine.checkmate:
             self.game_signal.checkmate.emit()
             return
+        if self.clock.flagged is not None:
+            return
 
+        turn = self.engine.sit.turn
         result = self.engine.move(fpos, tpos)
         logger.debug('move result %s', result)
         if not result:
             return
 
         if result != Chess.INVALID:
+            self.clock.press(turn)
             self.game_signal.animate.emit(fpos, tpos)
         else:
             return
@@ -654,9 +927,18 @@ class Game(BoardFrame, BaseContextMenuMixin):
 
         if result == Chess.CHECKMATE:
             logger.debug("emit checkmate")
+            self.clock.stop()
             self.game_signal.checkmate.emit()
             return
 
+        repetition = self.engine.judge()
+        if repetition is not None:
+            logger.debug("emit repetition %s", repetition)
+            self.clock.stop()
+            self.game_signal.repetition.emit(repetition)
+            return
+
+        self.try_ponder()
         self.try_engine_move()
 
     @QtCore.Slot(int)
@@ -666,6 +948,8 @@ class Game(BoardFrame, BaseContextMenuMixin):
     def updateBoard(self):
         if hasattr(self, 'method'):
             self.method.signal.refresh.emit()
+        if hasattr(self, 'analysis'):
+            self.analyse()
         self.board.setBoard(
             self.engine.sit.board,
             self.engine.sit.fpos,
@@ -686,14 +970,38 @@ class Game(BoardFrame, BaseContextMenuMixin):
             self.toast.message("红方胜!!!")
             # QtWidgets.QMessageBox(self).information(self, '信息', '红方胜!!!')
 
-    def engine_callback(self, type, data):
-        if type == Chess.MOVE:
-            time.sleep(self.settings.delay.value() / 1000)
-            self.move(data[0], data[1])
-        elif type == Chess.INFO:
+    def engine_callback(self, type, data, turn=None):
+        # 在引擎的解析线程中调用，只负责转发，规则判断和界面操作都在界面线程
+        if type == Chess.INFO:
             logger.debug(data)
-        elif type == Chess.POPHASH:
+            return
+        if type == Chess.POPHASH:
             logger.debug(data)
+            return
+        # 收到着法的时刻，时钟按照这个时刻停止
+        self.game_signal.engine_event.emit(type, data, turn, time.perf_counter())
+
+    @QtCore.Slot(int, object, object, float)
+    def dispatch_engine_event(self, type, data, turn, received):
+        engine = self.engines.get(turn)
+        if engine:
+            logger.debug(
+                "engine event %s backlog %d peak %d",
+                type, engine.backlog, engine.reset_backlog()
+            )
+
+        if type in (Chess.MOVE, Chess.NOBESTMOVE, Chess.DRAW, Chess.RESIGN) and self.stale.get(turn):
+            logger.debug('ignore stale result %s', data)
+            self.stale[turn] -= 1
+            return
+
+        if type == Chess.MOVE:
+            # 界面线程的排队和延迟走子都不计入引擎的用时
+            self.clock.stop(received)
+            QtCore.QTimer.singleShot(
+                self.settings.delay.value(),
+                partial(self.move, data[0], data[1])
+            )
         elif type == Chess.DRAW:
             self.game_signal.draw.emit()
         elif type == Chess.RESIGN:
@@ -707,7 +1015,7 @@ class Game(BoardFrame, BaseContextMenuMixin):
     def board_callback(self, pos):
         if self.engine.sit.where_turn(pos) == self.engine.sit.turn:
             self.fpos = pos
-            self.board.setBoard(self.engine.sit.board, self.fpos)
+            self.board.setBoard(self.engine.sit.board, self.fpos, hints=self.get_hints(pos))
             return
 
         if not self.fpos:
@@ -715,8 +1023,20 @@ class Game(BoardFrame, BaseContextMenuMixin):
 
         self.move(self.fpos, pos)
 
+    def get_hints(self, pos):
+        # 选中棋子之后，提示可以走的位置
+        sit = self.engine.sit
+        fsq = sit.square(pos)
+        return [sit.where(tsq) for sq, tsq in sit.legal_moves() if sq == fsq]
+
     def closeEvent(self, event):
         self.engine.close()
+        for turn in self.engines:
+            self.close_engine(turn)
+        self.stop_analysis()
+        self.pool.close()
+        if self.book:
+            self.book.close()
         return super().closeEvent(event)
 
     def connecting(self):
@@ -747,8 +1067,11 @@ def main():
 
     window = Game()
     window.show()
+    trace('show')
     sys.exit(app.exec())
 
 
 if __name__ == '__main__':
+    # 打包之后多进程搜索需要
+    multiprocessing.freeze_support()
     main()
@@ -1,7 +1,6 @@
 # coding=utf-8
 
 import re
-import numpy as np
 
 from chess import Chess
 from logger import logger
@@ -77,6 +76,43 @@ FORWARD = '进'
 BACKWARD = '退'
 TOWARD = '平'
 
+RESULTS = {'1-0', '0-1', '1/2-1/2'}
+
+
+def iter_games(lines):
+    '''
+    从多局棋谱中逐局读取，返回 (棋谱, 结果)，结果是 1-0 0-1 1/2-1/2 或者 None
+
+    fen 开头的行各是一局，结果在制表符分隔的字段中；
+    中文棋谱以空行分隔，结果在最后。
+    '''
+    block = []
+    for line in lines:
+        line = line.strip()
+        if line.startswith('fen '):
+            fields = line.split('\t')
+            result = None
+            for field in fields[1:]:
+                if field.strip() in RESULTS:
+                    result = field.strip()
+            yield fields[0], result
+            continue
+        if line:
+            block.append(line)
+            continue
+        if block:
+            yield split_result('\n'.join(block))
+            block = []
+    if block:
+        yield split_result('\n'.join(block))
+
+
+def split_result(text):
+    items = text.rsplit(None, 1)
+    if len(items) == 2 and items[1] in RESULTS:
+        return items[0], items[1]
+    return text, None
+
 
 class Line(object):
 
@@ -88,9 +124,11 @@ class Line(object):
 
 class Manual(object):
 
-    def __init__(self) -> None:
+    def __init__(self, fast=False) -> None:
         self.callback = None
         self.sit = Situation()
+        # 快速回放只检查着法是否合法，不判断将军和将死，用于批量导入
+        self.fast = fast
 
     def parse(self, content: str):
         lines = content.splitlines()
@@ -109,20 +147,29 @@ class Manual(object):
                 continue
             for move in line.moves:
                 fpos, tpos = self.parse_move(line, move)
-                result = self.sit.move(fpos, tpos)
+                if self.fast:
+                    result = self.fast_move(fpos, tpos)
+                else:
+                    result = self.sit.move(fpos, tpos)
                 if not result:
                     self.invalid_manual(line, move)
                 if callable(self.callback):
                     self.callback(fpos, tpos)
 
+    def fast_move(self, fpos, tpos):
+        sit = self.sit
+        if not sit.validate_move(fpos, tpos):
+            return False
+        sit.make_move(sit.square(fpos), sit.square(tpos))
+        sit.moves.append((fpos, tpos))
+        return Chess.MOVE
+
     def parse_move(self, line: Line, move: str):
         logger.debug("parse move %s", move)
-        board = self.sit.board
-        if self.sit.turn == Chess.RED:
-            board = np.rot90(board, k=2)
 
-        fpos = self.get_fpos(board, line, move)
-        tpos = self.get_tpos(board, fpos, move)
+        # 以下的位置都是走棋方视角的位置，红方需要旋转棋盘
+        fpos, chess = self.get_fpos(line, move)
+        tpos = self.get_tpos(chess, fpos, move)
 
         if self.sit.turn == Chess.RED:
             fpos = (8 - fpos[0], 9 - fpos[1])
@@ -133,7 +180,18 @@ class Manual(object):
     def invalid_manual(self, line: Line, move: str):
         raise Exception(f'棋谱第 {line.nr} 行 {move} 不合法')
 
-    def get_fpos(self, board, line, move):
+    def get_wheres(self, chess):
+        # 从棋子列表中查找棋子的位置，不扫描整个棋盘
+        sit = self.sit
+        wheres = [
+            sit.where(sq) for sq in sit.pieces[sit.turn]
+            if sit.squares[sq] == chess
+        ]
+        if sit.turn == Chess.RED:
+            wheres = [(8 - where[0], 9 - where[1]) for where in wheres]
+        return wheres
+
+    def get_fpos(self, line, move):
         if PATTERN1.match(move[:2]):
             chess = CHESSES[move[0]] | self.sit.turn
             pos = NUMBERS[move[1]] - 1
@@ -144,13 +202,13 @@ class Manual(object):
             pos = NUMBERS[move[0]]
             type = 2
         else:
-            self.invalid_manual()
+            self.invalid_manual(line, move)
 
         ctype = chess & Chess.CMASK
         logger.debug("chess %s pos %s", chess, pos)
-        wheres = np.argwhere(board == chess)
+        wheres = self.get_wheres(chess)
         if len(wheres) == 1:
-            return tuple(wheres[0])
+            return wheres[0], chess
 
         wheres = sorted(wheres, key=lambda e: (e[0], e[1]))
 
@@ -159,14 +217,14 @@ class Manual(object):
             for where in wheres:
                 if where[0] != pos:
                     continue
-                result.append(tuple(where))
+                result.append(where)
             if len(result) == 1:
-                return result[0]
+                return result[0], chess
             if ctype in (Chess.ADVISOR, Chess.BISHOP):
                 if move[2] == BACKWARD:
-                    return result[-1]
+                    return result[-1], chess
                 else:
-                    return result[0]
+                    return result[0], chess
             self.invalid_manual(line, move)
         else:
             columns = {}
@@ -178,31 +236,30 @@ class Manual(object):
                     del columns[key]
             columns = sorted(columns.items(), key=lambda e: e[0], reverse=True)
             if move[0] == '前':
-                return tuple(columns[0][1][-1])
+                return columns[0][1][-1], chess
             elif move[0] == '中':
-                return tuple(columns[0][1][-2])
+                return columns[0][1][-2], chess
             elif move[0] == '后':
-                return tuple(columns[0][1][0])
+                return columns[0][1][0], chess
 
-            index = self.numbers[move[0]]
+            index = NUMBERS[move[0]]
             counter = 1
             for idx, column in columns:
                 column = list(column)
                 column.reverse()
                 for where in column:
                     if counter == index:
-                        return tuple(where)
+                        return where, chess
                     counter += 1
 
             self.invalid_manual(line, move)
 
-    def get_tpos(self, board, fpos, move):
+    def get_tpos(self, chess, fpos, move):
         pos = NUMBERS[move[3]]
         action = move[2]
         if action == '平':
             return (pos - 1, fpos[1])
 
-        chess = board[fpos]
         ctype = chess & Chess.CMASK
 
         if ctype in (Chess.KING, Chess.ROOK, Chess.CANNON, Chess.PAWN):
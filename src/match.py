@@ -0,0 +1,355 @@
+# coding=utf-8
+'''
+(C) Copyright 2021 Steven;
+@author: Steven kangweibaby@163.com
+@date: 2021-07-19
+引擎对局，不依赖界面，同时进行多局比赛并计算等级分差
+
+    python match.py eleeye native --games 20 --concurrency 4 --depth 5
+    python match.py PiKaFishEngine binghe --time 3000 --openings openings.txt --pgn match.pgn
+
+--time 是双方每一步的时间，发送 go time 3000 movestogo 1，引擎把剩余时间全部用在这一步上，
+不是整局的时间。
+
+引擎可以用类名、NAME 或者 engines 中的目录名指定。
+每个开局按顺序交换先后手各下一局，开局文件每行一个 FEN，可以带 moves，# 开头的行忽略。
+'''
+
+import sys
+import math
+import queue
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from chess import Chess
+from engine import Engine
+from logger import logger
+from pool import EnginePool
+
+# 60 回合没有吃子判和
+DRAW_IDLE = 120
+# 超过这个步数判和
+MAX_PLIES = 400
+
+RESULTS = {
+    Chess.RED: '1-0',
+    Chess.BLACK: '0-1',
+    Chess.DRAW: '1/2-1/2',
+}
+
+
+def load_openings(filename=None):
+    if not filename:
+        return ['startpos']
+    result = []
+    with open(filename, encoding='utf8') as file:
+        for line in file:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            result.append(line)
+    if not result:
+        raise ValueError(f'no opening in {filename}')
+    return result
+
+
+def select_engine(name):
+    from engines import UCCI_ENGINES
+    for engine in UCCI_ENGINES:
+        names = {engine.__name__, engine.NAME, engine.__module__.split('.')[-1]}
+        if name in names or name.lower() in {var.lower() for var in names}:
+            return engine
+    raise ValueError(f'engine {name} not found')
+
+
+def get_elo(wins, draws, losses):
+    # 返回等级分差和 95% 置信区间的半宽，全胜或者全负时为无穷大
+    total = wins + draws + losses
+    if not total:
+        return 0.0, 0.0
+
+    def elo(score):
+        if score <= 0:
+            return -math.inf
+        if score >= 1:
+            return math.inf
+        return -400 * math.log10(1 / score - 1)
+
+    score = (wins + draws / 2) / total
+    if score in (0, 1):
+        return elo(score), math.inf
+
+    variance = (
+        wins * (1 - score) ** 2 +
+        draws * (0.5 - score) ** 2 +
+        losses * score ** 2
+    ) / total
+    error = 1.96 * math.sqrt(variance / total)
+    margin = (elo(score + error) - elo(score - error)) / 2
+    # 加 0.0 避免输出 -0.0
+    return elo(score) + 0.0, margin
+
+
+def format_iccs(move):
+    return f'{move[:2].upper()}-{move[2:].upper()}'
+
+
+class MatchGame(object):
+
+    '''
+    一局对局，red 和 black 是已经启动的引擎，结果是 (RESULTS 中的胜方, 原因)
+    '''
+
+    def __init__(self, red: Engine, black: Engine, fen, params, timeout=60):
+        self.engines = {
+            Chess.RED: red,
+            Chess.BLACK: black,
+        }
+        self.fen = fen
+        self.params = params
+        self.timeout = timeout
+        self.results = queue.Queue()
+        self.record = Engine()
+        self.winner = None
+        self.reason = None
+
+    def callback(self, type, data):
+        if type in (Chess.INFO, Chess.POPHASH):
+            return
+        self.results.put((type, data))
+
+    def load(self):
+        sit = self.record.sit
+        if not sit.parse_fen(self.fen, load=True):
+            raise ValueError(f'invalid fen {self.fen}')
+        moves = sit.moves
+        sit.moves = []
+        for fpos, tpos in moves:
+            result = self.record.move(fpos, tpos)
+            if not result or result == Chess.INVALID:
+                raise ValueError(f'invalid opening {self.fen}')
+
+    def play(self):
+        self.load()
+        for engine in self.engines.values():
+            engine.callback = self.callback
+
+        while self.winner is None:
+            self.winner, self.reason = self.step()
+        return self.winner, self.reason
+
+    def step(self):
+        record = self.record
+        sit = record.sit
+        turn = sit.turn
+        other = Chess.invert(turn)
+
+        if record.checkmate:
+            return other, 'checkmate'
+        if sit.idle >= DRAW_IDLE:
+            return Chess.DRAW, 'idle'
+        if len(record.stack) > MAX_PLIES:
+            return Chess.DRAW, 'length'
+
+        engine = self.engines[turn]
+        engine.position(sit.format_fen())
+        engine.banmoves([
+            sit.format_move(sit.where(fsq), sit.where(tsq))
+            for fsq, tsq in record.get_banmoves()
+        ])
+        engine.go(**self.params)
+
+        try:
+            type, data = self.results.get(timeout=self.timeout)
+        except queue.Empty:
+            engine.stop()
+            return other, 'timeout'
+
+        if type == Chess.RESIGN:
+            return other, 'resign'
+        if type == Chess.NOBESTMOVE:
+            return other, 'nobestmove'
+        if type == Chess.DRAW:
+            return Chess.DRAW, 'draw'
+
+        result = record.move(*data)
+        if not result or result == Chess.INVALID:
+            return other, 'illegal'
+        if result == Chess.CHECKMATE:
+            return turn, 'checkmate'
+
+        judge = record.judge()
+        if judge == Chess.DRAW:
+            return Chess.DRAW, 'repetition'
+        if judge is not None:
+            return Chess.invert(judge), 'repetition'
+        return None, None
+
+    def format_fen(self):
+        return f'{self.record.sit.format_fen()}\t{RESULTS[self.winner]}\t{self.reason}'
+
+    def format_pgn(self, round, red, black):
+        first = self.record.stack[0]
+        result = RESULTS[self.winner]
+        lines = [
+            '[Game "Chinese Chess"]',
+            '[Event "Engine Match"]',
+            f'[Round "{round}"]',
+            f'[Red "{red}"]',
+            f'[Black "{black}"]',
+            f'[Result "{result}"]',
+            f'[FEN "{first.format_current_fen()}"]',
+            '[Format "ICCS"]',
+            f'[Termination "{self.reason}"]',
+            '',
+        ]
+
+        moves = [
+            format_iccs(first.format_move(fpos, tpos))
+            for fpos, tpos in self.record.sit.moves
+        ]
+        if first.turn == Chess.BLACK:
+            moves.insert(0, '...')
+        for idx in range(0, len(moves), 2):
+            lines.append(f'{idx // 2 + 1}. {" ".join(moves[idx: idx + 2])}')
+        lines.append(result)
+        lines.append('')
+        return '\n'.join(lines)
+
+
+class Match(object):
+
+    '''
+    first 和 second 是引擎类，games 局比赛，同时进行 concurrency 局，
+    结果都从 first 的角度统计
+    '''
+
+    def __init__(self, first, second, games=2, concurrency=1,
+                 openings=None, params=None, timeout=60):
+        self.first = first
+        self.second = second
+        self.games = games
+        self.concurrency = concurrency
+        self.openings = openings or ['startpos']
+        self.params = params or {'depth': 3}
+        self.timeout = timeout
+
+        self.pool = EnginePool(limit=concurrency * 2)
+        self.lock = threading.Lock()
+        self.wins = 0
+        self.draws = 0
+        self.losses = 0
+
+    def play(self, round):
+        # round 从 0 开始，每个开局交换先后手各下一局
+        fen = self.openings[(round // 2) % len(self.openings)]
+        swap = round % 2 == 1
+        red, black = (self.second, self.first) if swap else (self.first, self.second)
+
+        engines = [
+            self.pool.acquire(red),
+            self.pool.acquire(black),
+        ]
+        # 对局只需要着法，忽略搜索信息
+        for engine in engines:
+            engine.subscribe('info', False)
+        game = MatchGame(engines[0], engines[1], fen, self.params, self.timeout)
+        try:
+            game.play()
+        finally:
+            for engine in engines:
+                self.pool.release(engine)
+
+        with self.lock:
+            first = Chess.BLACK if swap else Chess.RED
+            if game.winner == Chess.DRAW:
+                self.draws += 1
+            elif game.winner == first:
+                self.wins += 1
+            else:
+                self.losses += 1
+        return game, red.NAME, black.NAME
+
+    def run(self, pgn=None, fen=None):
+        logger.info("match %s vs %s games %d", self.first.NAME, self.second.NAME, self.games)
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                futures = [executor.submit(self.play, round) for round in range(self.games)]
+                for round, future in enumerate(futures):
+                    game, red, black = future.result()
+                    print(
+                        f'game {round + 1} {red} vs {black} '
+                        f'{RESULTS[game.winner]} {game.reason} '
+                        f'{self.format_score()}'
+                    )
+                    if pgn:
+                        pgn.write(game.format_pgn(round + 1, red, black))
+                        pgn.write('\n')
+                        pgn.flush()
+                    if fen:
+                        fen.write(game.format_fen())
+                        fen.write('\n')
+                        fen.flush()
+        finally:
+            self.pool.close()
+        return self.wins, self.draws, self.losses
+
+    def format_score(self):
+        elo, margin = get_elo(self.wins, self.draws, self.losses)
+        total = self.wins + self.draws + self.losses
+        score = (self.wins + self.draws / 2) / total * 100 if total else 0
+        return f'+{self.wins} ={self.draws} -{self.losses} score {score:.1f}% elo {elo:+.1f} ± {margin:.1f}'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='中国象棋引擎对局')
+    parser.add_argument('first', help='第一个引擎')
+    parser.add_argument('second', help='第二个引擎')
+    parser.add_argument('--games', type=int, default=2, help='对局数')
+    parser.add_argument('--concurrency', type=int, default=1, help='同时进行的对局数')
+    parser.add_argument('--openings', help='开局 FEN 文件')
+    parser.add_argument('--depth', type=int, help='搜索深度')
+    parser.add_argument('--time', type=int, help='双方每步的时间，毫秒，不是整局时间')
+    parser.add_argument('--timeout', type=float, default=60, help='每步最长等待时间，秒')
+    parser.add_argument('--pgn', help='PGN 输出文件')
+    parser.add_argument('--fen', help='FEN 输出文件，每局一行')
+    parser.add_argument('-v', '--verbose', action='store_true', help='输出调试日志')
+    args = parser.parse_args(argv)
+
+    if not args.verbose:
+        logger.setLevel(logging.WARNING)
+
+    params = {}
+    if args.time:
+        # movestogo 1 表示这些时间只用于这一步，只发 time 的话引擎会当作整局的剩余时间
+        params = {'time': args.time, 'movestogo': 1}
+    else:
+        params = {'depth': args.depth or 3}
+
+    match = Match(
+        select_engine(args.first),
+        select_engine(args.second),
+        games=args.games,
+        concurrency=args.concurrency,
+        openings=load_openings(args.openings),
+        params=params,
+        timeout=args.timeout,
+    )
+
+    pgn = open(args.pgn, 'w', encoding='utf8') if args.pgn else None
+    fen = open(args.fen, 'w', encoding='utf8') if args.fen else None
+    try:
+        match.run(pgn, fen)
+    finally:
+        for file in (pgn, fen):
+            if file:
+                file.close()
+
+    print(f'{match.first.NAME} vs {match.second.NAME} {match.format_score()}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
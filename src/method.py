@@ -6,8 +6,6 @@
 '''
 
 # coding=utf-8
-import numpy as np
-
 from chess import Chess
 
 
@@ -114,6 +112,7 @@ class Method(object):
         return result
 
     def get_pawns(self, board, chess):
+        import numpy as np
         wheres = np.argwhere(board == chess)
         return wheres
 
@@ -149,6 +148,7 @@ class Method(object):
 
         # 以下为卒的情况
 
+        import numpy as np
         wheres = np.argwhere(board == chess)
 
         columns = {}
@@ -0,0 +1,153 @@
+# coding=utf-8
+'''
+(C) Copyright 2021 Steven;
+@author: Steven kangweibaby@163.com
+@date: 2021-07-10
+多进程的 Lazy SMP 搜索
+
+Python 的搜索受 GIL 限制只能用一个核，这里启动多个辅助进程在同一个局面上搜索，
+所有进程通过共享内存使用同一个置换表，辅助进程的搜索结果通过置换表帮助主搜索，
+最终的着法只取主搜索的结果。
+'''
+
+import queue
+import multiprocessing
+from multiprocessing import shared_memory
+
+from logger import logger
+from search import Search
+from transposition import TranspositionTable
+
+# 等待辅助进程结果的时候，每隔多少秒检查一次进程是否还在
+POLL_INTERVAL = 0.1
+
+
+def worker(name, size, index, tasks, results, signal):
+    # 辅助进程，不断从 tasks 读取局面进行搜索，直到 signal 被设置
+    from situation import GENERATOR
+
+    memory = shared_memory.SharedMemory(name=name)
+    table = TranspositionTable(size, memory.buf)
+    searcher = Search(table=table)
+    searcher.signal = signal
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        squares, turn, depth, banmoves, age = task
+        position = GENERATOR()
+        position.squares = bytearray(squares)
+        position.turn = turn
+        position.load_pieces()
+
+        # 奇数编号的进程从更深一层开始，让各个进程搜索的树尽量错开
+        searcher.search(
+            position, depth=depth, banmoves=banmoves,
+            start=1 + index % 2, age=age,
+        )
+        results.put(searcher.nodes)
+
+    table.release()
+    memory.close()
+
+
+class ParallelSearch(Search):
+
+    '''
+    接口与 Search 相同，threads 是包括主搜索在内的进程数
+    '''
+
+    def __init__(self, hashsize=TranspositionTable.DEFAULT_SIZE, threads=2):
+        table = self.setup(hashsize, threads)
+        super().__init__(table=table)
+
+    def setup(self, hashsize, threads):
+        # 创建共享内存的置换表并启动辅助进程，返回置换表
+        hashsize = max(1, int(hashsize))
+        self.memory = shared_memory.SharedMemory(create=True, size=hashsize << 20)
+        table = TranspositionTable(hashsize, self.memory.buf)
+
+        context = multiprocessing.get_context('spawn')
+        self.done = context.Event()
+        self.results = context.Queue()
+        self.tasks = []
+        self.workers = []
+        for index in range(1, threads):
+            tasks = context.Queue()
+            process = context.Process(
+                target=worker,
+                args=(self.memory.name, hashsize, index, tasks, self.results, self.done),
+                name=f'SearchWorker-{index}',
+                daemon=True,
+            )
+            process.start()
+            self.tasks.append(tasks)
+            self.workers.append(process)
+        logger.info("parallel search with %d workers", len(self.workers))
+        return table
+
+    def resize(self, hashsize):
+        if hashsize == self.table.size:
+            return
+        threads = len(self.workers) + 1
+        self.close()
+        self.table = self.setup(hashsize, threads)
+
+    def remove_dead(self):
+        # 去掉异常退出的辅助进程，返回去掉的个数
+        alive = [process.is_alive() for process in self.workers]
+        for process, flag in zip(self.workers, alive):
+            if not flag:
+                logger.warning("%s exited with code %s", process.name, process.exitcode)
+        self.tasks = [tasks for tasks, flag in zip(self.tasks, alive) if flag]
+        self.workers = [process for process, flag in zip(self.workers, alive) if flag]
+        return alive.count(False)
+
+    def collect(self):
+        # 等待辅助进程结束这次搜索，返回辅助进程的节点数
+        # 进程异常退出的时候不会返回结果，不能一直等待
+        total = 0
+        pending = len(self.tasks)
+        while pending > 0:
+            try:
+                total += self.results.get(timeout=POLL_INTERVAL)
+                pending -= 1
+            except queue.Empty:
+                pending -= self.remove_dead()
+        return total
+
+    def close(self):
+        for tasks in self.tasks:
+            tasks.put(None)
+        for process in self.workers:
+            process.join()
+        self.tasks = []
+        self.workers = []
+        self.table.release()
+        self.memory.close()
+        self.memory.unlink()
+
+    def stop(self):
+        super().stop()
+        self.done.set()
+
+    def search(self, position, depth=None, nodes=None, movetime=None,
+               banmoves=None, callback=None, start=1, age=None):
+        self.table.new_search()
+        self.done.clear()
+
+        task = (bytes(position.squares), position.turn, depth, banmoves, self.table.age)
+        for tasks in self.tasks:
+            tasks.put(task)
+
+        try:
+            return super().search(
+                position, depth=depth, nodes=nodes, movetime=movetime,
+                banmoves=banmoves, callback=callback, start=start, age=self.table.age,
+            )
+        finally:
+            # 主搜索结束之后停止所有的辅助进程
+            self.done.set()
+            total = self.nodes + self.collect()
+            logger.info("parallel search nodes %d main %d", total, self.nodes)
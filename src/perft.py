@@ -0,0 +1,168 @@
+# coding=utf-8
+'''
+(C) Copyright 2021 Steven;
+@author: Steven kangweibaby@163.com
+@date: 2021-07-12
+走法生成的 perft 测试，检查叶子节点数并统计速度，不依赖界面
+
+    python perft.py
+    python perft.py --depth 3
+    python perft.py --fen "<fen>" --depth 4 --divide
+
+使用位棋盘生成器: CHESS_GENERATOR=bitboard python perft.py
+'''
+
+import sys
+import time
+import logging
+import argparse
+
+from logger import logger
+from situation import Situation
+from situation import GENERATOR
+
+# (名称, FEN, 从第一层开始的叶子节点数)
+POSITIONS = [
+    (
+        'startpos',
+        'rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/9/RNBAKABNR w - - 0 1',
+        (44, 1920, 79666, 3290240, 133312995),
+    ),
+    (
+        'middle',
+        'r1ba1a3/4kn3/2n1b4/pNp1p1p1p/4c4/6P2/P1P2R2P/1CcC5/9/2BAKAB2 w - - 0 1',
+        (38, 1128, 43929, 1339047),
+    ),
+    (
+        'knights',
+        '1cbak4/9/n2a5/2p1p3p/5cp2/2n2N3/6PCP/3AB4/2C6/3A1K1N1 w - - 0 1',
+        (7, 281, 8620, 326201),
+    ),
+    (
+        'rooks',
+        '5a3/3k5/3aR4/9/5r3/5n3/9/3A1A3/5K3/2BC2B2 w - - 0 1',
+        (25, 424, 9850, 202884),
+    ),
+    (
+        'cannon_check',
+        'CRN1k1b2/3ca4/4ba3/9/2nr5/9/9/4B4/4A4/4KA3 w - - 0 1',
+        (28, 516, 14808, 395483),
+    ),
+    (
+        'rook_knight',
+        'R1N1k1b2/9/3aba3/9/2nr5/2B6/9/4B4/4A4/4KA3 w - - 0 1',
+        (21, 364, 7626, 162837),
+    ),
+    (
+        'pawns',
+        'C1nNk4/9/9/9/9/9/n1pp5/B3C4/9/3A1K3 w - - 0 1',
+        (28, 222, 6241, 64971),
+    ),
+    (
+        'knight_cannon',
+        '4ka3/4a4/9/9/4N4/p8/9/4C3c/7n1/2BK5 w - - 0 1',
+        (23, 345, 8124, 149272),
+    ),
+    (
+        'bishops',
+        '2b1ka3/9/b3N4/4n4/9/9/9/4C4/2p6/2BK5 w - - 0 1',
+        (21, 195, 3883, 48060),
+    ),
+    (
+        'double_cannon',
+        '1C2ka3/9/C1Nab1n2/p3p3p/6p2/9/P3P3P/3AB4/3p2c2/c1BAK4 w - - 0 1',
+        (30, 830, 22787, 649866),
+    ),
+    (
+        'discovered',
+        'CnN1k1b2/c3a4/4ba3/9/2nr5/9/9/4C4/4A4/4KA3 w - - 0 1',
+        (19, 583, 11714, 376467),
+    ),
+]
+
+
+def load(fen):
+    sit = Situation()
+    if not sit.parse_fen(fen):
+        raise ValueError(f'invalid fen {fen}')
+    return sit
+
+
+def divide(sit, depth):
+    # 每个着法之后的叶子节点数，用于定位出错的着法
+    result = []
+    for fsq, tsq in sit.legal_moves():
+        undo = sit.make_move(fsq, tsq)
+        nodes = sit.perft(depth - 1)
+        sit.unmake_move(undo)
+        result.append((sit.format_move(sit.where(fsq), sit.where(tsq)), nodes))
+    return result
+
+
+def run(name, fen, depth, expected=None):
+    # 返回 (节点数, 耗时, 是否正确)，没有已知结果时正确为 None
+    sit = load(fen)
+    start = time.perf_counter()
+    nodes = sit.perft(depth)
+    elapsed = time.perf_counter() - start
+
+    correct = None
+    if expected and depth <= len(expected):
+        correct = nodes == expected[depth - 1]
+
+    nps = nodes / elapsed if elapsed else 0
+    mark = {None: '-', True: 'ok', False: 'FAIL'}[correct]
+    print(f'{name:<16} depth {depth} nodes {nodes:>10} time {elapsed:8.3f}s nps {nps:>10.0f} {mark}')
+    if correct is False:
+        print(f'{"":<16} expected {expected[depth - 1]}')
+    return nodes, elapsed, correct
+
+
+def benchmark(depth, positions=POSITIONS):
+    # 逐层运行所有局面，返回是否全部正确
+    total_nodes = 0
+    total_time = 0
+    failed = 0
+    for name, fen, expected in positions:
+        for var in range(1, min(depth, len(expected)) + 1):
+            nodes, elapsed, correct = run(name, fen, var, expected)
+            total_nodes += nodes
+            total_time += elapsed
+            if correct is False:
+                failed += 1
+
+    nps = total_nodes / total_time if total_time else 0
+    print(f'generator {GENERATOR.__name__} total nodes {total_nodes} time {total_time:.3f}s nps {nps:.0f}')
+    if failed:
+        print(f'{failed} failed')
+    return not failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='中国象棋走法生成 perft 测试')
+    parser.add_argument('--depth', type=int, default=3, help='最大深度')
+    parser.add_argument('--fen', help='只测试这个局面')
+    parser.add_argument('--divide', action='store_true', help='输出每个着法的节点数')
+    args = parser.parse_args()
+
+    logger.setLevel(logging.WARNING)
+
+    if not args.fen:
+        return 0 if benchmark(args.depth) else 1
+
+    expected = None
+    for name, fen, counts in POSITIONS:
+        if fen == args.fen:
+            expected = counts
+
+    if args.divide:
+        sit = load(args.fen)
+        for move, nodes in divide(sit, args.depth):
+            print(move, nodes)
+
+    _, _, correct = run('fen', args.fen, args.depth, expected)
+    return 1 if correct is False else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
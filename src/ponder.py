@@ -0,0 +1,55 @@
+# coding=utf-8
+'''
+(C) Copyright 2021 Steven;
+@author: Steven kangweibaby@163.com
+@date: 2021-07-22
+后台思考的状态，记录正在后台思考的一方和猜测着法之后的局面
+
+对方走棋之后用 check 判断是否猜中，并记录到引擎的猜中率中。
+悔棋、提示、换引擎或者重新开局的时候调用 cancel，这些情况不计入猜中率。
+'''
+
+from logger import logger
+from situation import Situation
+
+
+class Ponder(object):
+
+    def __init__(self):
+        self.turn = None
+        self.fen = None
+
+    @property
+    def active(self):
+        return self.turn is not None
+
+    def start(self, turn, sit: Situation, move):
+        # 返回 turn 一方后台思考的局面，也就是 sit 走了 move 之后的局面
+        fen = sit.format_fen()
+        fen = f'{fen} {move}' if sit.moves else f'{fen} moves {move}'
+        self.turn = turn
+        self.fen = fen
+        return fen
+
+    def cancel(self):
+        # 返回之前后台思考的一方
+        turn = self.turn
+        self.turn = None
+        self.fen = None
+        return turn
+
+    def check(self, sit: Situation, stats=None):
+        # 对方走完之后调用，返回 (后台思考的一方, 是否猜中)
+        turn, fen = self.turn, self.fen
+        self.cancel()
+        if turn != sit.turn:
+            return turn, False
+
+        hit = fen == sit.format_fen()
+        if stats is not None:
+            stats.record_ponder(hit)
+            logger.info(
+                "ponder %s hit rate %d/%d", 'hit' if hit else 'miss',
+                stats.ponderhits, stats.ponders
+            )
+        return turn, hit
@@ -0,0 +1,69 @@
+# coding=utf-8
+'''
+(C) Copyright 2021 Steven;
+@author: Steven kangweibaby@163.com
+@date: 2021-07-16
+引擎池，按引擎类型保存已经启动的引擎
+
+启动引擎进程、ucci 握手以及载入开局库和网络都比较慢，新的对局或者切换引擎的时候，
+把不用的引擎放回池中，下次需要的时候清空置换表之后继续使用，不需要重新启动。
+'''
+
+import threading
+
+from engine import Engine
+from logger import logger
+
+
+class EnginePool(object):
+
+    '''
+    acquire 按类型取出一个空闲的引擎，没有的话启动一个新的，
+    release 把引擎放回池中，同一个类型最多保留 limit 个空闲引擎。
+    '''
+
+    def __init__(self, limit=2):
+        self.limit = limit
+        self.idle = {}
+        self.lock = threading.Lock()
+
+    def acquire(self, engine_class, callback=None) -> Engine:
+        with self.lock:
+            engines = self.idle.get(engine_class, [])
+            engine = engines.pop() if engines else None
+
+        if not engine:
+            logger.info("engine pool spawn %s", engine_class.NAME)
+            engine = engine_class(callback=callback)
+            engine.start()
+            return engine
+
+        logger.info("engine pool reuse %s", engine_class.NAME)
+        engine.callback = callback
+        engine.clearhash()
+        engine.position()
+        return engine
+
+    def release(self, engine: Engine):
+        if not engine:
+            return
+
+        # 正在思考的引擎之后还会输出着法，直接关闭
+        if not engine.running or engine.state != Engine.ENGINE_IDLE:
+            engine.close()
+            return
+
+        engine.callback = None
+        with self.lock:
+            engines = self.idle.setdefault(type(engine), [])
+            if len(engines) < self.limit:
+                engines.append(engine)
+                return
+        engine.close()
+
+    def close(self):
+        with self.lock:
+            engines = [engine for var in self.idle.values() for engine in var]
+            self.idle = {}
+        for engine in engines:
+            engine.close()
@@ -0,0 +1,152 @@
+# coding=utf-8
+'''
+(C) Copyright 2021 Steven;
+@author: Steven kangweibaby@163.com
+@date: 2021-06-22
+紧凑的局面核心，棋盘使用 90 个元素的 bytearray 表示，支持原地走子和撤销
+'''
+
+import copy
+
+from chess import Chess
+from tables import ZOBRIST
+from tables import ZOBRIST_TURN
+
+
+class Position(object):
+
+    '''
+    棋盘使用一维数组 squares 表示，下标 sq = x * 10 + y，
+    与 numpy (9, 10) 矩阵的内存布局一致，所以:
+
+        pos -> sq: x * 10 + y
+        sq -> pos: divmod(sq, 10)
+
+    pieces 记录双方棋子所在的位置，kings 记录双方老将的位置，
+    走子时增量更新，避免扫描整个棋盘。
+
+    make_move 原地走子并返回撤销记录 (fsq, tsq, captured)，
+    unmake_move 根据撤销记录恢复局面，这样试走一步不需要复制整个棋盘。
+
+    zobrist 是所有棋子位置的 Zobrist 键值的异或，走子时增量更新，
+    key 再加上走棋方，作为局面的 64 位标识。
+    '''
+
+    def __init__(self, board=None, turn=Chess.RED):
+        self.turn = turn
+        if board is None:
+            self.squares = bytearray(Chess.ORIGIN_SQUARES)
+            self.load_pieces()
+        else:
+            self.load_board(board)
+
+    @staticmethod
+    def square(pos):
+        # pos 可能来自 numpy，转换成 Python 整数，位棋盘移位需要
+        return int(pos[0] * Chess.H + pos[1])
+
+    @staticmethod
+    def where(sq):
+        return divmod(sq, Chess.H)
+
+    def load_board(self, board):
+        # 从 numpy 矩阵载入棋盘
+        import numpy as np
+        self.squares = bytearray(np.asarray(board, dtype=np.uint8).tobytes())
+        self.load_pieces()
+
+    def load_pieces(self):
+        # 根据 squares 重建棋子列表，只在载入局面时调用
+        self.pieces = {
+            Chess.RED: set(),
+            Chess.BLACK: set(),
+        }
+        self.kings = {
+            Chess.RED: None,
+            Chess.BLACK: None,
+        }
+        self.zobrist = 0
+        for sq, chess in enumerate(self.squares):
+            if not chess:
+                continue
+            self.zobrist ^= ZOBRIST[chess][sq]
+            self.pieces[chess & Chess.TMASK].add(sq)
+            if chess & Chess.CMASK == Chess.KING:
+                self.kings[chess & Chess.TMASK] = sq
+
+    @property
+    def key(self):
+        if self.turn == Chess.BLACK:
+            return self.zobrist ^ ZOBRIST_TURN
+        return self.zobrist
+
+    @property
+    def board(self):
+        # 棋盘的 numpy 矩阵视图，供界面和着法描述使用，每次返回新的副本
+        import numpy as np
+        board = np.frombuffer(bytes(self.squares), dtype=np.uint8)
+        return np.mat(board.reshape(Chess.W, Chess.H), dtype=int)
+
+    @board.setter
+    def board(self, board):
+        self.load_board(board)
+
+    def make_move(self, fsq, tsq):
+        squares = self.squares
+        chess = squares[fsq]
+        captured = squares[tsq]
+
+        side = chess & Chess.TMASK
+        pieces = self.pieces[side]
+        pieces.remove(fsq)
+        pieces.add(tsq)
+        keys = ZOBRIST[chess]
+        self.zobrist ^= keys[fsq] ^ keys[tsq]
+        if captured:
+            self.pieces[captured & Chess.TMASK].remove(tsq)
+            self.zobrist ^= ZOBRIST[captured][tsq]
+        if chess & Chess.CMASK == Chess.KING:
+            self.kings[side] = tsq
+
+        squares[tsq] = chess
+        squares[fsq] = Chess.NONE
+        self.turn ^= Chess.TMASK  # 红黑互换
+        return (fsq, tsq, captured)
+
+    def unmake_move(self, undo):
+        fsq, tsq, captured = undo
+        squares = self.squares
+        chess = squares[tsq]
+
+        side = chess & Chess.TMASK
+        pieces = self.pieces[side]
+        pieces.remove(tsq)
+        pieces.add(fsq)
+        keys = ZOBRIST[chess]
+        self.zobrist ^= keys[fsq] ^ keys[tsq]
+        if captured:
+            self.pieces[captured & Chess.TMASK].add(tsq)
+            self.zobrist ^= ZOBRIST[captured][tsq]
+        if chess & Chess.CMASK == Chess.KING:
+            self.kings[side] = fsq
+
+        squares[fsq] = chess
+        squares[tsq] = captured
+        self.turn ^= Chess.TMASK
+
+    def copy(self):
+        position = copy.copy(self)
+        position.squares = bytearray(self.squares)
+        position.pieces = {
+            Chess.RED: set(self.pieces[Chess.RED]),
+            Chess.BLACK: set(self.pieces[Chess.BLACK]),
+        }
+        position.kings = dict(self.kings)
+        return position
+
+    def get_king(self, turn):
+        # turn 方老将的位置，老将被吃掉 (只可能在试走中出现) 或者不存在返回 None
+        king = self.kings[turn]
+        if king is None or self.squares[king] != Chess.KING | turn:
+            return None
+        return king
@@ -0,0 +1,136 @@
+# coding=utf-8
+'''
+(C) Copyright 2021 Steven;
+@author: Steven kangweibaby@163.com
+@date: 2021-05-31
+局面重复检测，以及按照亚洲规则判断长将长捉
+'''
+
+from chess import Chess
+from logger import logger
+
+
+class Repetition(object):
+
+    '''
+    用于 Engine 的局面重复检测
+
+    positions 记录每个局面键值在 stack 中出现的位置，每走一步只需要查一次字典；
+    stack 中的每个局面记录走到该局面的一方累计将军 checks 和捉子 chases 的步数，
+    这样一个循环中某一方是否每一步都在将军或者捉子，只需要两个累计值相减。
+
+    由于 stack 可能被截断或者替换，positions 中的位置在使用的时候再校验。
+
+    judge 和 judge_cycle 的结果:
+        None: 没有重复
+        Chess.DRAW: 判和
+        Chess.RED / Chess.BLACK: 长将或者长捉的一方判负
+    '''
+
+    # 同一局面出现的次数达到该值时裁决
+    REPEAT_COUNT = 3
+
+    def register(self, index):
+        key = self.stack[index].key
+        indexes = self.positions.setdefault(key, [])
+        while indexes and indexes[-1] >= index:
+            indexes.pop()
+        indexes.append(index)
+
+    def record(self, index):
+        # 走完一步之后调用，index 是新局面在 stack 中的位置
+        if index == 1:
+            self.register(0)
+
+        sit = self.stack[index]
+        check = sit.result in (Chess.CHECK, Chess.CHECKMATE)
+        chase = sit.is_chase(sit.square(sit.tpos))
+        if index >= 2:
+            prev = self.stack[index - 2]
+            sit.checks = prev.checks + check
+            sit.chases = prev.chases + chase
+        else:
+            sit.checks = int(check)
+            sit.chases = int(chase)
+        self.register(index)
+
+    def get_occurrences(self, key, index):
+        # key 在 stack[:index + 1] 中出现的位置
+        result = []
+        for var in self.positions.get(key, []):
+            if var > index:
+                break
+            if var < len(self.stack) and self.stack[var].key == key:
+                result.append(var)
+        return result
+
+    def get_counts(self, index):
+        if index < 0:
+            return 0, 0
+        sit = self.stack[index]
+        return sit.checks, sit.chases
+
+    def judge_cycle(self, start, end, checks, chases):
+        '''
+        局面 stack[start] 在 end 重复出现，checks 和 chases 是走到 end 一方的累计值
+        '''
+        length = (end - start) // 2
+        mover = Chess.invert(self.stack[start].turn)
+        other = Chess.invert(mover)
+
+        start_checks, start_chases = self.get_counts(start)
+        mover_check = checks - start_checks == length
+        mover_chase = chases - start_chases == length
+
+        end_checks, end_chases = self.get_counts(end - 1)
+        start_checks, start_chases = self.get_counts(start - 1)
+        other_check = end_checks - start_checks == length
+        other_chase = end_chases - start_chases == length
+
+        if mover_check != other_check:
+            return mover if mover_check else other
+        if mover_check:
+            return Chess.DRAW
+        if mover_chase != other_chase:
+            return mover if mover_chase else other
+        return Chess.DRAW
+
+    def judge(self):
+        # 判断当前局面是否重复，以及重复的结果
+        index = self.index
+        sit = self.stack[index]
+        occurrences = self.get_occurrences(sit.key, index)
+        if len(occurrences) < self.REPEAT_COUNT:
+            return None
+        result = self.judge_cycle(occurrences[-2], index, sit.checks, sit.chases)
+        logger.info("repetition %s judge %s", occurrences, result)
+        return result
+
+    def get_banmoves(self):
+        '''
+        走棋方走了之后会形成重复局面，并且自己长将或长捉的着法，
+        用于 UCCI 的 banmoves 指令
+        '''
+        index = self.index
+        sit = self.stack[index]
+        turn = sit.turn
+        checks, chases = self.get_counts(index - 1)
+
+        result = []
+        for fsq, tsq in sit.legal_moves():
+            undo = sit.make_move(fsq, tsq)
+            try:
+                occurrences = self.get_occurrences(sit.key, index)
+                if not occurrences:
+                    continue
+                check = sit.get_check(Chess.invert(turn)) is not None
+                chase = sit.is_chase(tsq)
+                judge = self.judge_cycle(
+                    occurrences[-1], index + 1,
+                    checks + check, chases + chase
+                )
+            finally:
+                sit.unmake_move(undo)
+            if judge == turn:
+                result.append((fsq, tsq))
+        return result
@@ -0,0 +1,581 @@
+# coding=utf-8
+'''
+(C) Copyright 2021 Steven;
+@author: Steven kangweibaby@163.com
+@date: 2021-07-05
+纯 Python 实现的 Alpha-Beta 搜索
+
+迭代加深的 PVS (主要变例搜索)，置换表，静态搜索，
+着法排序使用 置换表着法 > MVV-LVA 吃子 > 杀手着法 > 历史表，
+局面评估使用子力位置价值表，走子时增量更新。
+'''
+
+import time
+
+from chess import Chess
+from logger import logger
+from transposition import TranspositionTable
+from transposition import EXACT
+from transposition import LOWER
+from transposition import UPPER
+
+INFINITE = 32000
+MATE = 30000
+WIN = MATE - 100  # 大于该值的分数是杀棋
+
+MAX_PLY = 64
+NULL_REDUCTION = 2
+
+# 子力位置价值表，红方视角，按照棋盘从上 (黑方) 到下 (红方) 每行 9 个位置
+PST = {
+    Chess.KING: (
+        0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 1, 1, 1, 0, 0, 0,
+        0, 0, 0, 2, 2, 2, 0, 0, 0,
+        0, 0, 0, 11, 15, 11, 0, 0, 0,
+    ),
+    Chess.ADVISOR: (
+        0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 20, 0, 20, 0, 0, 0,
+        0, 0, 0, 0, 23, 0, 0, 0, 0,
+        0, 0, 0, 20, 0, 20, 0, 0, 0,
+    ),
+    Chess.BISHOP: (
+        0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 20, 0, 0, 0, 20, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0,
+        18, 0, 0, 0, 23, 0, 0, 0, 18,
+        0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 20, 0, 0, 0, 20, 0, 0,
+    ),
+    Chess.KNIGHT: (
+        90, 90, 90, 96, 90, 96, 90, 90, 90,
+        90, 96, 103, 97, 94, 97, 103, 96, 90,
+        92, 98, 99, 103, 99, 103, 99, 98, 92,
+        93, 108, 100, 107, 100, 107, 100, 108, 93,
+        90, 100, 99, 103, 104, 103, 99, 100, 90,
+        90, 98, 101, 102, 103, 102, 101, 98, 90,
+        92, 94, 98, 95, 98, 95, 98, 94, 92,
+        93, 92, 94, 95, 92, 95, 94, 92, 93,
+        85, 90, 92, 93, 78, 93, 92, 90, 85,
+        88, 85, 90, 88, 90, 88, 90, 85, 88,
+    ),
+    Chess.ROOK: (
+        206, 208, 207, 213, 214, 213, 207, 208, 206,
+        206, 212, 209, 216, 233, 216, 209, 212, 206,
+        206, 208, 207, 214, 216, 214, 207, 208, 206,
+        206, 213, 213, 216, 216, 216, 213, 213, 206,
+        208, 211, 211, 214, 215, 214, 211, 211, 208,
+        208, 212, 212, 214, 215, 214, 212, 212, 208,
+        204, 209, 204, 212, 214, 212, 204, 209, 204,
+        198, 208, 204, 212, 212, 212, 204, 208, 198,
+        200, 208, 206, 212, 200, 212, 206, 208, 200,
+        194, 206, 204, 212, 200, 212, 204, 206, 194,
+    ),
+    Chess.CANNON: (
+        100, 100, 96, 91, 90, 91, 96, 100, 100,
+        98, 98, 96, 92, 89, 92, 96, 98, 98,
+        97, 97, 96, 91, 92, 91, 96, 97, 97,
+        96, 99, 99, 98, 100, 98, 99, 99, 96,
+        96, 96, 96, 96, 100, 96, 96, 96, 96,
+        95, 96, 99, 96, 100, 96, 99, 96, 95,
+        96, 96, 96, 96, 96, 96, 96, 96, 96,
+        97, 96, 100, 99, 101, 99, 100, 96, 97,
+        96, 97, 98, 98, 98, 98, 98, 97, 96,
+        96, 96, 97, 99, 99, 99, 97, 96, 96,
+    ),
+    Chess.PAWN: (
+        9, 9, 9, 11, 13, 11, 9, 9, 9,
+        19, 24, 34, 42, 44, 42, 34, 24, 19,
+        19, 24, 32, 37, 37, 37, 32, 24, 19,
+        19, 23, 27, 29, 30, 29, 27, 23, 19,
+        14, 18, 20, 27, 29, 27, 20, 18, 14,
+        7, 0, 13, 0, 16, 0, 13, 0, 7,
+        7, 0, 7, 0, 15, 0, 7, 0, 7,
+        0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0,
+        0, 0, 0, 0, 0, 0, 0, 0, 0,
+    ),
+}
+
+# MVV-LVA 使用的子力价值
+ORDERS = {
+    Chess.KING: 6,
+    Chess.ROOK: 5,
+    Chess.CANNON: 4,
+    Chess.KNIGHT: 4,
+    Chess.BISHOP: 2,
+    Chess.ADVISOR: 2,
+    Chess.PAWN: 1,
+}
+
+
+def build_values():
+    # 将 PST 转换成按照一维棋盘下标 sq = x * 10 + y 索引的表，黑方上下翻转
+    result = {}
+    for chess, table in PST.items():
+        result[chess | Chess.RED] = tuple(
+            table[(sq % Chess.H) * Chess.W + sq // Chess.H]
+            for sq in range(Chess.W * Chess.H)
+        )
+        result[chess | Chess.BLACK] = tuple(
+            table[(Chess.H - 1 - sq % Chess.H) * Chess.W + sq // Chess.H]
+            for sq in range(Chess.W * Chess.H)
+        )
+    return result
+
+
+VALUES = build_values()
+
+
+def evaluate(position):
+    # 红方视角的局面分
+    value = 0
+    for sq, chess in enumerate(position.squares):
+        if not chess:
+            continue
+        if chess & Chess.RED:
+            value += VALUES[chess][sq]
+        else:
+            value -= VALUES[chess][sq]
+    return value
+
+
+class Search(object):
+
+    '''
+    在 position 上原地走子和撤销进行搜索，position 可以是任意走法生成器，
+    搜索结束之后 position 恢复原样。
+
+    limits:
+        depth: 最大深度
+        nodes: 最多搜索的节点数
+        movetime: 最多搜索的毫秒数
+    '''
+
+    CHECK_NODES = 1023  # 每隔多少个节点检查一次是否超时
+
+    def __init__(self, hashsize=TranspositionTable.DEFAULT_SIZE, table=None):
+        if table is None:
+            table = TranspositionTable(hashsize)
+        self.table = table
+        self.stopped = False
+        self.deadline = None
+        self.max_nodes = None
+        self.signal = None  # 外部的停止信号，比如 multiprocessing.Event
+
+        self.position = None
+        self.value = 0
+        self.nodes = 0
+        self.path = set()
+        self.killers = [[None, None] for _ in range(MAX_PLY + 1)]
+        self.history = [0] * ((Chess.BLACK | Chess.CMASK) + 1) * Chess.W * Chess.H
+
+    def clear(self):
+        self.table.clear()
+        self.history = [0] * len(self.history)
+
+    def resize(self, hashsize):
+        self.table.resize(hashsize)
+
+    def close(self):
+        return
+
+    def stop(self):
+        self.stopped = True
+
+    def set_movetime(self, movetime):
+        if movetime is None:
+            self.deadline = None
+            return
+        self.deadline = time.monotonic() + movetime / 1000
+
+    def check_limits(self):
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            self.stopped = True
+        if self.max_nodes is not None and self.nodes >= self.max_nodes:
+            self.stopped = True
+        if self.signal is not None and self.signal.is_set():
+            self.stopped = True
+
+    def get_eval(self):
+        if self.position.turn == Chess.RED:
+            return self.value
+        return -self.value
+
+    def make_move(self, fsq, tsq):
+        # 走子，同时增量更新局面分，走完之后自己被将军返回 None
+        position = self.position
+        squares = position.squares
+        chess = squares[fsq]
+        captured = squares[tsq]
+        undo = position.make_move(fsq, tsq)
+        if position.get_check(chess & Chess.TMASK) is not None:
+            position.unmake_move(undo)
+            return None
+
+        values = VALUES[chess]
+        delta = values[tsq] - values[fsq]
+        if captured:
+            delta += VALUES[captured][tsq]
+        if chess & Chess.BLACK:
+            delta = -delta
+        self.value += delta
+        return undo, delta
+
+    def unmake_move(self, record):
+        undo, delta = record
+        self.value -= delta
+        self.position.unmake_move(undo)
+
+    def generate(self, captures=False):
+        position = self.position
+        squares = position.squares
+        turn = position.turn
+        moves = []
+        for fsq in list(position.pieces[turn]):
+            for tsq in position.generate(fsq, turn):
+                if captures and not squares[tsq]:
+                    continue
+                moves.append((fsq, tsq))
+        return moves
+
+    def sort_moves(self, moves, best, ply):
+        squares = self.position.squares
+        history = self.history
+        killers = self.killers[ply]
+        scores = []
+        for move in moves:
+            fsq, tsq = move
+            if move == best:
+                score = 1 << 30
+            elif squares[tsq]:
+                score = (1 << 29) + ORDERS[squares[tsq] & Chess.CMASK] * 8 - ORDERS[squares[fsq] & Chess.CMASK]
+            elif move == killers[0]:
+                score = (1 << 28) + 1
+            elif move == killers[1]:
+                score = 1 << 28
+            else:
+                score = history[squares[fsq] * 90 + tsq]
+            scores.append((score, move))
+        scores.sort(key=lambda e: e[0], reverse=True)
+        return [move for _, move in scores]
+
+    def probe(self, key, depth, alpha, beta, ply):
+        # 返回 (可以截断的分数或者 None, 置换表着法)
+        entry = self.table.probe(key)
+        if entry is None:
+            return None, None
+        edepth, flag, score, move = entry
+        if edepth < depth:
+            return None, move
+        if score > WIN:
+            score -= ply
+        elif score < -WIN:
+            score += ply
+        if flag == EXACT:
+            return score, move
+        if flag == LOWER and score >= beta:
+            return score, move
+        if flag == UPPER and score <= alpha:
+            return score, move
+        return None, move
+
+    def store(self, key, depth, flag, score, move, ply):
+        if score > WIN:
+            score += ply
+        elif score < -WIN:
+            score -= ply
+        self.table.store(key, depth, flag, score, move)
+
+    def update_killer(self, move, depth, ply):
+        killers = self.killers[ply]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+        index = self.position.squares[move[0]] * 90 + move[1]
+        self.history[index] += depth * depth
+
+    def has_material(self, turn):
+        # 有没有可以走的大子，用于空着裁剪，防止残局中的等着
+        squares = self.position.squares
+        for sq in self.position.pieces[turn]:
+            if squares[sq] & Chess.CMASK in (Chess.ROOK, Chess.KNIGHT, Chess.CANNON):
+                return True
+        return False
+
+    def quiesce(self, alpha, beta, ply):
+        self.nodes += 1
+        if not self.nodes & self.CHECK_NODES:
+            self.check_limits()
+        if self.stopped:
+            return 0
+
+        position = self.position
+        check = position.get_check(position.turn) is not None
+        if ply >= MAX_PLY:
+            return self.get_eval()
+
+        if check:
+            # 被将军的时候需要搜索所有的应将着法
+            best = -MATE + ply
+            moves = self.sort_moves(self.generate(), None, ply)
+        else:
+            best = self.get_eval()
+            if best >= beta:
+                return best
+            if best > alpha:
+                alpha = best
+            moves = self.sort_moves(self.generate(True), None, ply)
+
+        for fsq, tsq in moves:
+            record = self.make_move(fsq, tsq)
+            if record is None:
+                continue
+            score = -self.quiesce(-beta, -alpha, ply + 1)
+            self.unmake_move(record)
+            if self.stopped:
+                return 0
+            if score > best:
+                best = score
+                if score > alpha:
+                    alpha = score
+                if score >= beta:
+                    break
+        return best
+
+    def pvs(self, depth, alpha, beta, ply, null=True):
+        if depth <= 0:
+            return self.quiesce(alpha, beta, ply)
+
+        self.nodes += 1
+        if not self.nodes & self.CHECK_NODES:
+            self.check_limits()
+        if self.stopped:
+            return 0
+
+        position = self.position
+        key = position.key
+        if key in self.path:
+            return 0  # 搜索路径上的重复局面按和棋处理
+        if ply >= MAX_PLY:
+            return self.get_eval()
+
+        # 杀棋步数裁剪
+        alpha = max(alpha, -MATE + ply)
+        beta = min(beta, MATE - ply - 1)
+        if alpha >= beta:
+            return alpha
+
+        score, best_move = self.probe(key, depth, alpha, beta, ply)
+        if score is not None:
+            return score
+
+        turn = position.turn
+        check = position.get_check(turn) is not None
+        if check:
+            depth += 1  # 将军延伸
+
+        pv = beta - alpha > 1
+
+        # 空着裁剪
+        if (
+            null and not pv and not check and depth >= 3
+            and self.get_eval() >= beta and self.has_material(turn)
+        ):
+            position.turn ^= Chess.TMASK
+            score = -self.pvs(depth - 1 - NULL_REDUCTION, -beta, -beta + 1, ply + 1, False)
+            position.turn ^= Chess.TMASK
+            if self.stopped:
+                return 0
+            if score >= beta:
+                return score
+
+        moves = self.sort_moves(self.generate(), best_move, ply)
+        squares = position.squares
+        killers = self.killers[ply]
+
+        self.path.add(key)
+        best = -INFINITE
+        best_move = None
+        flag = UPPER
+        legal = 0
+        for move in moves:
+            fsq, tsq = move
+            captured = squares[tsq]
+            record = self.make_move(fsq, tsq)
+            if record is None:
+                continue
+
+            if not legal:
+                score = -self.pvs(depth - 1, -beta, -alpha, ply + 1)
+            else:
+                # 后面的着法使用零窗口搜索，靠后的普通着法减少一层
+                reduction = 0
+                if (
+                    legal >= 4 and depth >= 3 and not check and not captured
+                    and move != killers[0] and move != killers[1]
+                ):
+                    reduction = 1
+                score = -self.pvs(depth - 1 - reduction, -alpha - 1, -alpha, ply + 1)
+                if score > alpha and (reduction or score < beta):
+                    score = -self.pvs(depth - 1, -beta, -alpha, ply + 1)
+
+            self.unmake_move(record)
+            legal += 1
+            if self.stopped:
+                self.path.discard(key)
+                return 0
+
+            if score > best:
+                best = score
+                best_move = move
+                if score > alpha:
+                    alpha = score
+                    flag = EXACT
+                if score >= beta:
+                    flag = LOWER
+                    if not captured:
+                        self.update_killer(move, depth, ply)
+                    break
+
+        self.path.discard(key)
+
+        if not legal:
+            # 象棋中困毙也算输
+            return -MATE + ply
+
+        self.store(key, depth, flag, best, best_move, ply)
+        return best
+
+    def search_root(self, depth, moves):
+        # 返回 (最佳着法, 分数)，moves 是已经排好序的根节点着法，最佳着法会移到最前面
+        alpha, beta = -INFINITE, INFINITE
+        best = None
+        best_score = -INFINITE
+        key = self.position.key
+        self.path.add(key)
+        for index, move in enumerate(moves):
+            record = self.make_move(*move)
+            if index == 0:
+                score = -self.pvs(depth - 1, -beta, -alpha, 1)
+            else:
+                score = -self.pvs(depth - 1, -alpha - 1, -alpha, 1)
+                if score > alpha and not self.stopped:
+                    score = -self.pvs(depth - 1, -beta, -alpha, 1)
+            self.unmake_move(record)
+            if self.stopped:
+                break
+            if score > best_score:
+                best_score = score
+                best = move
+                alpha = max(alpha, score)
+        self.path.discard(key)
+
+        if best is not None:
+            moves.remove(best)
+            moves.insert(0, best)
+            self.store(key, depth, EXACT, best_score, best, 0)
+        return best, best_score
+
+    def get_pv(self, move, depth):
+        # 从置换表中取出主要变例
+        position = self.position
+        result = []
+        records = []
+        keys = set()
+        while move and len(result) < depth:
+            if move[1] not in position.generate(move[0], position.turn):
+                break
+            record = self.make_move(*move)
+            if record is None:
+                break
+            result.append(move)
+            records.append(record)
+            key = position.key
+            if key in keys:
+                break
+            keys.add(key)
+            move = self.table.get_move(key)
+        for record in reversed(records):
+            self.unmake_move(record)
+        return result
+
+    def search(self, position, depth=None, nodes=None, movetime=None,
+               banmoves=None, callback=None, start=1, age=None):
+        '''
+        迭代加深搜索 position 的最佳着法，返回 (fsq, tsq)，没有合法着法返回 None
+
+        callback(depth, score, nodes, elapsed, pv) 在每一层搜索完成之后调用
+        start: 从第几层开始迭代
+        age: 置换表的搜索代数，共享置换表的时候与主搜索保持一致
+        '''
+        self.position = position
+        self.value = evaluate(position)
+        self.nodes = 0
+        self.path = set()
+        self.stopped = False
+        self.max_nodes = nodes
+        self.set_movetime(movetime)
+        self.killers = [[None, None] for _ in range(MAX_PLY + 1)]
+        self.history = [var // 4 for var in self.history]
+        if age is None:
+            self.table.new_search()
+        else:
+            self.table.age = age
+
+        if not depth:
+            depth = MAX_PLY
+
+        moves = []
+        for move in self.generate():
+            record = self.make_move(*move)
+            if record is None:
+                continue
+            self.unmake_move(record)
+            moves.append(move)
+
+        if banmoves:
+            allowed = [move for move in moves if move not in banmoves]
+            if allowed:
+                moves = allowed
+
+        if not moves:
+            return None
+
+        moves = self.sort_moves(moves, self.table.get_move(position.key), 0)
+
+        begin = time.monotonic()
+        best = moves[0]
+        for current in range(start, depth + 1):
+            move, score = self.search_root(current, moves)
+            if move is not None:
+                best = move
+            if self.stopped:
+                break
+
+            elapsed = time.monotonic() - begin
+            if callable(callback):
+                callback(current, score, self.nodes, elapsed, self.get_pv(best, current))
+
+            if abs(score) > WIN:
+                break  # 已经找到杀棋
+
+        logger.debug("search finished nodes %d", self.nodes)
+        return best
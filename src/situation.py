@@ -7,252 +7,212 @@
 
 # coding=utf-8
 
-import copy
+import os
 import re
-import itertools
-
-import numpy as np
 
 from chess import Chess
 from logger import logger
 from method import Method
+from position import Position
+from tables import RAYS
+from tables import KNIGHT_MOVES
+from tables import BISHOP_MOVES
+from tables import ADVISOR_MOVES
+from tables import KING_MOVES
+from tables import PAWN_MOVES
+from tables import KNIGHT_ATTACKERS
+from tables import PAWN_ATTACKERS
+from tables import in_half
 
 
-class Generator(object):
-
-    '''走法生成器'''
+class Generator(Position):
 
-    def filter_valid(self, wheres):
+    '''
+    走法生成器
 
-        return [var for var in wheres if (-1 < var[0] < Chess.W) and (-1 < var[1] < Chess.H)]
+    直接在 Position 的一维棋盘 squares 上生成走法，位置都用下标 sq 表示，
+    每种棋子的走法都是遍历 tables 中预先生成的查找表
+    '''
 
-    def generate_rook(self, board, where, turn):
-        alter = [
-            [(var, where[1]) for var in range(where[0] - 1, -1, -1)],
-            [(var, where[1]) for var in range(where[0] + 1, Chess.W, 1)],
-            [(where[0], var) for var in range(where[1] - 1, -1, -1)],
-            [(where[0], var) for var in range(where[1] + 1, Chess.H, 1)],
-        ]
+    def generate_rook(self, sq, turn):
+        squares = self.squares
         result = []
-        for wheres in alter:
-            for pos in wheres:
-                if not board[pos]:
-                    result.append(pos)
+        for ray in RAYS[sq]:
+            for tsq in ray:
+                chess = squares[tsq]
+                if not chess:
+                    result.append(tsq)
                     continue
-                elif board[pos] & turn == 0:
-                    result.append(pos)
-                    break
-                else:
-                    break
+                if chess & turn == 0:
+                    result.append(tsq)
+                break
         return result
 
-    def generate_knight(self, board, where, turn):
-        # offsets = [var for var in itertools.product([1, -1, 2, -2], repeat=2) if abs(var[0] * var[1]) == 2]
-        offsets = [(1, 2), (1, -2), (-1, 2), (-1, -2), (2, 1), (2, -1), (-2, 1), (-2, -1)]
-        where = np.array(where)
-        alter = self.filter_valid([where + np.array(var) for var in offsets])
-
-        result = []
-        for pos in alter:
-            if (board[tuple(pos)] & turn) != 0:  # 不能吃自己的棋子
-                continue
-
-            offset = pos - where
-            # 可能蹩马腿的棋子位置
-            barrier = where + (np.abs(offset) // 2) * np.sign(offset)
-            if board[tuple(barrier)]:
-                continue
-            result.append(tuple(pos))
-        return result
-
-    def generate_bishop(self, board, where, turn):
-        # offsets = [var for var in itertools.product([2, -2], repeat=2)]
-        offsets = [(2, 2), (2, -2), (-2, 2), (-2, -2)]
-        where = np.array(where)
-        alter = self.filter_valid([where + np.array(var) for var in offsets])
-
-        result = []
-        for pos in alter:
-            if (board[tuple(pos)] & turn) != 0:  # 不能吃自己的棋子
-                continue
-
-            offset = pos - where
-            # 可能卡象眼的棋子位置
-            barrier = where + (offset // 2)
-            if board[tuple(barrier)]:
-                continue
-            result.append(tuple(pos))
-
-        return result
-
-    def generate_advisor(self, board, where, turn):
-        # offsets = [var for var in itertools.product([1, -1], repeat=2)]
-        offsets = [(1, 1), (1, -1), (-1, 1), (-1, -1)]
-        where = np.array(where)
-        alter = self.filter_valid([where + np.array(var) for var in offsets])
-        result = []
+    def generate_knight(self, sq, turn):
+        squares = self.squares
+        # 不能吃自己的棋子，也不能蹩马腿
+        return [
+            tsq for tsq, leg in KNIGHT_MOVES[sq]
+            if not squares[leg] and not squares[tsq] & turn
+        ]
 
-        for pos in alter:
-            if (board[tuple(pos)] & turn) != 0:  # 不能吃自己的棋子
-                continue
-            if pos[0] < 3 or pos[0] > 5:  # 不能出宫
-                continue
-            if turn == Chess.RED and pos[1] < 7:  # 不能出宫
-                continue
-            if turn == Chess.BLACK and pos[1] > 2:  # 不能出宫
-                continue
-            result.append(tuple(pos))
+    def generate_bishop(self, sq, turn):
+        squares = self.squares
+        # 不能吃自己的棋子，也不能卡象眼
+        return [
+            tsq for tsq, eye in BISHOP_MOVES[turn][sq]
+            if not squares[eye] and not squares[tsq] & turn
+        ]
 
-        return result
+    def generate_advisor(self, sq, turn):
+        squares = self.squares
+        return [tsq for tsq in ADVISOR_MOVES[turn][sq] if not squares[tsq] & turn]
 
-    def generate_king(self, board, where, turn):
-        offsets = [(0, 1), (0, -1), (1, 0), (-1, 0)]
-        where = np.array(where)
-        alter = self.filter_valid([where + np.array(var) for var in offsets])
-        result = []
-        for pos in alter:
-            if (board[tuple(pos)] & turn) != 0:  # 不能吃自己的棋子
-                continue
+    def generate_king(self, sq, turn):
+        squares = self.squares
+        result = [tsq for tsq in KING_MOVES[turn][sq] if not squares[tsq] & turn]
 
-            if pos[0] < 3 or pos[0] > 5:  # 不能出宫
-                continue
-            if turn == Chess.RED and pos[1] < 7:  # 不能出宫
-                continue
-            if turn == Chess.BLACK and pos[1] > 2:  # 不能出宫
+        # 单独判断老将见面，沿着朝向对方的方向找到第一个棋子
+        if turn == Chess.RED:
+            ray = RAYS[sq][2]
+        else:
+            ray = RAYS[sq][3]
+        for tsq in ray:
+            chess = squares[tsq]
+            if not chess:
                 continue
-            result.append(tuple(pos))
-
-        # 单独判断老将见面
-        king = list(np.argwhere(board == Chess.invert((Chess.KING | turn))))
-        if not king:  # 没找到对方老将，可能局面不合法
-            return result
-        king = king[0]
-        if where[0] != king[0]:  # 不在同一列，一定不见面
-            return result
-
-        start = min(where[1], king[1]) + 1
-        stop = max(where[1], king[1])
-
-        for var in range(start, stop):
-            pos = (where[0], var)
-            if board[pos]:  # 有遮挡，一定不见面
-                return result
-        # 无遮挡
-        result.append(tuple(king))
+            if chess == Chess.KING | (turn ^ Chess.TMASK):
+                result.append(tsq)
+            break
         return result
 
-    def generate_cannon(self, board, where, turn):
-        alter = [
-            [(var, where[1]) for var in range(where[0] - 1, -1, -1)],
-            [(var, where[1]) for var in range(where[0] + 1, Chess.W, 1)],
-            [(where[0], var) for var in range(where[1] - 1, -1, -1)],
-            [(where[0], var) for var in range(where[1] + 1, Chess.H, 1)],
-        ]
-
+    def generate_cannon(self, sq, turn):
+        squares = self.squares
         result = []
-
-        for wheres in alter:
-            barrier = 0
-            for pos in wheres:
-                if barrier == 0:  # 没有炮架子
-                    if not board[pos]:  # 没有架子可以直接移动
-                        result.append(pos)
+        for ray in RAYS[sq]:
+            barrier = False
+            for tsq in ray:
+                chess = squares[tsq]
+                if not barrier:  # 没有炮架子
+                    if not chess:  # 没有架子可以直接移动
+                        result.append(tsq)
                     else:
-                        barrier = 1
+                        barrier = True
                     continue
                 # 有炮架子
-                if not board[pos]:
+                if not chess:
                     continue
-                if board[pos] & Chess.invert(turn) != 0:
-                    result.append(pos)
-                    break
-                if board[pos]:
-                    break
+                if chess & turn == 0:
+                    result.append(tsq)
+                break
         return result
 
-    def generate_pawn(self, board, where, turn):
-        # turn - 16 red 32 black
-
-        offsets = [(0, np.sign(turn - 20))]
-
-        # 过河卒
-        if where[1] > 4 and turn == Chess.BLACK:
-            offsets.extend([(-1, 0), (1, 0)])
-        if where[1] < 5 and turn == Chess.RED:
-            offsets.extend([(-1, 0), (1, 0)])
-
-        where = np.array(where)
-        alter = self.filter_valid([where + np.array(var) for var in offsets])
-        result = []
-        for pos in alter:
-            if (board[tuple(pos)] & turn) != 0:  # 不能吃自己的棋子
-                continue
-            result.append(tuple(pos))
-        return result
+    def generate_pawn(self, sq, turn):
+        squares = self.squares
+        return [tsq for tsq in PAWN_MOVES[turn][sq] if not squares[tsq] & turn]
 
-    def generate(self, board, where, turn):
-        if not board[where]:
+    def generate(self, sq, turn):
+        chess = self.squares[sq]
+        if not chess:
             return []
 
-        chess = board[where] & Chess.CMASK
+        chess &= Chess.CMASK
         if chess == Chess.ROOK:
-            return self.generate_rook(board, where, turn)
+            return self.generate_rook(sq, turn)
         if chess == Chess.KNIGHT:
-            return self.generate_knight(board, where, turn)
+            return self.generate_knight(sq, turn)
         if chess == Chess.BISHOP:
-            return self.generate_bishop(board, where, turn)
+            return self.generate_bishop(sq, turn)
         if chess == Chess.ADVISOR:
-            return self.generate_advisor(board, where, turn)
+            return self.generate_advisor(sq, turn)
         if chess == Chess.KING:
-            return self.generate_king(board, where, turn)
+            return self.generate_king(sq, turn)
         if chess == Chess.CANNON:
-            return self.generate_cannon(board, where, turn)
+            return self.generate_cannon(sq, turn)
         if chess == Chess.PAWN:
-            return self.generate_pawn(board, where, turn)
+            return self.generate_pawn(sq, turn)
 
         return []
 
-    def get_check(self, board, turn):
-        king = turn | Chess.KING
-        king = list(np.argwhere(board == (Chess.KING | turn)))
-        if not king:
+    def get_check(self, turn):
+        # 从老将的位置反向查找攻击者，返回将军 turn 方的棋子位置，没有被将军返回 None
+        king = self.get_king(turn)
+        if king is None:
             return None
-        king = tuple(king[0])
 
-        chesses = np.argwhere((board & Chess.invert(turn)) != 0)
+        squares = self.squares
+        enemy = turn ^ Chess.TMASK
 
-        for chess in chesses:
-            steps = self.generate(board, tuple(chess), Chess.invert(turn))
-            valid = [var for var in steps if var == king]
-            if valid:
-                return tuple(chess)
+        for ray in RAYS[king]:
+            barrier = False
+            for sq in ray:
+                chess = squares[sq]
+                if not chess:
+                    continue
+                if barrier:
+                    if chess == Chess.CANNON | enemy:
+                        return self.where(sq)
+                    break
+                if chess == Chess.ROOK | enemy or chess == Chess.KING | enemy:
+                    return self.where(sq)
+                barrier = True
+
+        knight = Chess.KNIGHT | enemy
+        for sq, leg in KNIGHT_ATTACKERS[king]:
+            if squares[sq] == knight and not squares[leg]:
+                return self.where(sq)
+
+        pawn = Chess.PAWN | enemy
+        for sq in PAWN_ATTACKERS[enemy][king]:
+            if squares[sq] == pawn:
+                return self.where(sq)
         return None
 
-    def is_checkmate(self, board, turn):
-        chesses = np.argwhere((board & turn) != 0)
-        for var in chesses:
-            fpos = tuple(var)
-            steps = self.generate(board, fpos, turn)
-            for tpos in steps:
-                tboard = copy.deepcopy(board)
-                tboard[tpos] = board[fpos]
-                tboard[fpos] = 0
-
-                check = self.get_check(tboard, turn)
+    def is_checkmate(self, turn):
+        for fsq in tuple(self.pieces[turn]):
+            for tsq in self.generate(fsq, turn):
+                undo = self.make_move(fsq, tsq)
+                check = self.get_check(turn)
+                self.unmake_move(undo)
                 if not check:
                     return False
         return True
 
 
-class Situation(Generator, Method):
+def get_generator(name=None):
+    '''
+    返回走法生成器的实现，name 可以是:
+        array: 基于查找表的 Generator，默认
+        bitboard: 位棋盘 BitboardGenerator
+    不指定 name 时读取环境变量 CHESS_GENERATOR
+    '''
+    if name is None:
+        name = os.environ.get('CHESS_GENERATOR', 'array')
+    if name == 'bitboard':
+        from bitboard import BitboardGenerator
+        return BitboardGenerator
+    return Generator
 
-    def __init__(self, board: np.array = None, turn=Chess.RED, moves=None, bout=1, idle=0):
-        if board is None:
-            self.board = copy.deepcopy(Chess.ORIGIN)
-        else:
-            self.board = board
 
-        self.turn = turn
+GENERATOR = get_generator()
+
+
+class Situation(GENERATOR, Method):
+
+    # 判断捉子用的棋子价值
+    VALUES = {
+        Chess.KING: 0,
+        Chess.ADVISOR: 2,
+        Chess.BISHOP: 2,
+        Chess.KNIGHT: 4,
+        Chess.ROOK: 9,
+        Chess.CANNON: 4,
+        Chess.PAWN: 1,
+    }
+
+    def __init__(self, board=None, turn=Chess.RED, moves=None, bout=1, idle=0):
+        super().__init__(board, turn)
+
         self.moves = moves
         if not moves:
             self.moves = []
@@ -262,6 +222,15 @@ class Situation(Generator, Method):
         self.check = None
         self.fen = self.format_current_fen()
 
+        # 走到该局面的一方累计将军和捉子的步数，用于判断长将长捉，见 repetition.Repetition
+        self.checks = 0
+        self.chases = 0
+
+    def copy(self):
+        sit = super().copy()
+        sit.moves = list(self.moves)
+        return sit
+
     @property
     def fpos(self):
         if not self.moves:
@@ -322,7 +291,7 @@ class Situation(Generator, Method):
             logger.warning('invalid fen %s', fen)
             return None
 
-        self.board = np.mat(np.zeros((Chess.W, Chess.H)), dtype=int)
+        self.squares = bytearray(Chess.W * Chess.H)
 
         self.fen = f"{match.group(1)} {match.group(2)} - - {match.group(3)} {match.group(4)}"
 
@@ -347,7 +316,9 @@ class Situation(Generator, Method):
             pos = divmod(index, Chess.WIDTH)[::-1]
 
             index += 1
-            self.board[pos] = values[ch]
+            self.squares[self.square(pos)] = values[ch]
+
+        self.load_pieces()
 
         if not match.group(5):
             return True
@@ -359,9 +330,7 @@ class Situation(Generator, Method):
             fpos, tpos = self.parse_move(move)
             self.moves.append((fpos, tpos))
             if not load:
-                self.board[tpos] = self.board[fpos]
-                self.board[fpos] = 0
-                self.turn = Chess.invert(self.turn)
+                self.make_move(self.square(fpos), self.square(tpos))
 
         logger.debug('parse turn %d idle %d bout %d', self.turn, self.idle, self.bout)
 
@@ -373,8 +342,7 @@ class Situation(Generator, Method):
             blank = 0
             slot = []
             for x in range(Chess.W):
-                pos = (x, y)
-                chess = self.board[pos]
+                chess = self.squares[x * Chess.H + y]
                 if not chess:
                     blank += 1
                     continue
@@ -415,59 +383,224 @@ class Situation(Generator, Method):
         return f'{self.fen} moves {moves}'
 
     def where_turn(self, where):
-        return self.board[where] & Chess.TMASK
+        return self.squares[self.square(where)] & Chess.TMASK
+
+    def get_pins(self, turn):
+        '''
+        从 turn 方老将的位置出发，一次计算出:
+            checkers: 正在将军的棋子位置
+            pinned: 离开原位置可能导致被将军的棋子位置，包括挡住車或者老将的棋子，
+                    車炮之间有两个棋子时的这两个棋子，以及蹩住对方马腿的棋子
+            screens: 落子之后会形成炮架的空位置
+        '''
+        squares = self.squares
+        checkers = []
+        pinned = set()
+        screens = set()
+
+        king = self.get_king(turn)
+        if king is None:
+            return checkers, pinned, screens
+
+        enemy = turn ^ Chess.TMASK
+        rook = Chess.ROOK | enemy
+        cannon = Chess.CANNON | enemy
+
+        for ray in RAYS[king]:
+            empties = []
+            found = []
+            for sq in ray:
+                if not squares[sq]:
+                    if not found:
+                        empties.append(sq)
+                    continue
+                found.append(sq)
+                if len(found) == 3:
+                    break
+            if not found:
+                continue
 
-    def validate_move(self, board, fpos, tpos):
-        if fpos == tpos:
+            first = squares[found[0]]
+            if first == rook or first == Chess.KING | enemy:
+                checkers.append(found[0])
+                continue
+            if first == cannon:
+                screens.update(empties)
+            if len(found) < 2:
+                continue
+
+            second = squares[found[1]]
+            if second == cannon:
+                checkers.append(found[1])
+            elif second == rook or second == Chess.KING | enemy:
+                pinned.add(found[0])
+            elif len(found) == 3 and squares[found[2]] == cannon:
+                pinned.update(found[:2])
+
+        knight = Chess.KNIGHT | enemy
+        for sq, leg in KNIGHT_ATTACKERS[king]:
+            if squares[sq] != knight:
+                continue
+            if squares[leg]:
+                pinned.add(leg)
+            else:
+                checkers.append(sq)
+
+        pawn = Chess.PAWN | enemy
+        for sq in PAWN_ATTACKERS[enemy][king]:
+            if squares[sq] == pawn:
+                checkers.append(sq)
+
+        return checkers, pinned, screens
+
+    def is_legal(self, fsq, tsq, pins):
+        # 走法生成器生成的着法，判断走完之后是否会被将军
+        checkers, pinned, screens = pins
+        turn = self.squares[fsq] & Chess.TMASK
+        if not checkers and fsq not in pinned and tsq not in screens:
+            if self.squares[fsq] != Chess.KING | turn:
+                return True
+
+        # 只有可能导致被将军的着法才需要试走
+        undo = self.make_move(fsq, tsq)
+        check = self.get_check(turn)
+        self.unmake_move(undo)
+        return not check
+
+    def iter_legal_moves(self, turn=None):
+        if turn is None:
+            turn = self.turn
+        pins = self.get_pins(turn)
+        for fsq in tuple(self.pieces[turn]):
+            for tsq in self.generate(fsq, turn):
+                if self.is_legal(fsq, tsq, pins):
+                    yield (fsq, tsq)
+
+    def legal_moves(self, turn=None):
+        '''走棋方所有合法的着法 [(fsq, tsq), ...]'''
+        return list(self.iter_legal_moves(turn))
+
+    def is_checkmate(self, turn):
+        for _ in self.iter_legal_moves(turn):
             return False
-        return tpos in self.generate(board, fpos, self.turn)
+        return True
 
-    def move(self, fpos, tpos):
-        if not self.validate_move(self.board, fpos, tpos):
+    def perft(self, depth):
+        # 统计 depth 层的叶子节点数，用于检查走法生成的正确性和速度
+        if depth <= 0:
+            return 1
+        moves = self.legal_moves()
+        if depth == 1:
+            return len(moves)
+        nodes = 0
+        for fsq, tsq in moves:
+            undo = self.make_move(fsq, tsq)
+            nodes += self.perft(depth - 1)
+            self.unmake_move(undo)
+        return nodes
+
+    def is_protected(self, fsq, tsq):
+        # fsq 的棋子吃掉 tsq 的棋子之后，对方能不能吃回来
+        enemy = self.squares[tsq] & Chess.TMASK
+        undo = self.make_move(fsq, tsq)
+        try:
+            pins = self.get_pins(enemy)
+            for sq in self.pieces[enemy]:
+                if tsq in self.generate(sq, enemy) and self.is_legal(sq, tsq, pins):
+                    return True
+            return False
+        finally:
+            self.unmake_move(undo)
+
+    def is_chase(self, sq):
+        '''
+        sq 位置的棋子是否在捉对方的棋子，亚洲规则的简化版本:
+        可以合法地吃掉对方的棋子，并且该棋子没有保护，或者价值比自己高，
+        将帅和兵卒可以长捉，不算捉子；被捉的是将帅或者未过河的兵卒也不算。
+        '''
+        chess = self.squares[sq]
+        if chess & Chess.CMASK in (Chess.KING, Chess.PAWN):
             return False
 
-        logger.info("get method %s", self.get_method(self.board, fpos, tpos))
+        turn = chess & Chess.TMASK
+        enemy = turn ^ Chess.TMASK
+        value = self.VALUES[chess & Chess.CMASK]
+        pins = self.get_pins(turn)
 
-        board = copy.deepcopy(self.board)
-        board[tpos] = board[fpos]
-        board[fpos] = Chess.NONE
+        for tsq in self.generate(sq, turn):
+            target = self.squares[tsq]
+            if not target:
+                continue
+            ctype = target & Chess.CMASK
+            if ctype == Chess.KING:
+                continue
+            if ctype == Chess.PAWN and in_half(tsq, enemy):
+                continue
+            if not self.is_legal(sq, tsq, pins):
+                continue
+            if self.VALUES[ctype] > value:
+                return True
+            if not self.is_protected(sq, tsq):
+                return True
+        return False
 
-        check = self.get_check(board, self.turn)
-        if check:
-            self.check = check
-            return Chess.INVALID
+    def validate_move(self, fpos, tpos):
+        if fpos == tpos:
+            return False
+        fsq = self.square(fpos)
+        tsq = self.square(tpos)
+        if self.squares[fsq] & self.turn == 0:
+            return False
+        if tsq not in self.generate(fsq, self.turn):
+            return False
+        return self.is_legal(fsq, tsq, self.get_pins(self.turn))
+
+    def move(self, fpos, tpos):
+        if not self.validate_move(fpos, tpos):
+            return self.invalid_move(fpos, tpos)
+
+        undo = self.make_move(self.square(fpos), self.square(tpos))
 
         self.check = None
 
-        if self.board[tpos]:
+        if undo[2]:
             self.idle = 0
-        else:
-            self.idle += 1
-
-        if self.board[tpos]:
             result = Chess.CAPTURE
         else:
+            self.idle += 1
             result = Chess.MOVE
 
-        self.turn = Chess.invert(self.turn)
         if self.turn == Chess.RED:
             self.bout += 1
 
-        self.board[tpos] = self.board[fpos]
-        self.board[fpos] = Chess.NONE
         self.moves.append((fpos, tpos))
 
-        if self.is_checkmate(self.board, self.turn):
+        if self.is_checkmate(self.turn):
             logger.warning("Checkmate ......")
             return Chess.CHECKMATE
 
-        check = self.get_check(self.board, self.turn)
+        check = self.get_check(self.turn)
         if check:
             self.check = check
             return Chess.CHECK
 
         return result
 
+    def invalid_move(self, fpos, tpos):
+        # 走法生成器可以生成，但是走完会被将军的着法返回 INVALID，并记录将军的棋子
+        fsq = self.square(fpos)
+        tsq = self.square(tpos)
+        if fpos == tpos or self.squares[fsq] & self.turn == 0:
+            return False
+        if tsq not in self.generate(fsq, self.turn):
+            return False
+
+        turn = self.turn
+        undo = self.make_move(fsq, tsq)
+        self.check = self.get_check(turn)
+        self.unmake_move(undo)
+        return Chess.INVALID
+
     def __repr__(self):
         if not self.fpos:
             return 'startpos'
@@ -491,16 +624,16 @@ def main():
     logger.debug(sit.fen)
     # logger.debug(sit.moves)
     # sit.print()
-    logger.debug(sit.get_check(sit.board, Chess.RED))
-    logger.debug(sit.is_checkmate(sit.board, Chess.RED))
-    # logger.debug(sit.generate(sit.board, (0, 0), Chess.BLACK))
-    # logger.debug(sit.generate(sit.board, (1, 0), Chess.BLACK))
-    # logger.debug(sit.generate(sit.board, (2, 0), Chess.BLACK))
-    # logger.debug(sit.generate(sit.board, (3, 0), Chess.BLACK))
-    # logger.debug(sit.generate(sit.board, (4, 0), Chess.BLACK))
-    # logger.debug(sit.generate(sit.board, (4, 3), Chess.RED))
-    # logger.debug(sit.generate(sit.board, (1, 2), Chess.BLACK))
-    # logger.debug(sit.generate(sit.board, (4, 6), sit.turn))
+    logger.debug(sit.get_check(Chess.RED))
+    logger.debug(sit.is_checkmate(Chess.RED))
+    # logger.debug(sit.generate(sit.square((0, 0)), Chess.BLACK))
+    # logger.debug(sit.generate(sit.square((1, 0)), Chess.BLACK))
+    # logger.debug(sit.generate(sit.square((2, 0)), Chess.BLACK))
+    # logger.debug(sit.generate(sit.square((3, 0)), Chess.BLACK))
+    # logger.debug(sit.generate(sit.square((4, 0)), Chess.BLACK))
+    # logger.debug(sit.generate(sit.square((4, 3)), Chess.RED))
+    # logger.debug(sit.generate(sit.square((1, 2)), Chess.BLACK))
+    # logger.debug(sit.generate(sit.square((4, 6)), sit.turn))
     # sit.show(50)
 
 
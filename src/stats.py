@@ -0,0 +1,172 @@
+# coding=utf-8
+'''
+(C) Copyright 2021 Steven;
+@author: Steven kangweibaby@163.com
+@date: 2021-07-18
+解析引擎输出的 info 行，统计搜索的深度和速度
+
+    info depth 8 score 120 time 350 nodes 421000 nps 1202857 pv h2e2 h9g7
+
+同时支持 UCI 风格的 score cp 120 和 score mate 3。
+'''
+
+import time
+import collections
+from dataclasses import dataclass
+from dataclasses import field
+
+from logger import logger
+
+# 数值类型的字段
+INTEGERS = {'depth', 'seldepth', 'time', 'nodes', 'nps', 'hashfull', 'currmovenumber', 'multipv'}
+
+# series 最多保留的点数，分析模式下一次搜索可以有很多 info
+SERIES_LIMIT = 4096
+
+
+@dataclass(slots=True)
+class SearchInfo:
+
+    depth: int = 0
+    seldepth: int = 0
+    score: int = None
+    mate: int = None
+    time: int = 0
+    nodes: int = 0
+    nps: int = 0
+    hashfull: int = None
+    multipv: int = 1
+    currmove: str = None
+    currmovenumber: int = None
+    pv: list = field(default_factory=list)
+    # 收到这一行时距离搜索开始的秒数
+    elapsed: float = 0.0
+
+
+def parse_info(line: str) -> SearchInfo:
+    # 不认识的字段忽略，pv 一直到行尾
+    items = line.split()
+    info = SearchInfo()
+    idx = 1 if items and items[0] == 'info' else 0
+    while idx < len(items):
+        key = items[idx]
+        idx += 1
+        if key == 'pv':
+            info.pv = items[idx:]
+            break
+        if idx >= len(items):
+            break
+        if key == 'score':
+            var = items[idx]
+            if var in {'cp', 'mate'} and idx + 1 < len(items):
+                idx += 1
+                if var == 'mate':
+                    info.mate = int(items[idx])
+                    idx += 1
+                    continue
+            info.score = int(items[idx])
+            idx += 1
+            # 忽略 lowerbound 和 upperbound
+            continue
+        if key in INTEGERS:
+            try:
+                setattr(info, key, int(items[idx]))
+            except ValueError:
+                continue
+            idx += 1
+            continue
+        if key == 'currmove':
+            info.currmove = items[idx]
+            idx += 1
+            continue
+    return info
+
+
+class SearchStats(object):
+
+    '''
+    保存最近一次的 info 以及每次搜索的深度和速度序列，用于比较不同设置下引擎的表现
+
+    series 是当前搜索的 (秒数, 深度, nps) 序列，只保留最后 SERIES_LIMIT 个点，
+    history 是已经结束的每次搜索的最后一个 info
+    ponders 和 ponderhits 是后台思考的次数和猜中的次数
+
+    默认解析每一行 info，不需要统计的时候用 watch(False) 关闭，
+    或者让引擎不订阅 info，没有订阅的行在读取之后就丢弃了
+    '''
+
+    def __init__(self, limit=1000, series=SERIES_LIMIT, enabled=True):
+        self.limit = limit
+        self.enabled = enabled
+        self.latest = None
+        self.start = None
+        self.series = collections.deque(maxlen=series)
+        self.history = []
+        self.searching = False
+        self.ponders = 0
+        self.ponderhits = 0
+
+    def watch(self, enabled=True):
+        self.enabled = enabled
+
+    def record_ponder(self, hit):
+        self.ponders += 1
+        self.ponderhits += bool(hit)
+
+    @property
+    def hit_rate(self):
+        if not self.ponders:
+            return 0.0
+        return self.ponderhits / self.ponders
+
+    def new_search(self):
+        self.finish()
+        self.start = time.perf_counter()
+        self.series.clear()
+        self.searching = True
+
+    def finish(self):
+        # 搜索结束，保存最后的统计结果，series 保留到下一次搜索开始
+        if self.searching and self.series:
+            self.history.append(self.latest)
+            del self.history[:-self.limit]
+        self.searching = False
+
+    def update(self, line) -> SearchInfo:
+        if not self.enabled:
+            return None
+        try:
+            info = parse_info(line)
+        except ValueError:
+            logger.warning("invalid info %s", line)
+            return None
+
+        if self.start is None:
+            self.start = time.perf_counter()
+        info.elapsed = time.perf_counter() - self.start
+
+        # 有的引擎不输出 nps，用节点数和时间计算
+        if not info.nps and info.nodes and info.time:
+            info.nps = info.nodes * 1000 // info.time
+
+        # 只有带深度的行才记录，currmove 之类的行忽略
+        if info.depth:
+            self.latest = info
+            self.series.append((info.elapsed, info.depth, info.nps))
+        return info
+
+    @property
+    def nps(self):
+        return [nps for _, _, nps in self.series]
+
+    @property
+    def depths(self):
+        return [depth for _, depth, _ in self.series]
+
+    def summary(self):
+        # 已结束搜索的平均深度和平均 nps
+        if not self.history:
+            return 0, 0
+        depth = sum(info.depth for info in self.history) / len(self.history)
+        nps = sum(info.nps for info in self.history) / len(self.history)
+        return depth, nps
@@ -0,0 +1,172 @@
+# coding=utf-8
+'''
+(C) Copyright 2021 Steven;
+@author: Steven kangweibaby@163.com
+@date: 2021-06-22
+走法生成用的静态查找表，模块载入时生成一次
+
+位置都使用一维棋盘的下标 sq = x * 10 + y，见 position.Position
+'''
+
+import random
+
+from chess import Chess
+
+SQUARES = range(Chess.W * Chess.H)
+SIDES = (Chess.RED, Chess.BLACK)
+
+
+def offset(sq, dx, dy):
+    # 返回偏移之后的位置，出界返回 None
+    x, y = divmod(sq, Chess.H)
+    x += dx
+    y += dy
+    if (-1 < x < Chess.W) and (-1 < y < Chess.H):
+        return x * Chess.H + y
+    return None
+
+
+def in_palace(sq, turn):
+    x, y = divmod(sq, Chess.H)
+    if x < 3 or x > 5:  # 不能出宫
+        return False
+    if turn == Chess.RED:
+        return y > 6
+    return y < 3
+
+
+def in_half(sq, turn):
+    # 是否在本方半场，象不能过河
+    if turn == Chess.RED:
+        return sq % Chess.H > 4
+    return sq % Chess.H < 5
+
+
+def build_rays():
+    # 車和炮的四个方向，每个方向按由近到远排列
+    result = []
+    for sq in SQUARES:
+        rays = []
+        for dx, dy in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+            ray = []
+            tsq = offset(sq, dx, dy)
+            while tsq is not None:
+                ray.append(tsq)
+                tsq = offset(tsq, dx, dy)
+            rays.append(tuple(ray))
+        result.append(tuple(rays))
+    return tuple(result)
+
+
+def build_knight():
+    # (目标位置, 马腿位置)
+    offsets = [
+        ((1, 2), (0, 1)), ((1, -2), (0, -1)), ((-1, 2), (0, 1)), ((-1, -2), (0, -1)),
+        ((2, 1), (1, 0)), ((2, -1), (1, 0)), ((-2, 1), (-1, 0)), ((-2, -1), (-1, 0)),
+    ]
+    result = []
+    for sq in SQUARES:
+        moves = []
+        for (dx, dy), (lx, ly) in offsets:
+            tsq = offset(sq, dx, dy)
+            if tsq is None:
+                continue
+            moves.append((tsq, offset(sq, lx, ly)))
+        result.append(tuple(moves))
+    return tuple(result)
+
+
+def build_bishop():
+    # (目标位置, 象眼位置)，只能在本方半场
+    result = {}
+    for turn in SIDES:
+        table = []
+        for sq in SQUARES:
+            moves = []
+            for dx, dy in ((2, 2), (2, -2), (-2, 2), (-2, -2)):
+                tsq = offset(sq, dx, dy)
+                if tsq is None or not in_half(tsq, turn):
+                    continue
+                moves.append((tsq, offset(sq, dx // 2, dy // 2)))
+            table.append(tuple(moves))
+        result[turn] = tuple(table)
+    return result
+
+
+def build_palace(offsets):
+    # 士和将只能在九宫中走
+    result = {}
+    for turn in SIDES:
+        table = []
+        for sq in SQUARES:
+            moves = []
+            for dx, dy in offsets:
+                tsq = offset(sq, dx, dy)
+                if tsq is None or not in_palace(tsq, turn):
+                    continue
+                moves.append(tsq)
+            table.append(tuple(moves))
+        result[turn] = tuple(table)
+    return result
+
+
+def build_pawn():
+    result = {}
+    for turn in SIDES:
+        table = []
+        for sq in SQUARES:
+            forward = -1 if turn == Chess.RED else 1
+            offsets = [(0, forward)]
+            if not in_half(sq, turn):  # 过河卒
+                offsets.extend([(-1, 0), (1, 0)])
+            moves = []
+            for dx, dy in offsets:
+                tsq = offset(sq, dx, dy)
+                if tsq is None:
+                    continue
+                moves.append(tsq)
+            table.append(tuple(moves))
+        result[turn] = tuple(table)
+    return result
+
+
+def build_zobrist():
+    # 固定随机种子，保证不同进程，不同版本生成的键值一致，可以持久化
+    generator = random.Random(20210622)
+    pieces = {
+        chess: tuple(generator.getrandbits(64) for _ in SQUARES)
+        for chess in sorted(Chess.CHESSES)
+    }
+    return pieces, generator.getrandbits(64)
+
+
+def build_knight_attackers():
+    # 反向查找: 能够走到 sq 的马的位置，以及对应的马腿位置 (fsq, leg)
+    result = [[] for _ in SQUARES]
+    for sq in SQUARES:
+        for tsq, leg in KNIGHT_MOVES[sq]:
+            result[tsq].append((sq, leg))
+    return tuple(tuple(var) for var in result)
+
+
+def build_pawn_attackers():
+    # 反向查找: 能够走到 sq 的兵的位置
+    result = {}
+    for turn in SIDES:
+        table = [[] for _ in SQUARES]
+        for sq in SQUARES:
+            for tsq in PAWN_MOVES[turn][sq]:
+                table[tsq].append(sq)
+        result[turn] = tuple(tuple(var) for var in table)
+    return result
+
+
+RAYS = build_rays()
+KNIGHT_MOVES = build_knight()
+BISHOP_MOVES = build_bishop()
+ADVISOR_MOVES = build_palace(((1, 1), (1, -1), (-1, 1), (-1, -1)))
+KING_MOVES = build_palace(((0, 1), (0, -1), (1, 0), (-1, 0)))
+PAWN_MOVES = build_pawn()
+KNIGHT_ATTACKERS = build_knight_attackers()
+PAWN_ATTACKERS = build_pawn_attackers()
+ZOBRIST, ZOBRIST_TURN = build_zobrist()
@@ -0,0 +1,141 @@
+# coding=utf-8
+'''
+(C) Copyright 2021 Steven;
+@author: Steven kangweibaby@163.com
+@date: 2021-07-08
+固定大小的置换表，用于 search.Search
+'''
+
+from logger import logger
+
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+# data 的位布局
+SCORE_OFFSET = 1 << 15  # 分数 16 位，加上偏移保存成无符号数
+DEPTH_SHIFT = 16  # 深度 8 位
+FLAG_SHIFT = 24  # 边界类型 2 位
+MOVE_SHIFT = 26  # 着法 15 位，最高位表示有没有着法，fsq 和 tsq 各 7 位
+AGE_SHIFT = 41  # 搜索代数 8 位
+
+MOVE_FLAG = 1 << 14
+
+
+def pack(depth, flag, score, move, age):
+    data = (score + SCORE_OFFSET) | (depth << DEPTH_SHIFT) | (flag << FLAG_SHIFT)
+    if move:
+        data |= (MOVE_FLAG | (move[0] << 7) | move[1]) << MOVE_SHIFT
+    return data | (age << AGE_SHIFT)
+
+
+def unpack(data):
+    # 返回 (depth, flag, score, move)
+    score = (data & 0xFFFF) - SCORE_OFFSET
+    depth = (data >> DEPTH_SHIFT) & 0xFF
+    flag = (data >> FLAG_SHIFT) & 0b11
+    move = (data >> MOVE_SHIFT) & 0x7FFF
+    if move & MOVE_FLAG:
+        move = ((move >> 7) & 0x7F, move & 0x7F)
+    else:
+        move = None
+    return depth, flag, score, move
+
+
+class TranspositionTable(object):
+
+    '''
+    置换表在创建的时候一次分配好内存，之后大小不再变化。
+
+    每个条目是两个 64 位整数 (key ^ data, data)，保存的 key 与 data 异或，
+    读取的时候再异或回来校验，这样条目被并发写坏的时候只会被当作没有命中。
+
+    每个桶有两个条目:
+        第一个是深度优先，只有深度不小于原来的条目，或者原来的条目是以前的搜索留下的才替换；
+        第二个总是替换。
+    '''
+
+    ENTRY_SIZE = 16
+    BUCKET_SIZE = 2
+    DEFAULT_SIZE = 16  # 默认大小 MB
+
+    def __init__(self, size=DEFAULT_SIZE, buffer=None):
+        self.age = 0
+        if buffer is None:
+            self.resize(size)
+        else:
+            self.attach(buffer, size)
+
+    @classmethod
+    def get_buckets(cls, size):
+        # 根据大小 (MB) 计算桶的数量
+        return max(1, (size << 20) // (cls.ENTRY_SIZE * cls.BUCKET_SIZE))
+
+    def attach(self, buffer, size):
+        # 在已经分配好的内存上建立置换表，buffer 至少是 size MB
+        self.size = size
+        self.buckets = self.get_buckets(size)
+        self.buffer = buffer
+        self.slots = memoryview(buffer).cast('B').cast('Q')[:self.buckets * self.BUCKET_SIZE * 2]
+
+    def resize(self, size):
+        size = max(1, int(size))
+        if getattr(self, 'size', None) == size:
+            return
+        logger.info("transposition table size %d MB", size)
+        self.attach(bytearray(size << 20), size)
+
+    def release(self):
+        # 释放对 buffer 的引用，共享内存关闭之前需要调用
+        self.slots.release()
+        self.slots = None
+        self.buffer = None
+
+    def clear(self):
+        slots = self.slots
+        slots.cast('B')[:] = bytes(len(slots) * 8)
+        self.age = 0
+
+    def new_search(self):
+        self.age = (self.age + 1) & 0xFF
+
+    def get_index(self, key):
+        return (key % self.buckets) * self.BUCKET_SIZE * 2
+
+    def probe(self, key):
+        # 返回 (depth, flag, score, move)，没有命中返回 None
+        slots = self.slots
+        index = self.get_index(key)
+        for var in (index, index + 2):
+            data = slots[var + 1]
+            if slots[var] ^ data == key and data:
+                return unpack(data)
+        return None
+
+    def store(self, key, depth, flag, score, move):
+        slots = self.slots
+        index = self.get_index(key)
+        data = pack(depth, flag, score, move, self.age)
+
+        old = slots[index + 1]
+        if (
+            slots[index] ^ old == key
+            or (old >> AGE_SHIFT) != self.age
+            or depth >= (old >> DEPTH_SHIFT) & 0xFF
+        ):
+            if move is None and slots[index] ^ old == key:
+                # 保留原来的着法
+                data |= old & (0x7FFF << MOVE_SHIFT)
+            slots[index] = key ^ data
+            slots[index + 1] = data
+            return
+
+        index += 2
+        slots[index] = key ^ data
+        slots[index + 1] = data
+
+    def get_move(self, key):
+        entry = self.probe(key)
+        if entry is None:
+            return None
+        return entry[3]
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+
+################################################################################
+## Form generated from reading UI file 'analysis.ui'
+##
+## Created by: Qt User Interface Compiler version 6.5.2
+##
+## WARNING! All changes made in this file will be lost when recompiling UI file!
+################################################################################
+
+from PySide6.QtCore import (QCoreApplication, QDate, QDateTime, QLocale,
+    QMetaObject, QObject, QPoint, QRect,
+    QSize, QTime, QUrl, Qt)
+from PySide6.QtGui import (QBrush, QColor, QConicalGradient, QCursor,
+    QFont, QFontDatabase, QGradient, QIcon,
+    QImage, QKeySequence, QLinearGradient, QPainter,
+    QPalette, QPixmap, QRadialGradient, QTransform)
+from PySide6.QtWidgets import (QApplication, QDialog, QLabel, QListWidget,
+    QListWidgetItem, QSizePolicy, QVBoxLayout, QWidget)
+
+class Ui_Dialog(object):
+    def setupUi(self, Dialog):
+        if not Dialog.objectName():
+            Dialog.setObjectName(u"Dialog")
+        Dialog.resize(420, 300)
+        Dialog.setMinimumSize(QSize(320, 0))
+        self.verticalLayout = QVBoxLayout(Dialog)
+        self.verticalLayout.setObjectName(u"verticalLayout")
+        self.status = QLabel(Dialog)
+        self.status.setObjectName(u"status")
+        font = QFont()
+        font.setFamilies([u"DengXian"])
+        font.setPointSize(11)
+        self.status.setFont(font)
+
+        self.verticalLayout.addWidget(self.status)
+
+        self.listwidget = QListWidget(Dialog)
+        self.listwidget.setObjectName(u"listwidget")
+        font1 = QFont()
+        font1.setFamilies([u"DengXian"])
+        font1.setPointSize(14)
+        self.listwidget.setFont(font1)
+        self.listwidget.setProperty("showDropIndicator", False)
+        self.listwidget.setSpacing(5)
+        self.listwidget.setWordWrap(True)
+
+        self.verticalLayout.addWidget(self.listwidget)
+
+
+        self.retranslateUi(Dialog)
+
+        QMetaObject.connectSlotsByName(Dialog)
+    # setupUi
+
+    def retranslateUi(self, Dialog):
+        Dialog.setWindowTitle(QCoreApplication.translate("Dialog", u"\u5206\u6790", None))
+        self.status.setText("")
+    # retranslateUi
+
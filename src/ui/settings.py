@@ -56,7 +56,7 @@ class Ui_Dialog(object):
         self.cancel.setObjectName(u"cancel")
         self.cancel.setFont(font)
 
-        self.gridLayout.addWidget(self.cancel, 10, 3, 1, 1)
+        self.gridLayout.addWidget(self.cancel, 14, 3, 1, 1)
 
         self.animate = QCheckBox(Dialog)
         self.animate.setObjectName(u"animate")
@@ -90,7 +90,7 @@ class Ui_Dialog(object):
         self.ok.setObjectName(u"ok")
         self.ok.setFont(font)
 
-        self.gridLayout.addWidget(self.ok, 10, 2, 1, 1)
+        self.gridLayout.addWidget(self.ok, 14, 2, 1, 1)
 
         self.blackside = QComboBox(Dialog)
         self.blackside.addItem("")
@@ -169,6 +169,7 @@ class Ui_Dialog(object):
         self.mode = QComboBox(Dialog)
         self.mode.addItem("")
         self.mode.addItem("")
+        self.mode.addItem("")
         self.mode.setObjectName(u"mode")
         self.mode.setFont(font)
 
@@ -294,6 +295,125 @@ class Ui_Dialog(object):
 
         self.gridLayout.addWidget(self.ontop, 1, 1, 1, 1)
 
+        self.label_17 = QLabel(Dialog)
+        self.label_17.setObjectName(u"label_17")
+        self.label_17.setFont(font)
+        self.label_17.setAlignment(Qt.AlignRight|Qt.AlignTrailing|Qt.AlignVCenter)
+
+        self.gridLayout.addWidget(self.label_17, 1, 2, 1, 1)
+
+        self.label_18 = QLabel(Dialog)
+        self.label_18.setObjectName(u"label_18")
+        self.label_18.setFont(font)
+        self.label_18.setAlignment(Qt.AlignRight|Qt.AlignTrailing|Qt.AlignVCenter)
+
+        self.gridLayout.addWidget(self.label_18, 10, 0, 1, 1)
+
+        self.threads = QSpinBox(Dialog)
+        self.threads.setObjectName(u"threads")
+        self.threads.setFont(font)
+        self.threads.setMinimum(1)
+        self.threads.setMaximum(64)
+        self.threads.setValue(1)
+
+        self.gridLayout.addWidget(self.threads, 10, 1, 1, 1)
+
+        self.hashsize = QSpinBox(Dialog)
+        self.hashsize.setObjectName(u"hashsize")
+        self.hashsize.setFont(font)
+        self.hashsize.setMinimum(1)
+        self.hashsize.setMaximum(4096)
+        self.hashsize.setValue(16)
+
+        self.gridLayout.addWidget(self.hashsize, 1, 3, 1, 1)
+
+        self.label_19 = QLabel(Dialog)
+        self.label_19.setObjectName(u"label_19")
+        self.label_19.setFont(font)
+        self.label_19.setAlignment(Qt.AlignRight|Qt.AlignTrailing|Qt.AlignVCenter)
+
+        self.gridLayout.addWidget(self.label_19, 10, 2, 1, 1)
+
+        self.ponder = QCheckBox(Dialog)
+        self.ponder.setObjectName(u"ponder")
+
+        self.gridLayout.addWidget(self.ponder, 10, 3, 1, 1)
+
+        self.label_21 = QLabel(Dialog)
+        self.label_21.setObjectName(u"label_21")
+        self.label_21.setFont(font)
+        self.label_21.setAlignment(Qt.AlignRight|Qt.AlignTrailing|Qt.AlignVCenter)
+
+        self.gridLayout.addWidget(self.label_21, 11, 0, 1, 1)
+
+        self.increment = QSpinBox(Dialog)
+        self.increment.setObjectName(u"increment")
+        self.increment.setFont(font)
+        self.increment.setMaximum(600)
+        self.increment.setValue(0)
+
+        self.gridLayout.addWidget(self.increment, 11, 1, 1, 1)
+
+        self.label_22 = QLabel(Dialog)
+        self.label_22.setObjectName(u"label_22")
+        self.label_22.setFont(font)
+        self.label_22.setAlignment(Qt.AlignRight|Qt.AlignTrailing|Qt.AlignVCenter)
+
+        self.gridLayout.addWidget(self.label_22, 11, 2, 1, 1)
+
+        self.movestogo = QSpinBox(Dialog)
+        self.movestogo.setObjectName(u"movestogo")
+        self.movestogo.setFont(font)
+        self.movestogo.setMaximum(200)
+        self.movestogo.setValue(0)
+
+        self.gridLayout.addWidget(self.movestogo, 11, 3, 1, 1)
+
+        self.label_24 = QLabel(Dialog)
+        self.label_24.setObjectName(u"label_24")
+        self.label_24.setFont(font)
+        self.label_24.setAlignment(Qt.AlignRight|Qt.AlignTrailing|Qt.AlignVCenter)
+
+        self.gridLayout.addWidget(self.label_24, 12, 0, 1, 1)
+
+        self.red_clock = QSpinBox(Dialog)
+        self.red_clock.setObjectName(u"red_clock")
+        self.red_clock.setFont(font)
+        self.red_clock.setMinimum(1)
+        self.red_clock.setMaximum(600)
+        self.red_clock.setValue(10)
+
+        self.gridLayout.addWidget(self.red_clock, 12, 1, 1, 1)
+
+        self.label_25 = QLabel(Dialog)
+        self.label_25.setObjectName(u"label_25")
+        self.label_25.setFont(font)
+        self.label_25.setAlignment(Qt.AlignRight|Qt.AlignTrailing|Qt.AlignVCenter)
+
+        self.gridLayout.addWidget(self.label_25, 12, 2, 1, 1)
+
+        self.black_clock = QSpinBox(Dialog)
+        self.black_clock.setObjectName(u"black_clock")
+        self.black_clock.setFont(font)
+        self.black_clock.setMinimum(1)
+        self.black_clock.setMaximum(600)
+        self.black_clock.setValue(10)
+
+        self.gridLayout.addWidget(self.black_clock, 12, 3, 1, 1)
+
+        self.label_23 = QLabel(Dialog)
+        self.label_23.setObjectName(u"label_23")
+        self.label_23.setFont(font)
+        self.label_23.setAlignment(Qt.AlignRight|Qt.AlignTrailing|Qt.AlignVCenter)
+
+        self.gridLayout.addWidget(self.label_23, 13, 0, 1, 1)
+
+        self.book = QCheckBox(Dialog)
+        self.book.setObjectName(u"book")
+        self.book.setChecked(True)
+
+        self.gridLayout.addWidget(self.book, 13, 1, 1, 1)
+
 
         self.verticalLayout.addLayout(self.gridLayout)
 
@@ -324,6 +444,7 @@ class Ui_Dialog(object):
         self.label_11.setText(QCoreApplication.translate("Dialog", u"\u7ea2\u65b9\u5f15\u64ce", None))
         self.mode.setItemText(0, QCoreApplication.translate("Dialog", u"\u6df1\u5ea6\u5236", None))
         self.mode.setItemText(1, QCoreApplication.translate("Dialog", u"\u9650\u65f6\u5236", None))
+        self.mode.setItemText(2, QCoreApplication.translate("Dialog", u"\u65f6\u949f\u5236", None))
 
         self.label_13.setText(QCoreApplication.translate("Dialog", u"\u601d\u8003\u6a21\u5f0f", None))
         self.checkupdate.setText(QCoreApplication.translate("Dialog", u"\u68c0\u67e5\u66f4\u65b0", None))
@@ -340,5 +461,19 @@ class Ui_Dialog(object):
         self.label_6.setText(QCoreApplication.translate("Dialog", u"\u97f3\u6548", None))
         self.label_16.setText(QCoreApplication.translate("Dialog", u"\u603b\u662f\u5728\u4e0a", None))
         self.ontop.setText("")
+        self.label_17.setText(QCoreApplication.translate("Dialog", u"\u7f6e\u6362\u8868", None))
+        self.label_18.setText(QCoreApplication.translate("Dialog", u"\u7ebf\u7a0b\u6570", None))
+        self.label_19.setText(QCoreApplication.translate("Dialog", u"\u540e\u53f0\u601d\u8003", None))
+        self.ponder.setText("")
+        self.label_21.setText(QCoreApplication.translate("Dialog", u"\u6bcf\u6b65\u52a0\u79d2", None))
+        self.increment.setSuffix(QCoreApplication.translate("Dialog", u" \u79d2", None))
+        self.label_22.setText(QCoreApplication.translate("Dialog", u"\u9650\u7740\u6b65\u6570", None))
+        self.label_24.setText(QCoreApplication.translate("Dialog", u"\u7ea2\u65b9\u7528\u65f6", None))
+        self.red_clock.setSuffix(QCoreApplication.translate("Dialog", u" \u5206\u949f", None))
+        self.label_25.setText(QCoreApplication.translate("Dialog", u"\u9ed1\u65b9\u7528\u65f6", None))
+        self.black_clock.setSuffix(QCoreApplication.translate("Dialog", u" \u5206\u949f", None))
+        self.label_23.setText(QCoreApplication.translate("Dialog", u"\u5f00\u5c40\u5e93", None))
+        self.book.setText("")
+        self.hashsize.setSuffix(QCoreApplication.translate("Dialog", u" MB", None))
     # retranslateUi
 
@@ -61,3 +61,34 @@ class attrdict(dict):
         import json
         data = json.loads(value)
         return cls.loads(data)
+
+
+class lazyattr(object):
+
+    '''
+    第一次访问的时候才计算的类属性，计算之后直接替换成结果
+
+    用于需要 numpy 等比较重的模块才能生成的常量，避免模块载入的时候就导入。
+    '''
+
+    def __init__(self, func):
+        self.func = func
+        self.name = func.__name__
+
+    def __get__(self, obj, cls):
+        value = self.func()
+        setattr(cls, self.name, value)
+        return value
+
+
+def detect_encoding(filename, size=1 << 20):
+    # 棋谱文件可能是 utf8 或者 gbk，根据开头的内容判断
+    with open(filename, 'rb') as file:
+        sample = file.read(size)
+    try:
+        sample.decode('utf8')
+    except UnicodeDecodeError as e:
+        # 采样的结尾可能截断了一个字符
+        if e.start < len(sample) - 3:
+            return 'gbk'
+    return 'utf-8-sig'
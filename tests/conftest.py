@@ -0,0 +1,14 @@
+# coding=utf-8
+'''
+测试直接导入 src 中的模块，和程序运行时一样
+'''
+
+import os
+import sys
+import logging
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from logger import logger  # noqa: E402
+
+logger.setLevel(logging.WARNING)
@@ -0,0 +1,104 @@
+# coding=utf-8
+
+import sys
+import asyncio
+import threading
+
+import fake
+import aioengine
+from chess import Chess
+from aioengine import AsyncUCCIClient
+from aioengine import AsyncUCCIEngine
+
+
+class FakeClient(AsyncUCCIClient):
+
+    def __init__(self, listener=None, args=()):
+        super().__init__(fake.filename, listener=listener)
+        self.args = list(args)
+
+    def get_command(self):
+        return [sys.executable, str(self.filename)] + self.args
+
+
+def test_client():
+    async def main():
+        client = FakeClient(args=['--infos', '3'])
+        await client.start()
+        try:
+            assert client.ids.name == 'FakeEngine'
+            assert 'hashsize' in client.options
+
+            await client.set_option('hashsize', 64)
+            assert client.options.hashsize.value == '64'
+            assert await client.isready(timeout=5)
+
+            await client.position('startpos moves h2e2')
+            result = await client.go(depth=3)
+            infos = [line async for line in client.infos()]
+            move = await result
+            assert len(infos) == 3
+            assert move == 'a9a8'
+            assert client.bestline.startswith('bestmove a9a8')
+
+            # 分析模式直到 stop 才返回
+            result = await client.go(infinite=True)
+            await asyncio.sleep(0.05)
+            assert not result.done()
+            await client.stop()
+            assert await asyncio.wait_for(result, 5) == 'a9a8'
+        finally:
+            await client.close()
+        assert not client.running
+
+    asyncio.run(main())
+
+
+def test_engine_callback():
+    finished = threading.Event()
+    events = []
+
+    def callback(type, data):
+        events.append((type, data))
+        if type != Chess.INFO:
+            finished.set()
+
+    engine = AsyncUCCIEngine(fake.filename, callback=callback)
+    engine.client = FakeClient(listener=engine.listen)
+    engine.start()
+    try:
+        # 启动完成之前的指令排队等待
+        engine.set_hashsize(32)
+        engine.position('startpos')
+        engine.go(depth=2)
+        assert finished.wait(10)
+        assert engine.isready()
+        assert engine.options.hashsize.value == '32'
+    finally:
+        engine.close()
+
+    types = [type for type, _ in events]
+    assert types.count(Chess.INFO) == 10
+    assert types[-1] == Chess.MOVE
+    assert engine.state == engine.ENGINE_IDLE
+
+
+def test_client_info_limit(monkeypatch):
+    # 没有人读取 infos 的时候只保留最近的几行
+    monkeypatch.setattr(aioengine, 'INFO_LIMIT', 4)
+
+    async def main():
+        client = FakeClient(args=['--infos', '10'])
+        await client.start()
+        try:
+            result = await client.go(depth=3)
+            lines = client.lines
+            assert await result
+            assert lines.qsize() == 4
+            items = [lines.get_nowait() for _ in range(4)]
+            assert items[-1] is None
+            assert all(line.startswith('info') for line in items[:-1])
+        finally:
+            await client.close()
+
+    asyncio.run(main())
@@ -0,0 +1,113 @@
+# coding=utf-8
+
+import time
+import threading
+
+from chess import Chess
+from engine import Engine
+from fake import FakeEngine
+from pool import EnginePool
+from analysis import MULTIPV
+from analysis import Analyser
+from situation import Situation
+from engines.native import NativeEngine
+
+# 红方一步杀
+MATE_FEN = '3k5/R8/9/9/9/9/9/9/8R/4K4 w - - 0 1'
+
+
+def wait_until(predicate, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_multipv_analysis():
+    engine = FakeEngine(infos=4)
+    engine.start()
+    engine.subscribe('info', False)
+    pool = EnginePool()
+    analyser = Analyser()
+    try:
+        # 握手完成之前设置的 multipv 在 ucciok 之后发送
+        analyser.attach(engine)
+        wait_until(lambda: engine.state != Engine.ENGINE_BOOT)
+        assert engine.isready()
+        assert engine.options.multipv.value == str(MULTIPV)
+
+        analyser.analyse(Situation())
+        wait_until(lambda: len(analyser.infos) == MULTIPV and all(
+            info.depth == 4 for info in analyser.infos.values()))
+        lines = analyser.format_lines()
+        assert [depth for depth, _, _ in lines] == [4] * MULTIPV
+        assert len({pv for _, _, pv in lines}) == MULTIPV
+        assert engine.state == Engine.ENGINE_BUSY
+
+        # 停止之后等到引擎输出着法，空闲的引擎可以放回引擎池
+        assert analyser.detach() is engine
+        assert engine.state == Engine.ENGINE_IDLE
+        assert engine.options.multipv.value == '1'
+        pool.release(engine)
+        assert pool.idle[FakeEngine] == [engine]
+    finally:
+        pool.close()
+        if engine.running:
+            engine.close()
+
+
+def test_native_infinite_waits_for_stop():
+    finished = threading.Event()
+    events = []
+
+    def callback(type, data):
+        if type == Chess.INFO:
+            return
+        events.append((type, data))
+        finished.set()
+
+    engine = NativeEngine(callback=callback)
+    engine.start()
+    try:
+        engine.position(MATE_FEN)
+        engine.go(infinite=True)
+        # 找到杀棋之后搜索结束，但是要等到 stop 才输出着法
+        assert not finished.wait(0.5)
+        assert engine.state == Engine.ENGINE_BUSY
+
+        engine.stop()
+        assert finished.wait(5)
+        assert engine.state == Engine.ENGINE_IDLE
+        assert len(events) == 1
+        type, (fpos, tpos) = events[0]
+        assert type == Chess.MOVE
+
+        sit = Situation()
+        sit.parse_fen(MATE_FEN)
+        assert sit.move(fpos, tpos) == Chess.CHECKMATE
+    finally:
+        engine.close()
+
+
+def test_native_restart_analysis():
+    # analyse 在局面改变的时候 stop 之后马上 go，上一次的搜索不能卡住引擎线程
+    engine = NativeEngine()
+    engine.start()
+    analyser = Analyser()
+    try:
+        analyser.attach(engine)
+        sit = Situation()
+        analyser.analyse(sit)
+        wait_until(lambda: analyser.infos)
+
+        sit.move(*sit.parse_move('h2e2'))
+        analyser.analyse(sit)
+        wait_until(lambda: analyser.infos)
+        assert analyser.sit.format_fen() == sit.format_fen()
+        assert engine.state == Engine.ENGINE_BUSY
+
+        assert analyser.detach() is engine
+        assert engine.state == Engine.ENGINE_IDLE
+    finally:
+        engine.close()
+
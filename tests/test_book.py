@@ -0,0 +1,79 @@
+# coding=utf-8
+
+import random
+
+import book
+from book import BookBuilder
+from book import OpeningBook
+from book import pack_move
+from situation import Situation
+
+START = Situation().fen
+
+CONTENT = f'''fen {START} moves h2e2 h9g7 h0g2\t1-0
+fen {START} moves h2e2 b9c7\t0-1
+
+炮二平五 马8进7
+1/2-1/2
+
+fen {START} moves h2e2 h9g7 a0a5\t1-0
+'''
+
+
+def get_move(sit, move):
+    fpos, tpos = sit.parse_move(move)
+    return pack_move(sit.square(fpos), sit.square(tpos))
+
+
+def test_build_and_probe(tmp_path):
+    builder = BookBuilder()
+    builder.add_content(CONTENT)
+    # 最后一局 a0a5 不合法，前面的着法也不收录
+    assert (builder.games, builder.errors) == (3, 1)
+
+    sit = Situation()
+    moves = builder.entries[sit.key]
+    assert moves == {get_move(sit, 'h2e2'): [3, 0, 3]}
+
+    sit.move(*sit.parse_move('h2e2'))
+    moves = builder.entries[sit.key]
+    # 黑方的角度，马8进7 一负一和，马2进3 一胜
+    assert moves[get_move(sit, 'h9g7')] == [2, -1, 2]
+    assert moves[get_move(sit, 'b9c7')] == [1, 1, 1]
+
+    filename = str(tmp_path / 'book.bin')
+    assert builder.write(filename) == 4
+
+    opening = OpeningBook.open(filename)
+    try:
+        assert len(opening) == 4
+        result = opening.lookup(sit.key)
+        assert [move.weight for move in result] == [2, 1]
+
+        fpos, tpos = opening.probe(sit, rand=random.Random(1))
+        assert sit.validate_move(fpos, tpos)
+        # 禁止的着法不会返回
+        banned = [(result[0].fsq, result[0].tsq)]
+        fpos, tpos = opening.probe(sit, banmoves=banned)
+        assert sit.format_move(fpos, tpos) == 'b9c7'
+        assert opening.lookup(Situation().key + 1) == []
+    finally:
+        opening.close()
+
+
+def test_open_invalid(tmp_path):
+    assert OpeningBook.open(str(tmp_path / 'missing.bin')) is None
+    filename = tmp_path / 'bad.bin'
+    filename.write_bytes(b'0' * 32)
+    assert OpeningBook.open(str(filename)) is None
+
+
+def test_build_command_gbk(tmp_path, capsys):
+    source = tmp_path / 'games.txt'
+    source.write_bytes('炮二平五 马8进7\n1-0\n'.encode('gbk'))
+    filename = str(tmp_path / 'book.bin')
+    assert book.main(['build', filename, str(source)]) == 0
+    assert capsys.readouterr().out.startswith('games 1 errors 0')
+
+    assert book.main(['probe', filename]) == 0
+    assert capsys.readouterr().out.startswith('h2e2 炮二平五 weight 1 learn 1 games 1')
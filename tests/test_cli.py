@@ -0,0 +1,102 @@
+# coding=utf-8
+
+import os
+import sys
+import subprocess
+
+import cli
+
+START = 'rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/9/RNBAKABNR w - - 0 1'
+
+
+def test_validate(capsys):
+    assert cli.main(['validate', 'startpos', f'{START} moves h2e2']) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0] == f'ok {START}'
+    assert lines[1] == 'ok rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C2C4/9/RNBAKABNR b - - 1 1'
+
+
+def test_validate_invalid(capsys):
+    fens = [
+        '4k4/9/9/9/9/9/9/9/9/3KK4 w - - 0 1',
+        '9/9/9/9/9/9/9/9/9/4K4 w - - 0 1',
+        f'{START} moves a0a5',
+    ]
+    assert cli.main(['validate'] + fens) == 1
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 3
+    assert lines[0].startswith('invalid too many')
+    assert lines[1].startswith('invalid missing')
+    assert lines[2].startswith('invalid invalid move a0a5')
+
+
+def test_moves(capsys):
+    assert cli.main(['moves', 'startpos']) == 0
+    moves = capsys.readouterr().out.split()
+    assert len(moves) == 44
+    assert 'h2e2' in moves
+
+
+def test_moves_stdin(capsys, monkeypatch):
+    import io
+
+    monkeypatch.setattr(sys, 'stdin', io.StringIO('startpos\n\nbad fen\n'))
+    assert cli.main(['moves']) == 1
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines[0].split()) == 44
+    assert lines[1].startswith('invalid')
+
+
+def test_moves_broken_pipe():
+    # 相当于 python cli.py moves | head
+    process = subprocess.Popen(
+        [sys.executable, cli.__file__, 'moves'],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        cwd=os.path.dirname(cli.__file__),
+    )
+    process.stdin.write(b'startpos\n' * 2000)
+    process.stdin.close()
+    assert process.stdout.read(10)
+    process.stdout.close()
+    error = process.stderr.read()
+    process.stderr.close()
+    assert process.wait() == 1
+    assert b'Traceback' not in error
+
+
+def test_manual_encoding(tmp_path, capsys):
+    content = '炮二平五 马8进7\n'
+    for encoding in ('utf8', 'gbk'):
+        filename = tmp_path / f'{encoding}.txt'
+        filename.write_bytes(content.encode(encoding))
+        assert cli.main(['manual', str(filename)]) == 0
+        assert capsys.readouterr().out.strip() == f'{START} moves h2e2 h9g7'
+
+    assert cli.main(['manual', str(filename), '--current']) == 0
+    assert capsys.readouterr().out.strip().endswith(' w - - 2 2')
+
+
+def write_engine(tmp_path, script):
+    # 只完成握手的 UCCI 引擎，之后退出或者一直没有输出
+    filename = tmp_path / 'engine.sh'
+    filename.write_text(f'#!/bin/sh\necho ucciok\n{script}\n')
+    filename.chmod(0o755)
+    return str(filename)
+
+
+def test_analyse_engine_exit(tmp_path, capsys):
+    engine = write_engine(tmp_path, 'exit 3')
+    assert cli.main(['analyse', 'startpos', '--ucci', engine, '--timeout', '10']) == 1
+    assert capsys.readouterr().out.splitlines()[-1] == 'error engine exited with code 3: startpos'
+
+
+def test_analyse_engine_timeout(tmp_path, capsys):
+    engine = write_engine(tmp_path, 'exec sleep 30')
+    assert cli.main(['analyse', 'startpos', '--ucci', engine, '--timeout', '0.5']) == 1
+    assert capsys.readouterr().out.splitlines()[-1] == 'error engine timeout: startpos'
+
+
+def test_analyse_engine_missing(tmp_path, capsys):
+    engine = str(tmp_path / 'missing.exe')
+    assert cli.main(['analyse', 'startpos', '--ucci', engine]) == 1
+    assert capsys.readouterr().out.startswith('error engine not started')
@@ -0,0 +1,54 @@
+# coding=utf-8
+
+import time
+
+from chess import Chess
+from clock import GameClock
+from clock import allocate
+from clock import format_time
+
+
+def test_allocate():
+    assert allocate(300000) == 10000
+    assert allocate(300000, movestogo=10, increment=2000) == 32000
+    # 不超过剩余时间
+    assert allocate(1000, movestogo=1) == 900
+    assert allocate(100, movestogo=1) == 50
+
+
+def test_format_time():
+    assert format_time(0) == '00:00'
+    assert format_time(61001) == '01:02'
+    assert format_time(3600000) == '1:00:00'
+
+
+def test_press_increment_and_movestogo():
+    clock = GameClock()
+    clock.configure(60000, 60000, increment=1000, movestogo=2)
+    clock.start(Chess.RED)
+    clock.press(Chess.RED)
+    assert clock.turn == Chess.BLACK
+    assert 60900 < clock.remaining(Chess.RED) <= 61000
+
+    params = clock.get_params(Chess.BLACK)
+    assert params.increment == 1000
+    assert params.movestogo == 2
+    assert params.oppmovestogo == 1
+
+    clock.press(Chess.BLACK)
+    clock.press(Chess.RED)
+    # 走满限着之后再加一次初始时间
+    assert clock.remaining(Chess.RED) > 120000
+    assert clock.moves[Chess.RED] == 0
+
+
+def test_stop_at_received_time():
+    clock = GameClock()
+    clock.configure(10000, 10000)
+    clock.start(Chess.RED)
+    received = time.perf_counter()
+    time.sleep(0.1)
+    # 界面线程处理的延迟不计入用时
+    clock.stop(received)
+    assert clock.remaining(Chess.RED) > 9990
+    assert clock.turn is None
@@ -0,0 +1,121 @@
+# coding=utf-8
+
+import time
+
+from engine import Engine
+from engine import UCCIEngine
+from fake import FakeEngine
+
+
+class RecordEngine(UCCIEngine):
+
+    # 不启动引擎进程，只记录发给引擎的指令，引擎的输出由测试调用 parse_line 模拟
+    def setup(self):
+        self.commands = []
+
+    def send_command(self, command):
+        self.commands.append(command)
+
+    def handshake(self, *options):
+        for option in options:
+            self.parse_line(f'option {option}')
+        self.parse_line('ucciok')
+
+    def setoptions(self):
+        return [command for command in self.commands if command.startswith('setoption')]
+
+
+def test_hashsize_before_ucciok():
+    # 模拟引擎启动很慢，ucciok 之前设置选项
+    engine = RecordEngine('engine')
+    engine.set_hashsize(64)
+    assert engine.state == Engine.ENGINE_BOOT
+    assert engine.setoptions() == []
+
+    engine.handshake('hashsize type spin min 0 max 1024 default 16')
+    assert engine.state == Engine.ENGINE_IDLE
+    assert engine.options.hashsize.value == '64'
+    assert engine.setoptions() == ['setoption hashsize 64']
+
+
+def test_hashsize_unchanged():
+    engine = RecordEngine('engine')
+    engine.handshake('hashsize type spin min 0 max 1024 default 16')
+    engine.set_hashsize(16)
+    engine.set_hashsize(32)
+    engine.set_hashsize(32)
+    assert engine.options.hashsize.value == '32'
+    assert engine.setoptions() == ['setoption hashsize 32']
+
+
+def test_unsupported_option():
+    engine = RecordEngine('engine')
+    engine.set_hashsize(64)
+    engine.handshake()
+    assert engine.setoptions() == []
+
+
+def test_threads_before_ucciok():
+    engine = RecordEngine('engine')
+    engine.set_threads(4)
+    engine.set_hashsize(64)
+    engine.handshake(
+        'hashsize type spin min 0 max 1024 default 16',
+        'threads type spin min 1 max 32 default 1',
+    )
+    assert engine.options.threads.value == '4'
+    assert sorted(engine.setoptions()) == ['setoption hashsize 64', 'setoption threads 4']
+
+
+class RecordFakeEngine(FakeEngine):
+
+    # 启动假引擎进程，记录发给引擎的指令
+    def send_command(self, command):
+        self.commands.append(command)
+        super().send_command(command)
+
+    def setup(self):
+        self.commands = []
+        super().setup()
+
+
+def wait_idle(engine, timeout=10):
+    deadline = time.monotonic() + timeout
+    while engine.state == Engine.ENGINE_BOOT:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    assert engine.isready()
+
+
+def spawn(**kwargs):
+    engine = RecordFakeEngine(**kwargs)
+    engine.start()
+    return engine
+
+
+def test_hashsize_before_ucciok_process():
+    # 模拟引擎启动很慢，ucciok 之前设置选项
+    engine = spawn(startup=200)
+    try:
+        engine.set_hashsize(64)
+        wait_idle(engine)
+        assert engine.options.hashsize.value == '64'
+        assert engine.commands.count('setoption hashsize 64') == 1
+    finally:
+        engine.close()
+
+
+def test_hashsize_unchanged_process():
+    engine = spawn()
+    try:
+        wait_idle(engine)
+        engine.set_hashsize(16)
+        engine.set_hashsize(32)
+        engine.set_hashsize(32)
+        assert engine.options.hashsize.value == '32'
+        assert [
+            command for command in engine.commands
+            if command.startswith('setoption')
+        ] == ['setoption hashsize 32']
+    finally:
+        engine.close()
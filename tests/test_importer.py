@@ -0,0 +1,104 @@
+# coding=utf-8
+
+import array
+
+import pytest
+
+from book import pack_move
+from importer import GameStore
+from importer import GameWriter
+from importer import import_games
+from situation import Situation
+from utils import detect_encoding
+
+START = Situation().fen
+FEN = '3k5/R8/9/9/9/9/9/9/8R/4K4 w - - 0 1'
+
+
+def pack(sit, moves):
+    data = array.array('H')
+    for move in moves:
+        fpos, tpos = sit.parse_move(move)
+        data.append(pack_move(sit.square(fpos), sit.square(tpos)))
+        sit.move(fpos, tpos)
+    return data.tobytes()
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / 'games')
+    with GameWriter(path) as writer:
+        assert writer.add(pack(Situation(), ['h2e2', 'h9g7']), 1) == 0
+        assert writer.add(b'', 3) == 1
+        sit = Situation()
+        sit.parse_fen(FEN)
+        assert writer.add(pack(sit, ['i1i9']), 1, checkmate=True, fen=FEN) == 2
+        assert writer.add(pack(Situation(), ['b2e2']), 2, fen=START.replace(' 0 1', ' 0 2')) == 3
+
+    store = GameStore(path)
+    try:
+        assert len(store) == 4
+
+        game = store[0]
+        assert (game.id, game.fen, game.result, game.checkmate) == (0, START, '1-0', False)
+        assert game.format_fen() == f'fen {START} moves h2e2 h9g7'
+
+        game = store[1]
+        assert (game.moves, game.result) == ([], '1/2-1/2')
+        assert game.format_fen() == f'fen {START}'
+
+        game = store[2]
+        assert (game.fen, game.result, game.checkmate) == (FEN, '1-0', True)
+        assert game.format_fen() == f'fen {FEN} moves i1i9'
+
+        # fen 按顺序保存，编号是第几个带 fen 的对局
+        game = store[3]
+        assert game.fen == START.replace(' 0 1', ' 0 2')
+        assert game.result == '0-1'
+
+        with pytest.raises(IndexError):
+            store[4]
+    finally:
+        store.close()
+
+
+def test_import_games(tmp_path, capfd):
+    source = tmp_path / 'games'
+    source.mkdir()
+    (source / 'a.fen').write_text(
+        f'fen {FEN} moves i1i9\t1-0\n'
+        f'fen {START} moves h2e2 a0a5\t1-0\n'
+        'fen invalid\t0-1\n',
+        encoding='utf8',
+    )
+    (source / 'b.txt').write_bytes('炮二平五 马8进7\n1/2-1/2\n'.encode('gbk'))
+    capfd.readouterr()
+
+    results = []
+    for workers in (1, 2):
+        output = str(tmp_path / f'out{workers}')
+        assert import_games([str(source)], output, workers=workers, batch_size=1) == (2, 2, 3)
+        with open(f'{output}.dat', 'rb') as file:
+            results.append(file.read())
+
+        store = GameStore(output)
+        try:
+            assert store[0].checkmate
+            assert store[0].fen == FEN
+            assert store[1].format_fen() == f'fen {START} moves h2e2 h9g7'
+            assert store[1].result == '1/2-1/2'
+        finally:
+            store.close()
+
+        if workers > 1:
+            # 子进程中不合法 fen 的警告不输出
+            assert 'invalid fen' not in ''.join(capfd.readouterr())
+
+    assert results[0] == results[1]
+
+
+def test_detect_encoding(tmp_path):
+    filename = tmp_path / 'gbk.txt'
+    filename.write_bytes('炮二平五'.encode('gbk'))
+    assert detect_encoding(str(filename)) == 'gbk'
+    filename.write_bytes('炮二平五'.encode('utf8'))
+    assert detect_encoding(str(filename)) == 'utf-8-sig'
@@ -0,0 +1,22 @@
+# coding=utf-8
+
+from parallel import ParallelSearch
+from situation import GENERATOR
+
+
+def test_resize_and_dead_worker():
+    searcher = ParallelSearch(hashsize=1, threads=2)
+    try:
+        searcher.resize(2)
+        assert searcher.table.size == 2
+        assert len(searcher.workers) == 1
+
+        # 辅助进程异常退出之后搜索仍然能结束
+        process = searcher.workers[0]
+        process.kill()
+        process.join()
+        searcher.search(GENERATOR(), depth=2)
+        assert searcher.workers == []
+        assert searcher.search(GENERATOR(), depth=2) is not None
+    finally:
+        searcher.close()
@@ -0,0 +1,83 @@
+# coding=utf-8
+
+import time
+import threading
+
+from chess import Chess
+from engine import Engine
+from ponder import Ponder
+from stats import SearchStats
+from situation import Situation
+from engines.native import NativeEngine
+
+
+def play(sit, *moves):
+    for move in moves:
+        assert sit.move(*sit.parse_move(move)) not in (False, Chess.INVALID)
+    return sit
+
+
+def test_hit_rate():
+    stats = SearchStats()
+    ponder = Ponder()
+
+    # 红方引擎走完之后猜黑方走 h9g7
+    sit = play(Situation(), 'h2e2')
+    ponder.start(Chess.RED, sit, 'h9g7')
+    assert ponder.active
+    assert ponder.check(play(sit.copy(), 'h9g7'), stats) == (Chess.RED, True)
+    assert not ponder.active
+
+    ponder.start(Chess.RED, sit, 'h9g7')
+    assert ponder.check(play(sit.copy(), 'b9c7'), stats) == (Chess.RED, False)
+
+    assert (stats.ponderhits, stats.ponders) == (1, 2)
+    assert stats.hit_rate == 0.5
+
+
+def test_cancel_not_counted():
+    stats = SearchStats()
+    ponder = Ponder()
+    sit = play(Situation(), 'h2e2')
+
+    # 悔棋或者提示的时候取消，之后对方再走棋不算猜错
+    ponder.start(Chess.RED, sit, 'h9g7')
+    assert ponder.cancel() == Chess.RED
+    assert not ponder.active
+
+    # 悔棋之后还没轮到后台思考的一方，也不计入
+    ponder.start(Chess.RED, sit, 'h9g7')
+    assert ponder.check(play(Situation(), 'b2e2'), stats) == (Chess.RED, False)
+    assert stats.ponders == 0
+
+
+def test_native_ponder_miss_then_go():
+    # 没有猜中的时候停止后台思考，马上开始新的搜索，两次搜索都要输出着法
+    moves = []
+    finished = threading.Event()
+
+    def callback(type, data):
+        if type == Chess.INFO:
+            return
+        moves.append(type)
+        if len(moves) == 2:
+            finished.set()
+
+    engine = NativeEngine(callback=callback)
+    engine.start()
+    try:
+        engine.position('startpos moves h2e2')
+        engine.go(ponder=True, time=1000)
+        time.sleep(0.2)
+
+        engine.stop()
+        engine.position('startpos moves b2e2')
+        engine.go(depth=2)
+        assert finished.wait(10)
+        assert moves == [Chess.MOVE, Chess.MOVE]
+        deadline = time.monotonic() + 5
+        while engine.state != Engine.ENGINE_IDLE:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+    finally:
+        engine.close()
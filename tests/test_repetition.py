@@ -0,0 +1,81 @@
+# coding=utf-8
+
+from chess import Chess
+from engine import Engine
+from match import DRAW_IDLE
+from match import MatchGame
+from situation import Situation
+
+
+def play(fen, moves):
+    # 从 fen 开始逐步走子，返回每一步之后的裁决
+    engine = Engine()
+    assert engine.sit.parse_fen(fen)
+    result = []
+    for move in moves:
+        fpos, tpos = engine.sit.parse_move(move)
+        assert engine.move(fpos, tpos) not in (False, Chess.INVALID), move
+        result.append(engine.judge())
+    return engine, result
+
+
+# 红车左右将军，黑将上下躲避
+CHECK_FEN = '4k4/9/9/9/9/9/9/9/R8/3K5 w - - 0 1'
+CHECK_MOVES = ['a1a9'] + ['e9e8', 'a9a8', 'e8e9', 'a8a9'] * 2
+
+# 黑炮左右躲，红车一直跟着捉
+CHASE_FEN = '4k4/9/1c7/9/9/9/9/1R7/9/3K5 b - - 0 1'
+CHASE_MOVES = ['b7c7', 'b2c2', 'c7b7', 'c2b2'] * 2
+
+# 双方都只是来回走
+IDLE_FEN = '4k4/9/9/9/9/9/9/9/R8/3K5 w - - 0 1'
+IDLE_MOVES = ['a1a2', 'e9e8', 'a2a1', 'e8e9'] * 2
+
+
+def test_perpetual_check_loses():
+    engine, result = play(CHECK_FEN, CHECK_MOVES)
+    assert result[:-1] == [None] * (len(CHECK_MOVES) - 1)
+    # 红方长将判负
+    assert result[-1] == Chess.RED
+
+
+def test_perpetual_chase_loses():
+    engine, result = play(CHASE_FEN, CHASE_MOVES)
+    assert result[:-1] == [None] * (len(CHASE_MOVES) - 1)
+    assert result[-1] == Chess.RED
+
+
+def test_idle_repetition_is_draw():
+    engine, result = play(IDLE_FEN, IDLE_MOVES)
+    assert result[:-1] == [None] * (len(IDLE_MOVES) - 1)
+    assert result[-1] == Chess.DRAW
+
+
+def test_banmoves_perpetual_check():
+    engine, result = play(CHECK_FEN, CHECK_MOVES[:4])
+    sit = engine.sit
+    fpos, tpos = sit.parse_move('a8a9')
+    assert (sit.square(fpos), sit.square(tpos)) in engine.get_banmoves()
+
+
+def test_banmoves_ignores_idle_repetition():
+    engine, result = play(IDLE_FEN, IDLE_MOVES[:4])
+    assert engine.get_banmoves() == []
+
+
+def test_idle_counter():
+    sit = Situation()
+    sit.parse_fen(CHASE_FEN)
+    for move in ['b7c7', 'b2c2', 'e9e8']:
+        sit.move(*sit.parse_move(move))
+    assert sit.idle == 3
+    # 吃子之后清零
+    sit.move(*sit.parse_move('c2c7'))
+    assert sit.idle == 0
+
+
+def test_idle_draw():
+    game = MatchGame(None, None, 'startpos', {})
+    game.load()
+    game.record.sit.idle = DRAW_IDLE
+    assert game.step() == (Chess.DRAW, 'idle')
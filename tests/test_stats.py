@@ -0,0 +1,50 @@
+# coding=utf-8
+
+from stats import SearchStats
+from stats import parse_info
+
+
+def test_parse_info():
+    info = parse_info('info depth 8 seldepth 12 score cp 120 time 350 nodes 421000 multipv 2 pv h2e2 h9g7')
+    assert info.depth == 8
+    assert info.seldepth == 12
+    assert info.score == 120
+    assert info.time == 350
+    assert info.nodes == 421000
+    assert info.multipv == 2
+    assert info.pv == ['h2e2', 'h9g7']
+
+    info = parse_info('info depth 3 score mate -2 pv a0a1')
+    assert info.mate == -2
+    assert info.score is None
+
+
+def test_update():
+    stats = SearchStats()
+    stats.new_search()
+    info = stats.update('info depth 1 nodes 1000 time 10')
+    # 没有 nps 的时候根据节点数和时间计算
+    assert info.nps == 100000
+    assert stats.latest is info
+    assert stats.depths == [1]
+    assert not hasattr(info, '__dict__')
+
+    # 关闭之后不再解析
+    stats.watch(False)
+    assert stats.update('info depth 2 nodes 2000 time 10') is None
+    assert stats.latest is info
+    assert stats.depths == [1]
+
+
+def test_series_limit():
+    stats = SearchStats(limit=2, series=5)
+    for search in range(3):
+        stats.new_search()
+        for depth in range(1, 11):
+            stats.update(f'info depth {depth} nps {search + 1}000 pv h2e2')
+        stats.update('info currmove h2e2 currmovenumber 1')
+        assert stats.depths == [6, 7, 8, 9, 10]
+        stats.finish()
+
+    assert len(stats.history) == 2
+    assert stats.summary() == (10, 2500)